@@ -3,18 +3,34 @@ Linear Video Platform API Router
 FastAPI endpoints for Mamba SSM, NABLA Video, and Valsci services
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from enum import Enum
+import asyncio
+import json
+import logging
+import os
+import time
 import uuid
 
+from ..core.paths import data_path
 from ..services.mamba_ssm_service import mamba_service, AttentionMode
 from ..services.nabla_video_service import nabla_service, VideoResolution
 from ..services.valsci_verification_service import valsci_service
+from ..workers.valsci_batch import BatchVerificationJob
 
 
 router = APIRouter(prefix="/linear", tags=["Linear Video Platform"])
+logger = logging.getLogger("linear.platform")
+
+# Batch verification jobs started through the API: job_id -> job.
+# Finished jobs stay queryable for BATCH_JOB_RETENTION_SECONDS, then are dropped.
+batch_jobs: Dict[str, BatchVerificationJob] = {}
+BATCH_JOB_RETENTION_SECONDS = float(os.getenv("BATCH_JOB_RETENTION_SECONDS", "3600"))
+
+# API batch jobs only read <dir>/inputs and write server-named files to <dir>/results
+VALSCI_BATCH_DIR = os.getenv("VALSCI_BATCH_DIR") or data_path("valsci_batch")
 
 
 # ==========================================
@@ -66,6 +82,12 @@ class VerifyContentRequest(BaseModel):
     creator_id: str
 
 
+class BatchVerifyRequest(BaseModel):
+    # File name inside the batch inputs directory, never a path
+    input_file: str = Field(pattern=r"^[A-Za-z0-9][A-Za-z0-9._-]{0,127}\.jsonl$")
+    workers: Optional[int] = Field(default=None, ge=1, le=256)
+
+
 class InitSequenceResponse(BaseModel):
     sequence_id: str
     status: str
@@ -285,6 +307,130 @@ async def verify_video_content(request: VerifyContentRequest):
     }
 
 
+@router.post("/valsci/batch")
+async def start_batch_verification(request: BatchVerifyRequest, background_tasks: BackgroundTasks):
+    """
+    Start a resumable batch verification job over a JSONL transcript file
+    in the batch inputs directory. Results go to a server-named file in the
+    results directory; re-submitting the same input resumes from its checkpoint.
+    """
+    _evict_finished_jobs()
+    input_dir = os.path.realpath(os.path.join(VALSCI_BATCH_DIR, "inputs"))
+    input_path = os.path.realpath(os.path.join(input_dir, request.input_file))
+    if os.path.dirname(input_path) != input_dir or not os.path.isfile(input_path):
+        raise HTTPException(status_code=404, detail="Batch input not found")
+
+    output_file = request.input_file[:-len(".jsonl")] + ".results.jsonl"
+    output_path = os.path.join(VALSCI_BATCH_DIR, "results", output_file)
+    if BatchVerificationJob.is_running(output_path) or any(
+        job.output_path == output_path and job.stats["status"] in ("pending", "running")
+        for job in batch_jobs.values()
+    ):
+        raise HTTPException(status_code=409, detail="A batch job for this input is already running")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    job_id = str(uuid.uuid4())
+    job = BatchVerificationJob(input_path, output_path, workers=request.workers)
+    batch_jobs[job_id] = job
+    background_tasks.add_task(_run_batch_job, job)
+    return {"job_id": job_id, "status": job.stats["status"], "output_file": output_file}
+
+
+def _run_batch_job(job: BatchVerificationJob):
+    try:
+        job.run()
+    except Exception:
+        # Also reported to pollers as status "failed"
+        logger.exception(f"Batch verification of {job.input_path} failed")
+
+
+def _evict_finished_jobs(now: Optional[float] = None):
+    """Drop jobs that finished more than BATCH_JOB_RETENTION_SECONDS ago"""
+    cutoff = (now or time.time()) - BATCH_JOB_RETENTION_SECONDS
+    expired = [
+        job_id for job_id, job in batch_jobs.items()
+        if job.stats.get("finished_at", cutoff + 1) <= cutoff
+    ]
+    for job_id in expired:
+        del batch_jobs[job_id]
+
+
+@router.get("/valsci/batch/{job_id}")
+async def get_batch_verification_status(job_id: str):
+    """Get progress and throughput of a batch verification job."""
+    _evict_finished_jobs()
+    if job_id not in batch_jobs:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return {"job_id": job_id, **batch_jobs[job_id].stats}
+
+
+@router.websocket("/valsci/stream/{video_id}")
+async def stream_video_verification(websocket: WebSocket, video_id: str, creator_id: str = "anonymous"):
+    """
+    Verify claims in a live stream as the transcript arrives.
+    Protocol:
+    - Client sends {"start": float, "end": float, "text": str} per transcript segment.
+    - Server pushes {"type": "claim_result", ...} as each claim is verified.
+    - Client sends {"type": "end"} -> Server sends {"type": "report", ...} and closes.
+    - A malformed frame gets {"type": "error", "detail": str} and is skipped.
+    """
+    await websocket.accept()
+    session = valsci_service.open_stream(video_id, creator_id)
+    
+    async def push_results():
+        async for claim, result in session.results():
+            await websocket.send_text(json.dumps({
+                "type": "claim_result",
+                "claim_id": claim.claim_id,
+                "text": claim.text,
+                "timestamp_start": claim.timestamp_start,
+                "timestamp_end": claim.timestamp_end,
+                "status": result.status.value,
+                "evidence_strength": result.evidence_strength.value,
+                "evidence_score": result.evidence_score,
+                "explanation": result.explanation
+            }))
+    
+    pusher = asyncio.create_task(push_results())
+    try:
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+                if not isinstance(data, dict):
+                    raise ValueError("frame must be a JSON object")
+                if data.get("type") == "end":
+                    break
+                start, end = float(data["start"]), float(data["end"])
+                text = data.get("text", "")
+                if not isinstance(text, str):
+                    raise ValueError("text must be a string")
+            except KeyError as e:
+                await websocket.send_text(json.dumps({"type": "error", "detail": f"Missing field {e}"}))
+                continue
+            except (ValueError, TypeError) as e:
+                await websocket.send_text(json.dumps({"type": "error", "detail": f"Invalid segment: {e}"}))
+                continue
+            await session.add_segment(start, end, text)
+        
+        report = await session.close()
+        await pusher
+        await websocket.send_text(json.dumps({
+            "type": "report",
+            "video_id": report.video_id,
+            "total_claims": report.total_claims,
+            "verified_claims": report.verified_claims,
+            "overall_evidence_score": report.overall_evidence_score,
+            "token_reward_multiplier": report.token_reward_multiplier
+        }))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pusher.cancel()
+        if not session.closed:
+            await session.close()
+
+
 @router.get("/valsci/video/{video_id}/monetization")
 async def get_monetization_metrics(video_id: str):
     """
@@ -320,6 +466,22 @@ async def get_claim_details(video_id: str, claim_id: str):
     }
 
 
+@router.get("/valsci/memo/metrics")
+async def get_claim_memo_metrics():
+    """
+    Get hit-rate metrics for the cross-video claim result memo.
+    """
+    return valsci_service.claim_memo.get_metrics()
+
+
+@router.get("/valsci/retrieval/metrics")
+async def get_retrieval_metrics():
+    """
+    Get cache and request-coalescing metrics for literature retrieval.
+    """
+    return valsci_service.rag_retriever.get_metrics()
+
+
 @router.get("/valsci/auditor-node")
 async def get_auditor_node_info():
     """
@@ -345,5 +507,5 @@ async def health_check():
         },
         "active_sequences": len(mamba_service.active_sequences),
         "active_jobs": len(nabla_service.active_jobs),
-        "active_verifications": len(valsci_service.active_verifications)
+        "active_verifications": await valsci_service.active_verifications.len_async()
     }
@@ -0,0 +1,16 @@
+"""
+Local state locations (SQLite stores, batch job files)
+
+Everything lives under DATA_DIR, which defaults to backend/data rather than
+the directory the process happens to start from.
+"""
+
+import os
+from pathlib import Path
+
+DATA_DIR = Path(os.getenv("DATA_DIR") or Path(__file__).resolve().parents[2] / "data")
+
+
+def data_path(*parts: str) -> str:
+    """Path under DATA_DIR; nothing is created until a store opens it"""
+    return str(DATA_DIR.joinpath(*parts))
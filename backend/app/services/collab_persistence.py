@@ -0,0 +1,291 @@
+"""
+Collaboration Persistence - Write-behind update log with snapshot compaction
+
+Every CRDT update applied to a live timeline (human or agent) is recorded
+in memory and flushed to a per-project append-only log on a debounce
+timer, so editing never waits on storage. When a project's log grows past
+`compact_threshold` bytes it is folded into a single snapshot.
+
+Loading a project = snapshot + logged updates + anything still pending.
+
+TimelineStore is SQLite-backed so it works offline and in tests; a
+production deployment can swap in a Postgres/Supabase store with the same
+methods.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from pycrdt import Doc, merge_updates
+
+logger = logging.getLogger("collab.persistence")
+
+
+class TimelineStore:
+    """SQLite snapshot + update-log store for collaborative timelines"""
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            if self.db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS timeline_snapshots (
+                    project_id TEXT PRIMARY KEY,
+                    snapshot BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS timeline_updates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_id TEXT NOT NULL,
+                    data BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_timeline_updates_project
+                    ON timeline_updates (project_id, id);
+            """)
+        return self._conn
+
+    def append_updates(self, project_id: str, updates: List[bytes]):
+        """Append a batch of updates to the project log in one transaction"""
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT INTO timeline_updates (project_id, data) VALUES (?, ?)",
+                [(project_id, update) for update in updates]
+            )
+            db.commit()
+
+    def load(self, project_id: str) -> Tuple[Optional[bytes], List[bytes]]:
+        """Return (snapshot, logged updates in order)"""
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT snapshot FROM timeline_snapshots WHERE project_id = ?", (project_id,)
+            ).fetchone()
+            updates = [
+                r[0] for r in db.execute(
+                    "SELECT data FROM timeline_updates WHERE project_id = ? ORDER BY id", (project_id,)
+                )
+            ]
+        return (row[0] if row else None), updates
+
+    def log_size(self, project_id: str) -> int:
+        """Total bytes in the project's update log"""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM timeline_updates WHERE project_id = ?",
+                (project_id,)
+            ).fetchone()
+        return row[0]
+
+    def compact(self, project_id: str) -> int:
+        """Fold the update log into the snapshot; returns the new snapshot size"""
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT snapshot FROM timeline_snapshots WHERE project_id = ?", (project_id,)
+            ).fetchone()
+            rows = db.execute(
+                "SELECT id, data FROM timeline_updates WHERE project_id = ? ORDER BY id", (project_id,)
+            ).fetchall()
+            if not rows:
+                return len(row[0]) if row else 0
+
+            doc = Doc()
+            if row:
+                doc.apply_update(row[0])
+            for _, data in rows:
+                doc.apply_update(data)
+            snapshot = doc.get_update()
+
+            db.execute(
+                "INSERT OR REPLACE INTO timeline_snapshots (project_id, snapshot, updated_at) VALUES (?, ?, ?)",
+                (project_id, snapshot, time.time())
+            )
+            db.execute(
+                "DELETE FROM timeline_updates WHERE project_id = ? AND id <= ?",
+                (project_id, rows[-1][0])
+            )
+            db.commit()
+        return len(snapshot)
+
+    def delete(self, project_id: str):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM timeline_snapshots WHERE project_id = ?", (project_id,))
+            db.execute("DELETE FROM timeline_updates WHERE project_id = ?", (project_id,))
+            db.commit()
+
+
+class WriteBehindPersistence:
+    """
+    Buffers CRDT updates per project and flushes them to a TimelineStore.
+
+    A flush is scheduled `debounce` seconds after the latest update, but
+    never later than `max_delay` after the first unflushed one, so a
+    continuous stream of edits still reaches storage. A timed flush that
+    fails keeps its updates and is retried with exponential backoff (up to
+    `max_retry_delay`), whether or not another edit arrives.
+    """
+
+    def __init__(
+        self,
+        store: TimelineStore,
+        debounce: float = 0.5,
+        max_delay: float = 5.0,
+        compact_threshold: int = 1 << 20,
+        max_retry_delay: float = 30.0
+    ):
+        self.store = store
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.compact_threshold = compact_threshold
+        self.max_retry_delay = max_retry_delay
+        self._pending: Dict[str, List[bytes]] = {}
+        self._first_pending_at: Dict[str, float] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # Per-project flush locks, dropped once no flush holds or waits on them
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        # Running byte count of each project's stored log, seeded from the store once
+        self._log_bytes: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        # Current retry delay per project after failed timed flushes
+        self._retry_delays: Dict[str, float] = {}
+        self.metrics = {
+            "updates_recorded": 0,
+            "flushes": 0,
+            "updates_flushed": 0,
+            "bytes_flushed": 0,
+            "compactions": 0,
+            "flush_errors": 0
+        }
+
+    def record(self, project_id: str, update: bytes):
+        """Buffer an update and (re)schedule the project's flush"""
+        self.metrics["updates_recorded"] += 1
+        self._pending.setdefault(project_id, []).append(update)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop (sync caller): flushed on the next explicit flush()
+
+        now = loop.time()
+        first = self._first_pending_at.setdefault(project_id, now)
+        deadline = min(now + self.debounce, first + self.max_delay)
+
+        timer = self._timers.pop(project_id, None)
+        if timer:
+            timer.cancel()
+        self._timers[project_id] = loop.call_at(deadline, self._schedule_flush, project_id)
+
+    def has_pending(self, project_id: str) -> bool:
+        return bool(self._pending.get(project_id))
+
+    def _schedule_flush(self, project_id: str):
+        self._timers.pop(project_id, None)
+        task = asyncio.create_task(self._timed_flush(project_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _timed_flush(self, project_id: str):
+        """Flush from a timer: errors are retried here, never left on the task"""
+        try:
+            await self.flush(project_id)
+        except Exception:
+            # flush() logged it and kept the batch; try again without waiting for the next edit
+            self.metrics["flush_errors"] += 1
+            delay = min(self.max_retry_delay, max(self._retry_delays.get(project_id, self.debounce / 2) * 2, 0.01))
+            self._retry_delays[project_id] = delay
+            if project_id not in self._timers:
+                loop = asyncio.get_running_loop()
+                self._timers[project_id] = loop.call_later(delay, self._schedule_flush, project_id)
+        else:
+            self._retry_delays.pop(project_id, None)
+
+    async def flush(self, project_id: str):
+        """Write the project's buffered updates, compacting the log if it grew too large"""
+        timer = self._timers.pop(project_id, None)
+        if timer:
+            timer.cancel()
+
+        lock = self._locks.setdefault(project_id, asyncio.Lock())
+        self._lock_users[project_id] = self._lock_users.get(project_id, 0) + 1
+        try:
+            async with lock:
+                await self._flush_locked(project_id)
+        finally:
+            self._lock_users[project_id] -= 1
+            if not self._lock_users[project_id]:
+                del self._lock_users[project_id]
+                del self._locks[project_id]
+
+    async def _flush_locked(self, project_id: str):
+        batch = self._pending.pop(project_id, [])
+        self._first_pending_at.pop(project_id, None)
+        if not batch:
+            return
+
+        if project_id not in self._log_bytes:
+            self._log_bytes[project_id] = await asyncio.to_thread(self.store.log_size, project_id)
+
+        try:
+            await asyncio.to_thread(self.store.append_updates, project_id, batch)
+        except Exception:
+            # Put the batch back so nothing is lost; the next flush retries it
+            self._pending[project_id] = batch + self._pending.get(project_id, [])
+            logger.exception(f"Failed to flush {len(batch)} updates for project {project_id}")
+            raise
+
+        batch_bytes = sum(len(u) for u in batch)
+        self.metrics["flushes"] += 1
+        self.metrics["updates_flushed"] += len(batch)
+        self.metrics["bytes_flushed"] += batch_bytes
+        self._log_bytes[project_id] += batch_bytes
+
+        if self._log_bytes[project_id] > self.compact_threshold:
+            size = await asyncio.to_thread(self.store.compact, project_id)
+            self._log_bytes[project_id] = 0
+            self.metrics["compactions"] += 1
+            logger.info(f"Compacted project {project_id} log into {size} byte snapshot")
+
+    async def flush_all(self):
+        """Flush every project; one failing project does not stop the others"""
+        # Include projects whose batch a timed flush is writing right now: flush() waits on its lock
+        busy = [project_id for project_id, lock in self._locks.items() if lock.locked()]
+        errors: Dict[str, Exception] = {}
+        for project_id in list(dict.fromkeys([*self._pending, *busy])):
+            try:
+                await self.flush(project_id)
+            except Exception as e:
+                errors[project_id] = e  # flush() logged it and kept the batch
+        if errors:
+            first = next(iter(errors.values()))
+            raise RuntimeError(f"Failed to flush projects: {', '.join(errors)}") from first
+
+    def forget(self, project_id: str):
+        """Drop per-project bookkeeping once a project is no longer resident"""
+        if not self.has_pending(project_id) and project_id not in self._locks:
+            self._log_bytes.pop(project_id, None)
+            self._retry_delays.pop(project_id, None)
+
+    async def load(self, project_id: str) -> Optional[bytes]:
+        """Full persisted state of a project (snapshot + log + unflushed updates)"""
+        snapshot, updates = await asyncio.to_thread(self.store.load, project_id)
+        parts = ([snapshot] if snapshot else []) + updates + self._pending.get(project_id, [])
+        if not parts:
+            return None
+        return parts[0] if len(parts) == 1 else merge_updates(*parts)
@@ -0,0 +1,468 @@
+"""
+Collaboration Relay - Cross-process fan-out of CRDT updates
+
+With several uvicorn workers, two editors of the same project can land on
+different processes, each holding its own copy of the Y.Doc. The relay
+publishes every local CRDT update (and presence message) on a per-project
+pub/sub channel; other workers apply remote updates to their copy and fan
+them out to their own sockets without re-publishing them.
+
+When a worker opens a project it publishes its state vector and any peer
+already holding the session replies with the diff, so updates that were
+not yet flushed to the shared TimelineStore are not lost.
+
+Bus backends (COLLAB_RELAY_URL):
+- unset            -> no relay (single worker)
+- memory://        -> InMemoryBus, same-process only (tests)
+- unix:///path     -> LocalSocketBus against a LocalRelayBroker
+- tcp://host:port  -> LocalSocketBus against a LocalRelayBroker
+- redis://...      -> RedisBus (Redis PUBLISH/SUBSCRIBE)
+
+Run the local broker with `python -m app.workers.collab_relay_broker`.
+"""
+
+import asyncio
+import logging
+import struct
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Set
+from urllib.parse import urlparse
+
+logger = logging.getLogger("collab.relay")
+
+# Relay message kinds (first byte of every relay message)
+KIND_UPDATE = b"U"        # CRDT update
+KIND_AWARENESS = b"A"     # Presence/awareness text frame (UTF-8)
+KIND_SYNC_REQUEST = b"S"  # Payload is the sender's state vector
+KIND_SYNC_REPLY = b"R"    # Payload is the diff against a requested state vector
+
+NODE_ID_SIZE = 16
+
+MessageHandler = Callable[[bytes], None]
+
+
+class RelayBus:
+    """Pub/sub transport interface; handlers are called on the event loop"""
+
+    async def publish(self, channel: str, message: bytes):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        raise NotImplementedError
+
+    async def unsubscribe(self, channel: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    # Called after the transport reconnected; messages sent meanwhile were missed
+    on_reconnect: Optional[Callable[[], None]] = None
+
+
+class InMemoryHub:
+    """Shared channel table for InMemoryBus instances (one bus per simulated worker)"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set["InMemoryBus"]] = {}
+
+
+class InMemoryBus(RelayBus):
+    """Same-process bus; give several buses the same hub to simulate several workers"""
+
+    def __init__(self, hub: Optional[InMemoryHub] = None):
+        self.hub = hub or InMemoryHub()
+        self._handlers: Dict[str, MessageHandler] = {}
+
+    async def publish(self, channel: str, message: bytes):
+        loop = asyncio.get_running_loop()
+        for bus in list(self.hub.subscribers.get(channel, ())):
+            handler = bus._handlers.get(channel)
+            if handler:
+                # Deliver asynchronously, like a real transport would
+                loop.call_soon(handler, message)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers[channel] = handler
+        self.hub.subscribers.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, channel: str):
+        self._handlers.pop(channel, None)
+        subscribers = self.hub.subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self.hub.subscribers[channel]
+
+    async def close(self):
+        for channel in list(self._handlers):
+            await self.unsubscribe(channel)
+
+
+# --- Local socket transport ---
+# Frame: op (1 byte) | channel length (uint16) | payload length (uint32) | channel | payload
+_FRAME_HEADER = struct.Struct(">cHI")
+OP_SUBSCRIBE = b"S"
+OP_UNSUBSCRIBE = b"X"
+OP_PUBLISH = b"P"
+OP_MESSAGE = b"M"
+
+
+def _encode_frame(op: bytes, channel: str, payload: bytes = b"") -> bytes:
+    channel_bytes = channel.encode("utf-8")
+    return _FRAME_HEADER.pack(op, len(channel_bytes), len(payload)) + channel_bytes + payload
+
+
+async def _read_frame(reader: asyncio.StreamReader):
+    op, channel_len, payload_len = _FRAME_HEADER.unpack(await reader.readexactly(_FRAME_HEADER.size))
+    channel = (await reader.readexactly(channel_len)).decode("utf-8")
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return op, channel, payload
+
+
+async def _open_connection(address: str):
+    parsed = urlparse(address)
+    if parsed.scheme == "unix":
+        return await asyncio.open_unix_connection(parsed.path)
+    return await asyncio.open_connection(parsed.hostname, parsed.port)
+
+
+class LocalRelayBroker:
+    """
+    Minimal pub/sub broker over a Unix or TCP socket for single-host multi-worker setups.
+    A subscriber whose socket buffer exceeds `max_buffer` bytes is disconnected;
+    its LocalSocketBus reconnects and the relay resyncs by state vector.
+    """
+
+    def __init__(self, address: str, max_buffer: int = 8 << 20):
+        self.address = address
+        self.max_buffer = max_buffer
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._subscribers: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self.metrics = {"clients": 0, "published": 0, "delivered": 0, "slow_disconnects": 0}
+
+    async def start(self):
+        parsed = urlparse(self.address)
+        if parsed.scheme == "unix":
+            self._server = await asyncio.start_unix_server(self._handle_client, parsed.path)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, parsed.hostname, parsed.port)
+        logger.info(f"Collab relay broker listening on {self.address}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writers in self._subscribers.values():
+            for writer in writers:
+                writer.close()
+        self._subscribers.clear()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.metrics["clients"] += 1
+        channels: Set[str] = set()
+        try:
+            while True:
+                op, channel, payload = await _read_frame(reader)
+                if op == OP_SUBSCRIBE:
+                    self._subscribers.setdefault(channel, set()).add(writer)
+                    channels.add(channel)
+                elif op == OP_UNSUBSCRIBE:
+                    self._drop(channel, writer)
+                    channels.discard(channel)
+                elif op == OP_PUBLISH:
+                    self._deliver(channel, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.metrics["clients"] -= 1
+            for channel in channels:
+                self._drop(channel, writer)
+            writer.close()
+
+    def _deliver(self, channel: str, payload: bytes):
+        self.metrics["published"] += 1
+        frame = _encode_frame(OP_MESSAGE, channel, payload)
+        for writer in list(self._subscribers.get(channel, ())):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.metrics["slow_disconnects"] += 1
+                self._drop(channel, writer)
+                writer.close()
+                continue
+            writer.write(frame)
+            self.metrics["delivered"] += 1
+
+    def _drop(self, channel: str, writer: asyncio.StreamWriter):
+        writers = self._subscribers.get(channel)
+        if writers is not None:
+            writers.discard(writer)
+            if not writers:
+                del self._subscribers[channel]
+
+
+class LocalSocketBus(RelayBus):
+    """Client of a LocalRelayBroker; reconnects and resubscribes if the broker goes away"""
+
+    def __init__(self, address: str, reconnect_delay: float = 0.5):
+        self.address = address
+        self.reconnect_delay = reconnect_delay
+        self._handlers: Dict[str, MessageHandler] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._closed = False
+
+    async def _connection(self) -> asyncio.StreamWriter:
+        if self._writer is not None and not self._writer.is_closing():
+            return self._writer
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                reader, self._writer = await _open_connection(self.address)
+                for channel in self._handlers:
+                    self._writer.write(_encode_frame(OP_SUBSCRIBE, channel))
+                self._reader_task = asyncio.create_task(self._read_loop(reader))
+        return self._writer
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                op, channel, payload = await _read_frame(reader)
+                handler = self._handlers.get(channel)
+                if op == OP_MESSAGE and handler:
+                    try:
+                        handler(payload)
+                    except Exception:
+                        logger.exception(f"Relay handler for {channel} failed")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        if self._writer is not None:
+            self._writer.close()
+        if not self._closed and self._handlers:
+            asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._closed:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._connection()
+            except OSError as e:
+                logger.warning(f"Collab relay broker unavailable at {self.address}: {e}")
+                continue
+            if self.on_reconnect:
+                self.on_reconnect()
+            return
+
+    async def publish(self, channel: str, message: bytes):
+        writer = await self._connection()
+        writer.write(_encode_frame(OP_PUBLISH, channel, message))
+        await writer.drain()
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers[channel] = handler
+        writer = await self._connection()
+        writer.write(_encode_frame(OP_SUBSCRIBE, channel))
+        await writer.drain()
+
+    async def unsubscribe(self, channel: str):
+        if self._handlers.pop(channel, None) is None:
+            return
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(_encode_frame(OP_UNSUBSCRIBE, channel))
+            await self._writer.drain()
+
+    async def close(self):
+        self._closed = True
+        self._handlers.clear()
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class RedisBus(RelayBus):
+    """Redis PUBLISH/SUBSCRIBE backend for deployments spanning several hosts"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._handlers: Dict[str, MessageHandler] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: bytes):
+        await self._redis.publish(channel, message)
+
+    async def subscribe(self, channel: str, handler: MessageHandler):
+        self._handlers[channel] = handler
+        await self._pubsub.subscribe(channel)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, channel: str):
+        if self._handlers.pop(channel, None) is not None:
+            await self._pubsub.unsubscribe(channel)
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Redis relay listener error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message.get("type") != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode("utf-8")
+            handler = self._handlers.get(channel)
+            if handler:
+                handler(message["data"])
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+        await self._pubsub.close()
+        await self._redis.close()
+
+
+def create_relay_bus(url: Optional[str]) -> Optional[RelayBus]:
+    """Build a bus from COLLAB_RELAY_URL; None disables the relay"""
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return InMemoryBus()
+    if scheme in ("unix", "tcp"):
+        return LocalSocketBus(url)
+    if scheme in ("redis", "rediss"):
+        return RedisBus(url)
+    raise ValueError(f"Unsupported collab relay URL: {url}")
+
+
+class CollabRelay:
+    """
+    Publishes local CRDT updates per project and delivers remote ones.
+
+    Every message is tagged with this worker's node id so a worker ignores
+    its own publications. Outgoing messages go through one queue so they
+    leave in the order they were produced.
+    """
+
+    def __init__(self, bus: RelayBus, node_id: Optional[bytes] = None, channel_prefix: str = "collab:"):
+        self.bus = bus
+        self.node_id = node_id or uuid.uuid4().bytes
+        self.channel_prefix = channel_prefix
+        self._handlers: Dict[str, Callable[[bytes, bytes], None]] = {}
+        self._outbox: Optional[asyncio.Queue] = None
+        self._publisher: Optional[asyncio.Task] = None
+        self._resync: Optional[Callable[[str], None]] = None
+        self.metrics = {
+            "published": 0,
+            "received": 0,
+            "ignored_own": 0,
+            "sync_requests": 0,
+            "publish_errors": 0
+        }
+        bus.on_reconnect = self._on_reconnect
+
+    def channel(self, project_id: str) -> str:
+        return f"{self.channel_prefix}{project_id}"
+
+    async def attach(
+        self,
+        project_id: str,
+        handler: Callable[[bytes, bytes], None],
+        state_vector: Optional[bytes] = None
+    ):
+        """
+        Subscribe to a project's channel; `handler(kind, payload)` receives remote messages.
+        With a state vector, peers are asked for anything this worker is missing.
+        """
+        self._handlers[project_id] = handler
+        await self.bus.subscribe(
+            self.channel(project_id), lambda message: self._on_message(project_id, message)
+        )
+        if state_vector is not None:
+            self.metrics["sync_requests"] += 1
+            await self.bus.publish(self.channel(project_id), self._frame(KIND_SYNC_REQUEST, state_vector))
+
+    async def detach(self, project_id: str):
+        if self._handlers.pop(project_id, None) is not None:
+            await self.bus.unsubscribe(self.channel(project_id))
+
+    def is_attached(self, project_id: str) -> bool:
+        return project_id in self._handlers
+
+    def on_resync(self, callback: Callable[[str], None]):
+        """`callback(project_id)` is called for every attached project after a transport reconnect"""
+        self._resync = callback
+
+    def publish(self, project_id: str, kind: bytes, payload: bytes):
+        """Queue a message for the project's channel without blocking the caller"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning(f"No event loop; relay message for project {project_id} not published")
+            return
+        if self._outbox is None:
+            self._outbox = asyncio.Queue()
+        if self._publisher is None or self._publisher.done():
+            self._publisher = loop.create_task(self._publish_loop())
+        self._outbox.put_nowait((project_id, self._frame(kind, payload)))
+
+    async def flush(self):
+        """Wait until every queued message has been handed to the bus"""
+        if self._outbox is not None:
+            await self._outbox.join()
+
+    async def close(self):
+        if self._publisher:
+            self._publisher.cancel()
+        for project_id in list(self._handlers):
+            await self.detach(project_id)
+        await self.bus.close()
+
+    def _frame(self, kind: bytes, payload: bytes) -> bytes:
+        return kind + self.node_id + payload
+
+    async def _publish_loop(self):
+        while True:
+            project_id, message = await self._outbox.get()
+            try:
+                await self.bus.publish(self.channel(project_id), message)
+                self.metrics["published"] += 1
+            except Exception as e:
+                self.metrics["publish_errors"] += 1
+                logger.warning(f"Relay publish for project {project_id} failed: {e}")
+            finally:
+                self._outbox.task_done()
+
+    def _on_message(self, project_id: str, message: bytes):
+        kind = message[:1]
+        sender = message[1:1 + NODE_ID_SIZE]
+        if sender == self.node_id:
+            self.metrics["ignored_own"] += 1
+            return
+        handler = self._handlers.get(project_id)
+        if handler is None:
+            return
+        self.metrics["received"] += 1
+        handler(kind, message[1 + NODE_ID_SIZE:])
+
+    def _on_reconnect(self):
+        if self._resync is None:
+            return
+        for project_id in list(self._handlers):
+            self._resync(project_id)
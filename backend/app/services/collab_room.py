@@ -0,0 +1,418 @@
+"""
+Collaboration Rooms - Per-project WebSocket fan-out
+
+Every project with connected editors gets a CollabRoom holding one
+CollabConnection per socket. Each connection owns a bounded send queue
+drained by its own sender task, so a broadcast is just a non-blocking
+enqueue per peer and a slow client can never stall the room.
+
+CRDT updates can be coalesced: with a batching window, updates received
+during the window are merged (pycrdt.merge_updates) and each peer gets a
+single combined update per tick instead of one message per keystroke/drag.
+
+Presence (awareness) is not relayed message-by-message: each room keeps
+the latest state per user in a PresenceChannel and broadcasts only what
+changed, at most `presence_rate` times per second. Users that stop
+sending awareness are evicted after `presence_stale_after` seconds. The
+same capped flush hands this worker's own users' deltas to an optional
+publish hook (the cross-worker relay), so relay traffic is throttled too.
+
+Overflow policy:
+- Droppable messages (presence/awareness) are discarded when the queue is full.
+- CRDT updates are never dropped (that would silently diverge the client);
+  the slow connection is disconnected instead and resyncs on reconnect.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from pycrdt import merge_updates
+
+logger = logging.getLogger("collab.room")
+
+# WebSocket close code for "Try Again Later" (server overloaded)
+CLOSE_TRY_AGAIN_LATER = 1013
+
+# (changed users -> state, removed user ids) for users connected to this worker
+PresencePublisher = Callable[[Dict[str, Any], List[str]], None]
+
+
+class CollabConnection:
+    """A single socket in a room, with its own bounded send queue"""
+
+    def __init__(self, websocket: Any, user_id: str, max_queue: int = 256):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self.dropped_messages = 0
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def enqueue(self, message: Union[bytes, str], droppable: bool = False) -> bool:
+        """
+        Queue a message without blocking.
+        Returns False if the connection must be disconnected (overflowed with a non-droppable message).
+        """
+        if self.closed:
+            return True
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            if droppable:
+                self.dropped_messages += 1
+                return True
+            return False
+        return True
+
+    async def _send_loop(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                if isinstance(message, bytes):
+                    await self.websocket.send_bytes(message)
+                else:
+                    await self.websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Socket is gone; the receive loop will notice and leave the room
+            logger.debug(f"Send loop for {self.user_id} stopped: {e}")
+            self.closed = True
+
+    async def close(self, code: int = 1000):
+        if self._sender:
+            self._sender.cancel()
+        if not self.closed:
+            self.closed = True
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass
+
+
+class PresenceChannel:
+    """Latest awareness state per user, broadcast as rate-capped aggregate deltas"""
+
+    def __init__(
+        self,
+        room: "CollabRoom",
+        max_rate: float = 15.0,
+        stale_after: float = 30.0,
+        publish: Optional[PresencePublisher] = None
+    ):
+        self.room = room
+        self.publish = publish
+        # Minimum seconds between two presence broadcasts (0 = no cap)
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.stale_after = stale_after
+        self.states: Dict[str, Any] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._changed: Set[str] = set()
+        self._removed: Set[str] = set()
+        # Subsets of the above that originated here (not from the relay) and must be published
+        self._local_changed: Set[str] = set()
+        self._local_removed: Set[str] = set()
+        self._last_flush = float("-inf")
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._evict_handle: Optional[asyncio.TimerHandle] = None
+
+    def update(self, user_id: str, state: Any, local: bool = True):
+        loop = asyncio.get_running_loop()
+        self.room.metrics["presence_updates"] += 1
+        self.states[user_id] = state
+        self._last_seen[user_id] = loop.time()
+        self._changed.add(user_id)
+        self._removed.discard(user_id)
+        if local:
+            self._local_changed.add(user_id)
+            self._local_removed.discard(user_id)
+        self._schedule_flush(loop)
+        if self._evict_handle is None:
+            self._evict_handle = loop.call_later(self.stale_after, self.evict_stale)
+
+    def remove(self, user_id: str, local: bool = True):
+        if user_id not in self._last_seen:
+            return
+        del self._last_seen[user_id]
+        del self.states[user_id]
+        self._changed.discard(user_id)
+        self._removed.add(user_id)
+        self._local_changed.discard(user_id)
+        if local:
+            self._local_removed.add(user_id)
+        self._schedule_flush(asyncio.get_running_loop())
+
+    def snapshot(self) -> str:
+        """Full presence state, for connections that just joined"""
+        return json.dumps({"type": "presence", "users": self.states, "removed": []})
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop):
+        if self._flush_handle is not None:
+            return
+        delay = max(0.0, self._last_flush + self.interval - loop.time())
+        self._flush_handle = loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """Broadcast users whose state changed or who left since the last flush"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._changed and not self._removed:
+            return
+        self._last_flush = asyncio.get_running_loop().time()
+        message = json.dumps({
+            "type": "presence",
+            "users": {user_id: self.states[user_id] for user_id in self._changed},
+            "removed": sorted(self._removed)
+        })
+        self._changed, self._removed = set(), set()
+        self.room.metrics["presence_broadcasts"] += 1
+        self.room._fan_out(message, set(), droppable=True)
+        self._publish_local()
+
+    def _publish_local(self):
+        """Hand this worker's users' coalesced deltas to the publish hook"""
+        if not self._local_changed and not self._local_removed:
+            return
+        users = {user_id: self.states[user_id] for user_id in self._local_changed}
+        removed = sorted(self._local_removed)
+        self._local_changed, self._local_removed = set(), set()
+        if self.publish is not None:
+            self.room.metrics["presence_published"] += 1
+            self.publish(users, removed)
+
+    def evict_stale(self):
+        """Drop users not heard from for `stale_after` seconds"""
+        self._evict_handle = None
+        loop = asyncio.get_running_loop()
+        cutoff = loop.time() - self.stale_after
+        for user_id, seen in list(self._last_seen.items()):
+            if seen <= cutoff:
+                # Every worker evicts on its own clock, so evictions are not published
+                self.room.metrics["presence_evictions"] += 1
+                self.remove(user_id, local=False)
+        if self._last_seen:
+            next_check = min(self._last_seen.values()) + self.stale_after
+            self._evict_handle = loop.call_at(next_check, self.evict_stale)
+
+    def close(self):
+        for handle in (self._flush_handle, self._evict_handle):
+            if handle is not None:
+                handle.cancel()
+        self._flush_handle = self._evict_handle = None
+        # The room is going away (e.g. last socket left): still tell other workers
+        self._publish_local()
+
+
+class CollabRoom:
+    """All live connections editing a single project"""
+
+    def __init__(
+        self,
+        project_id: str,
+        max_queue: int = 256,
+        batch_interval: float = 0.0,
+        presence_rate: float = 15.0,
+        presence_stale_after: float = 30.0,
+        publish_presence: Optional[PresencePublisher] = None
+    ):
+        self.project_id = project_id
+        self.max_queue = max_queue
+        # Seconds to coalesce CRDT updates for; 0 broadcasts each update immediately
+        self.batch_interval = batch_interval
+        self.connections: Dict[str, CollabConnection] = {}
+        self._pending_updates: List[Tuple[bytes, Optional[CollabConnection]]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Closes of slow clients in flight; referenced so they are not garbage-collected
+        self._closing: Set[asyncio.Task] = set()
+        self.metrics = {
+            "messages_in": 0,
+            "messages_out": 0,
+            "updates_merged": 0,
+            "batches_flushed": 0,
+            "dropped_messages": 0,
+            "slow_disconnects": 0,
+            "presence_updates": 0,
+            "presence_broadcasts": 0,
+            "presence_published": 0,
+            "presence_evictions": 0
+        }
+        self.presence = PresenceChannel(
+            self, max_rate=presence_rate, stale_after=presence_stale_after, publish=publish_presence
+        )
+
+    def join(self, websocket: Any, user_id: str) -> CollabConnection:
+        connection = CollabConnection(websocket, user_id, max_queue=self.max_queue)
+        connection.start()
+        self.connections[user_id] = connection
+        return connection
+
+    async def leave(self, connection: CollabConnection):
+        if self.connections.get(connection.user_id) is connection:
+            del self.connections[connection.user_id]
+            self.presence.remove(connection.user_id)
+        await connection.close()
+
+    def broadcast(
+        self,
+        message: Union[bytes, str],
+        exclude: Optional[CollabConnection] = None,
+        droppable: bool = False
+    ):
+        """Fan a message out to every other connection without awaiting any of them"""
+        self.metrics["messages_in"] += 1
+        self._fan_out(message, {exclude} if exclude else set(), droppable)
+
+    def broadcast_update(self, update: bytes, origin: Optional[CollabConnection] = None):
+        """Broadcast a CRDT update, coalescing it with others in the batching window"""
+        if self.batch_interval <= 0:
+            self.broadcast(update, exclude=origin)
+            return
+
+        self.metrics["messages_in"] += 1
+        self._pending_updates.append((update, origin))
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.batch_interval, self.flush_updates)
+
+    def flush_updates(self):
+        """Send one merged update per peer for everything received in the window"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending_updates = self._pending_updates, []
+        if not pending:
+            return
+
+        self.metrics["batches_flushed"] += 1
+        self.metrics["updates_merged"] += len(pending)
+        merged = self._merge([update for update, _ in pending])
+
+        # Peers that sent nothing get everything; senders get everything but their own edits
+        origins = {origin for _, origin in pending if origin is not None}
+        self._fan_out(merged, origins, droppable=False)
+        for origin in origins:
+            if origin.user_id not in self.connections:
+                continue
+            others = [update for update, sender in pending if sender is not origin]
+            if others:
+                self._send(origin, self._merge(others), droppable=False)
+
+    def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending_updates = []
+        self.presence.close()
+
+    @staticmethod
+    def _merge(updates: List[bytes]) -> bytes:
+        return updates[0] if len(updates) == 1 else merge_updates(*updates)
+
+    def _fan_out(self, message: Union[bytes, str], exclude: Set[CollabConnection], droppable: bool):
+        for connection in list(self.connections.values()):
+            if connection not in exclude:
+                self._send(connection, message, droppable)
+
+    def _send(self, connection: CollabConnection, message: Union[bytes, str], droppable: bool):
+        dropped_before = connection.dropped_messages
+        if not connection.enqueue(message, droppable=droppable):
+            self.metrics["slow_disconnects"] += 1
+            logger.warning(
+                f"Disconnecting slow client {connection.user_id} from project {self.project_id}"
+            )
+            self.connections.pop(connection.user_id, None)
+            task = asyncio.create_task(connection.close(code=CLOSE_TRY_AGAIN_LATER))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        elif connection.dropped_messages > dropped_before:
+            self.metrics["dropped_messages"] += 1
+        else:
+            self.metrics["messages_out"] += 1
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+
+class ConnectionRegistry:
+    """project_id -> CollabRoom for every project with live sockets"""
+
+    def __init__(
+        self,
+        max_queue: int = 256,
+        batch_interval: float = 0.0,
+        presence_rate: float = 15.0,
+        presence_stale_after: float = 30.0
+    ):
+        self.max_queue = max_queue
+        self.batch_interval = batch_interval
+        self.presence_rate = presence_rate
+        self.presence_stale_after = presence_stale_after
+        # Called as (project_id, changed users, removed ids) at the capped presence rate
+        self.publish_presence: Optional[Callable[[str, Dict[str, Any], List[str]], None]] = None
+        self.rooms: Dict[str, CollabRoom] = {}
+
+    def get_room(self, project_id: str) -> CollabRoom:
+        if project_id not in self.rooms:
+            publish = None
+            if self.publish_presence is not None:
+                publish = functools.partial(self.publish_presence, project_id)
+            self.rooms[project_id] = CollabRoom(
+                project_id,
+                max_queue=self.max_queue,
+                batch_interval=self.batch_interval,
+                presence_rate=self.presence_rate,
+                presence_stale_after=self.presence_stale_after,
+                publish_presence=publish
+            )
+        return self.rooms[project_id]
+
+    def join(self, project_id: str, websocket: Any, user_id: str) -> CollabConnection:
+        return self.get_room(project_id).join(websocket, user_id)
+
+    async def leave(self, project_id: str, connection: CollabConnection):
+        room = self.rooms.get(project_id)
+        if room is None:
+            return
+        await room.leave(connection)
+        if not room.connections:
+            room.close()
+            del self.rooms[project_id]
+
+    def broadcast(
+        self,
+        project_id: str,
+        message: Union[bytes, str],
+        exclude: Optional[CollabConnection] = None,
+        droppable: bool = False
+    ):
+        room = self.rooms.get(project_id)
+        if room:
+            room.broadcast(message, exclude=exclude, droppable=droppable)
+
+    def broadcast_update(self, project_id: str, update: bytes, origin: Optional[CollabConnection] = None):
+        room = self.rooms.get(project_id)
+        if room:
+            room.broadcast_update(update, origin=origin)
+
+    def update_presence(self, project_id: str, user_id: str, state: Any, local: bool = True):
+        """Record a user's awareness state; None removes the user. `local=False` for relayed state."""
+        room = self.rooms.get(project_id)
+        if room is None:
+            return
+        if state is None:
+            room.presence.remove(user_id, local=local)
+        else:
+            room.presence.update(user_id, state, local=local)
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            project_id: {**room.metrics, "connections": len(room)}
+            for project_id, room in self.rooms.items()
+        }
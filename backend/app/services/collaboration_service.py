@@ -1,5 +1,9 @@
 from typing import Dict, List, Any, Optional
+import base64
 import json
+import os
+import time
+import uuid
 import asyncio
 from datetime import datetime
 try:
@@ -9,68 +13,450 @@ except ImportError:
 
 from pycrdt import Doc, Map, Array
 
-from app.services.otio_schema import otio_to_yjs, yjs_to_otio
+from app.services.otio_schema import otio_to_yjs, yjs_to_otio, update_map_fields
+from app.services.collab_room import ConnectionRegistry
+from app.services.timeline_index import TimelineIndex
+from app.services.otio_stream import OTIOStreamParser, clip_fields_from_otio
+from app.services.timeline_snapshot import build_snapshot
+from app.services.mcp_cache import mcp_read_cache
+from app.services.collab_persistence import TimelineStore, WriteBehindPersistence
+from app.services.collab_relay import (
+    CollabRelay, create_relay_bus,
+    KIND_UPDATE, KIND_AWARENESS, KIND_SYNC_REQUEST, KIND_SYNC_REPLY
+)
+from app.core.paths import data_path
+
+# An update that carries no structs and no deletions
+EMPTY_UPDATE_SIZE = 2
 
 class CollaborativeTimeline:
     """
     Manages a single collaborative video editing session using pycrdt.
     Acts as the Authoritative Server State.
     """
-    def __init__(self, project_id: str):
+    def __init__(
+        self,
+        project_id: str,
+        initial_state: Optional[bytes] = None,
+        persistence: Optional[WriteBehindPersistence] = None,
+        relay: Optional[CollabRelay] = None
+    ):
         self.project_id = project_id
         self.doc = Doc()
+        self.persistence = persistence
+        self.relay = relay
+        self._applying_remote = False
         
         if "tracks" not in self.doc:
             with self.doc.transaction():
                 self.doc["tracks"] = Array()
         
+        # Restore persisted state before anything is recorded, so it isn't logged twice
+        if initial_state:
+            self.doc.apply_update(initial_state)
+        self._persist_subscription = None
+        if persistence or relay:
+            self._persist_subscription = self.doc.observe(self._on_local_update)
+        
         y_tracks = self.doc["tracks"]
         if len(y_tracks) == 0:
-            # Create default OTIO structure
+            # Create default OTIO structure under a fixed client id, so workers that
+            # create it concurrently produce identical CRDT items instead of two tracks
             timeline = otio.schema.Timeline(name=f"Project {project_id}")
             timeline.tracks.append(otio.schema.Track(name="Default Track"))
-            otio_to_yjs(timeline, self.doc)
+            default_doc = Doc(client_id=0)
+            otio_to_yjs(timeline, default_doc)
+            self.doc.apply_update(default_doc.get_update())
+        
+        # Clip id -> (track, position) and per-track time intervals, kept in sync by observe events
+        self.index = TimelineIndex(self.doc)
+        # Any edit (local, client or relayed) makes cached MCP reads of this project stale
+        self._cache_subscription = self.doc.observe(self._invalidate_reads)
             
         self.active_users: Dict[str, Any] = {} # user_id -> awareness state
 
-    def get_update(self) -> bytes:
-        """Get the full state update to send to new clients"""
+    def get_update(self, state_vector: Optional[bytes] = None) -> bytes:
+        """
+        Get the update to send to a client (Yjs Sync Step 2).
+        With the client's state vector only the missing diff is returned;
+        without one (or with an unreadable one) the full state is sent.
+        """
+        if state_vector:
+            try:
+                return self.doc.get_update(state_vector)
+            except Exception:
+                print(f"[COLLAB] Invalid state vector for project {self.project_id}, sending full state")
         return self.doc.get_update()
 
+    def get_state_vector(self) -> bytes:
+        """Server state vector (Yjs Sync Step 1), so clients can send what we lack"""
+        return self.doc.get_state()
+
     def apply_update(self, update: bytes):
         """Apply an update from a client"""
         self.doc.apply_update(update)
 
+    def apply_remote_update(self, update: bytes):
+        """Apply an update relayed from another worker; its origin worker persists it"""
+        self._applying_remote = True
+        try:
+            self.doc.apply_update(update)
+        finally:
+            self._applying_remote = False
+
+    def _on_local_update(self, event):
+        if self._applying_remote:
+            return
+        if self.persistence:
+            self.persistence.record(self.project_id, event.update)
+        if self.relay:
+            self.relay.publish(self.project_id, KIND_UPDATE, event.update)
+
+    def _invalidate_reads(self, event):
+        mcp_read_cache.invalidate_project(self.project_id)
+
+    def ensure_track(self, track_idx: int) -> Map:
+        """Return track `track_idx`, appending it if it is the next new track"""
+        y_tracks = self.doc["tracks"]
+        if isinstance(track_idx, bool) or not isinstance(track_idx, int) or not 0 <= track_idx <= len(y_tracks):
+            raise ValueError(f"Invalid track {track_idx!r}: expected 0..{len(y_tracks)}")
+        if track_idx == len(y_tracks):
+            y_tracks.append(Map({
+                "name": f"Track {len(y_tracks)}",
+                "kind": "Video",
+                "clips": Array()
+            }))
+        return y_tracks[track_idx]
+
+    def find_clip(self, clip_id: str) -> Optional[tuple]:
+        """Locate a clip by `_id`; returns (track_idx, position, Y.Map) or None"""
+        location = self.index.locate(clip_id)
+        if location is None:
+            return None
+        track_idx, pos = location
+        y_tracks = self.doc["tracks"]
+        y_clips = y_tracks[track_idx].get("clips") if track_idx < len(y_tracks) else None
+        if y_clips is None:
+            return None
+        if pos < len(y_clips) and y_clips[pos].get("_id") == clip_id:
+            return track_idx, pos, y_clips[pos]
+        # Positions shifted inside the open transaction (e.g. an earlier remove): scan the track
+        for pos, y_clip in enumerate(y_clips):
+            if y_clip.get("_id") == clip_id:
+                return track_idx, pos, y_clip
+        return None
+
+    def clips_at(self, track_idx: int, t: float) -> List[str]:
+        """Ids of the clips on a track at time t (e.g. for scrubbing)"""
+        return self.index.clips_at(track_idx, t)
+
+    def clips_in_range(self, track_idx: int, start: float, end: float) -> List[str]:
+        """Ids of the clips on a track overlapping [start, end) (e.g. for conflict checks)"""
+        return self.index.clips_in_range(track_idx, start, end)
+
+    def apply_agent_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply one high-level agent action as targeted CRDT mutations keyed by clip `_id`.
+        Must be called inside a doc transaction. Returns a per-action result.
+        """
+        action_type = action["type"]
+        
+        if action_type == "add_clip":
+            track_idx = action.get("track", 0)
+            clip_id = str(action.get("id") or uuid.uuid4())
+            fields = {
+                "_id": clip_id,
+                "name": action["name"],
+                "media_url": action["url"],
+                "start": float(action["start"]),
+                "duration": float(action["duration"])
+            }
+            
+            existing = self.find_clip(clip_id)
+            if existing:
+                # Same id already on the timeline: treat as an idempotent update
+                update_map_fields(existing[2], fields)
+            else:
+                y_clips = self.ensure_track(track_idx)["clips"]
+                y_clips.append(Map(fields))
+                self.index.record_append(track_idx, clip_id, len(y_clips) - 1)
+            print(f"[COLLAB] Agent added clip '{action['name']}' to Track {track_idx}")
+            return {"type": action_type, "clip_id": clip_id}
+        
+        if action_type == "update_clip":
+            existing = self.find_clip(str(action["id"]))
+            if not existing:
+                raise ValueError(f"Clip {action['id']} not found")
+            fields = {k: action[k] for k in ("name", "start", "duration") if k in action}
+            if "url" in action:
+                fields["media_url"] = action["url"]
+            for key in ("start", "duration"):
+                if key in fields:
+                    fields[key] = float(fields[key])
+            update_map_fields(existing[2], fields)
+            return {"type": action_type, "clip_id": str(action["id"])}
+        
+        if action_type == "remove_clip":
+            existing = self.find_clip(str(action["id"]))
+            if not existing:
+                raise ValueError(f"Clip {action['id']} not found")
+            track_idx, pos, _ = existing
+            del self.doc["tracks"][track_idx]["clips"][pos]
+            return {"type": action_type, "clip_id": str(action["id"])}
+        
+        raise ValueError(f"Unknown action type: {action_type}")
+
     def to_otio(self) -> otio.schema.Timeline:
         """Export current state to OTIO"""
         return yjs_to_otio(self.doc)
 
+    def to_snapshot(self) -> bytes:
+        """Columnar binary snapshot for read-only consumers (see timeline_snapshot)"""
+        return build_snapshot(self.doc)
+
     async def save_to_db(self):
-        """Persist state to DB (Simulated with actual binary update)"""
+        """
+        Persist state to DB.
+        With write-behind persistence every update is already in the log buffer,
+        so this only flushes pending updates now instead of re-serializing the doc.
+        """
+        if self.persistence:
+            await self.persistence.flush(self.project_id)
+            print(f"[PERSIST] Flushed project {self.project_id} update log")
+            return
         binary_blob = self.doc.get_update()
         print(f"[PERSIST] Saved project {self.project_id} ({len(binary_blob)} bytes)")
         # In production: await supabase.table("projects").update({"otio_binary": list(binary_blob)}).eq("id", self.project_id)
 
+    def close(self):
+        """Detach from persistence and the relay before the session is dropped from memory"""
+        if self._persist_subscription is not None:
+            self.doc.unobserve(self._persist_subscription)
+            self._persist_subscription = None
+        if self._cache_subscription is not None:
+            self.doc.unobserve(self._cache_subscription)
+            self._cache_subscription = None
+        self.index.close()
+
     async def load_from_db(self, binary_data: Optional[bytes] = None):
         """Load state from DB (Simulated)"""
         if binary_data:
             self.doc.apply_update(binary_data)
         print(f"[PERSIST] Loaded project {self.project_id}")
 
+def encode_state_vector(state_vector: bytes) -> str:
+    """Encode a state vector for JSON text frames and query strings"""
+    return base64.urlsafe_b64encode(state_vector).decode("ascii")
+
+
+def decode_state_vector(value: Optional[str]) -> Optional[bytes]:
+    """Decode a base64 (standard or URL-safe) state vector; None if absent or malformed"""
+    if not value:
+        return None
+    try:
+        value = value.replace("+", "-").replace("/", "_")
+        return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    except (ValueError, TypeError):
+        return None
+
 class CollaborationService:
     """
     Service to manage multiple collaborative sessions.
     Integrates Human (WebSocket) and Agent (Direct) edits.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        persistence: Optional[WriteBehindPersistence] = None,
+        relay: Optional[CollabRelay] = None
+    ):
         self.sessions: Dict[str, CollaborativeTimeline] = {}
+        # Write-behind update log + snapshots (COLLAB_DB_PATH, default $DATA_DIR/collab_timelines.db)
+        self.persistence = persistence or WriteBehindPersistence(
+            TimelineStore(os.getenv("COLLAB_DB_PATH") or data_path("collab_timelines.db")),
+            debounce=float(os.getenv("COLLAB_FLUSH_DEBOUNCE_MS", "500")) / 1000,
+            compact_threshold=int(os.getenv("COLLAB_COMPACT_BYTES", str(1 << 20)))
+        )
+        # Live WebSocket connections per project, for fan-out of updates.
+        # Updates are coalesced per room for COLLAB_BATCH_INTERVAL_MS (0 disables batching).
+        # Presence is broadcast at most COLLAB_PRESENCE_HZ times per second per room.
+        self.connections = ConnectionRegistry(
+            batch_interval=float(os.getenv("COLLAB_BATCH_INTERVAL_MS", "50")) / 1000,
+            presence_rate=float(os.getenv("COLLAB_PRESENCE_HZ", "15")),
+            presence_stale_after=float(os.getenv("COLLAB_PRESENCE_STALE_SECONDS", "30"))
+        )
+        # Sessions with no sockets and no activity for this long are persisted and dropped
+        self.idle_grace = float(os.getenv("COLLAB_IDLE_GRACE_SECONDS", "60"))
+        # Cross-worker relay (COLLAB_RELAY_URL); without one, rooms only span this process
+        if relay is None:
+            bus = create_relay_bus(os.getenv("COLLAB_RELAY_URL"))
+            relay = CollabRelay(bus) if bus else None
+        self.relay = relay
+        if relay:
+            relay.on_resync(self._request_sync)
+            self.connections.publish_presence = self._publish_presence
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._last_activity: Dict[str, float] = {}
+        self._idle_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._hibernations: set = set()
+        # Sessions kept resident by a long-running server-side operation (e.g. a streamed import)
+        self._pinned: Dict[str, int] = {}
+        self.metrics = {"sessions_loaded": 0, "sessions_hibernated": 0, "coalesced_loads": 0}
 
     async def get_or_create_session(self, project_id: str) -> CollaborativeTimeline:
-        if project_id not in self.sessions:
-            session = CollaborativeTimeline(project_id)
+        """
+        Return the live session, loading it lazily (e.g. after hibernation).
+        Concurrent first-openers share one load future, so a doc is never loaded twice.
+        """
+        session = self.sessions.get(project_id)
+        if session is not None:
+            self._touch(project_id)
+            return session
+        
+        loading = self._loading.get(project_id)
+        if loading is not None:
+            self.metrics["coalesced_loads"] += 1
+            return await asyncio.shield(loading)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._loading[project_id] = future
+        try:
+            initial_state = await self.persistence.load(project_id)
+            session = CollaborativeTimeline(
+                project_id, initial_state, persistence=self.persistence, relay=self.relay
+            )
             await session.load_from_db()
             self.sessions[project_id] = session
-        return self.sessions[project_id]
+            if self.relay:
+                # Ask peers holding this project for anything not yet in the shared store
+                try:
+                    await self.relay.attach(
+                        project_id,
+                        lambda kind, payload: self._on_relay_message(project_id, kind, payload),
+                        state_vector=session.get_state_vector()
+                    )
+                except OSError as e:
+                    print(f"[COLLAB] Relay unavailable for project {project_id}, editing locally only: {e}")
+            self.metrics["sessions_loaded"] += 1
+            future.set_result(session)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when there are no other openers
+            raise
+        finally:
+            del self._loading[project_id]
+        
+        self._touch(project_id)
+        return session
+
+    def join(self, project_id: str, websocket: Any, user_id: str):
+        """Register a socket; a connected session is never hibernated"""
+        timer = self._idle_timers.pop(project_id, None)
+        if timer:
+            timer.cancel()
+        return self.connections.join(project_id, websocket, user_id)
+
+    async def leave(self, project_id: str, connection):
+        """Unregister a socket; the last one leaving starts the idle grace period"""
+        # The room publishes the user's removal to other workers
+        await self.connections.leave(project_id, connection)
+        self._touch(project_id)
+
+    def _touch(self, project_id: str):
+        """Record activity and make sure an idle check is scheduled for socket-less sessions"""
+        loop = asyncio.get_running_loop()
+        self._last_activity[project_id] = loop.time()
+        if project_id in self.connections.rooms or project_id in self._idle_timers:
+            return
+        self._idle_timers[project_id] = loop.call_later(self.idle_grace, self._idle_check, project_id)
+
+    def _idle_check(self, project_id: str):
+        self._idle_timers.pop(project_id, None)
+        if project_id in self.connections.rooms or project_id not in self.sessions:
+            return
+        
+        loop = asyncio.get_running_loop()
+        idle_for = loop.time() - self._last_activity.get(project_id, 0.0)
+        if idle_for < self.idle_grace:
+            # Activity since the timer was set: check again when the grace period really ends
+            self._idle_timers[project_id] = loop.call_later(
+                self.idle_grace - idle_for, self._idle_check, project_id
+            )
+            return
+        
+        task = asyncio.create_task(self.hibernate(project_id))
+        self._hibernations.add(task)
+        task.add_done_callback(self._hibernations.discard)
+
+    async def hibernate(self, project_id: str) -> bool:
+        """Persist an idle session and drop its Y.Doc from memory"""
+        session = self.sessions.get(project_id)
+        if session is None or project_id in self.connections.rooms or project_id in self._pinned:
+            return False
+        
+        activity_before = self._last_activity.get(project_id)
+        await self.persistence.flush(project_id)
+        
+        # Someone connected, edited or pinned the session while we were flushing: stay resident
+        if (
+            project_id in self.connections.rooms
+            or project_id in self._pinned
+            or self._last_activity.get(project_id) != activity_before
+        ):
+            return False
+        
+        del self.sessions[project_id]
+        self._last_activity.pop(project_id, None)
+        session.close()
+        self.persistence.forget(project_id)
+        if self.relay:
+            await self.relay.detach(project_id)
+        self.metrics["sessions_hibernated"] += 1
+        print(f"[COLLAB] Hibernated idle project {project_id}")
+        return True
+
+    def update_presence(self, project_id: str, user_id: str, state: Any):
+        """
+        Record a user's awareness state. Other workers get it from the room's
+        rate-capped presence flush (see _publish_presence), not per message.
+        """
+        self.connections.update_presence(project_id, user_id, state)
+
+    def _publish_presence(self, project_id: str, users: Dict[str, Any], removed: List[str]):
+        """Relay this worker's coalesced presence deltas for a room"""
+        message = json.dumps({"users": users, "removed": removed})
+        self.relay.publish(project_id, KIND_AWARENESS, message.encode("utf-8"))
+
+    def _on_relay_message(self, project_id: str, kind: bytes, payload: bytes):
+        """Apply/fan out a message published by another worker"""
+        session = self.sessions.get(project_id)
+        if session is None:
+            return
+        
+        if kind == KIND_UPDATE:
+            session.apply_remote_update(payload)
+            self.connections.broadcast_update(project_id, payload)
+        elif kind == KIND_SYNC_REPLY:
+            # Several peers may answer; only forward what is actually new here
+            state_before = session.get_state_vector()
+            session.apply_remote_update(payload)
+            diff = session.get_update(state_before)
+            if len(diff) > EMPTY_UPDATE_SIZE:
+                self.connections.broadcast_update(project_id, diff)
+        elif kind == KIND_SYNC_REQUEST:
+            diff = session.get_update(payload)
+            if len(diff) > EMPTY_UPDATE_SIZE:
+                self.relay.publish(project_id, KIND_SYNC_REPLY, diff)
+        elif kind == KIND_AWARENESS:
+            presence = json.loads(payload)
+            for user_id, state in presence["users"].items():
+                self.connections.update_presence(project_id, user_id, state, local=False)
+            for user_id in presence["removed"]:
+                self.connections.update_presence(project_id, user_id, None, local=False)
+
+    def _request_sync(self, project_id: str):
+        session = self.sessions.get(project_id)
+        if session is not None:
+            self.relay.publish(project_id, KIND_SYNC_REQUEST, session.get_state_vector())
 
     async def handle_agent_action(self, project_id: str, action: Dict[str, Any]):
         """
@@ -78,38 +464,154 @@ class CollaborationService:
         Translates 'high level' actions to CRDT mutations.
         """
         session = await self.get_or_create_session(project_id)
+        state_before = session.doc.get_state()
         
-        # 1. Access Data via Schema
-        timeline = session.to_otio()
+        # Targeted CRDT mutation instead of an OTIO round-trip of the whole timeline
+        with session.doc.transaction():
+            result = session.apply_agent_action(action)
         
-        if action["type"] == "add_clip":
-            track_idx = action.get("track", 0)
-            
-            # Ensure track exists
-            while len(timeline.tracks) <= track_idx:
-                timeline.tracks.append(otio.schema.Track(name=f"Track {len(timeline.tracks)}"))
-                
-            track = timeline.tracks[track_idx]
-            
-            clip = otio.schema.Clip(
-                name=action["name"],
-                media_reference=otio.schema.ExternalReference(target_url=action["url"]),
-                source_range=otio.opentime.TimeRange(
-                    start_time=otio.opentime.RationalTime(float(action["start"]) * 24, 24),
-                    duration=otio.opentime.RationalTime(float(action["duration"]) * 24, 24)
-                )
-            )
-            # Add metadata for stability
-            clip.metadata["flowai_id"] = str(action.get("id"))
-            
-            track.append(clip)
-            print(f"[COLLAB] Agent added clip '{action['name']}' to Track {track_idx}")
+        # Push the agent's edit to connected humans; persistence picks it up write-behind
+        self.connections.broadcast_update(project_id, session.doc.get_update(state_before))
+        return {"status": "success", "project_id": project_id, **result}
 
-        # Sync back to Doc
-        otio_to_yjs(timeline, session.doc)
+    async def import_otio_stream(self, project_id: str, chunks, batch_size: int = 500) -> Dict[str, Any]:
+        """
+        Feed an OTIO JSON byte stream (sync or async iterable of chunks) into the live timeline.
+        Clips are applied in transactions of at most `batch_size`, each broadcast to
+        connected clients, so neither the document nor the CRDT update is ever held whole.
+        OTIO tracks map onto timeline tracks by position; clips matching an existing
+        `_id` are updated in place, others are appended.
+        Invalid JSON raises ValueError if nothing was applied yet; once batches have been
+        committed and broadcast, returns status "partial" with the error and what was applied.
+        """
+        session = await self.get_or_create_session(project_id)
+        # Without a socket the import is the only activity: keep the session from hibernating under it
+        self._pinned[project_id] = self._pinned.get(project_id, 0) + 1
+        try:
+            return await self._import_otio_stream(session, chunks, batch_size)
+        finally:
+            self._pinned[project_id] -= 1
+            if not self._pinned[project_id]:
+                del self._pinned[project_id]
+            self._touch(project_id)
+    
+    async def _import_otio_stream(self, session: CollaborativeTimeline, chunks, batch_size: int) -> Dict[str, Any]:
+        project_id = session.project_id
+        parser = OTIOStreamParser()
+        stats = {"tracks": 0, "clips": 0, "batches": 0, "update_bytes": 0}
+        batch: List[tuple] = []
+        track_idx = -1
+        
+        def apply_events(events):
+            nonlocal track_idx
+            for kind, fields in events:
+                if kind == "track_start":
+                    track_idx += 1
+                    batch.append(("track", track_idx, fields))
+                elif kind == "track_end":
+                    batch.append(("track", track_idx, fields))
+                elif kind == "clip" and track_idx >= 0:
+                    batch.append(("clip", track_idx, clip_fields_from_otio(fields)))
+        
+        async def flush():
+            if not batch:
+                return
+            state_before = session.doc.get_state()
+            with session.doc.transaction():
+                self._apply_import_batch(session, batch)
+            # Counts cover applied batches only, so a partial import reports what landed
+            stats["tracks"] = batch[-1][1] + 1
+            stats["clips"] += sum(1 for kind, _, _ in batch if kind == "clip")
+            batch.clear()
+            update = session.doc.get_update(state_before)
+            stats["batches"] += 1
+            stats["update_bytes"] += len(update)
+            self.connections.broadcast_update(project_id, update)
+            await asyncio.sleep(0)  # Let sockets and other sessions run between batches
+        
+        try:
+            if hasattr(chunks, "__aiter__"):
+                async for chunk in chunks:
+                    apply_events(parser.feed(chunk))
+                    if len(batch) >= batch_size:
+                        await flush()
+            else:
+                for chunk in chunks:
+                    apply_events(parser.feed(chunk))
+                    if len(batch) >= batch_size:
+                        await flush()
+            apply_events(parser.close())
+        except ValueError as e:
+            if not stats["batches"]:
+                raise
+            # Earlier batches are already on the timeline and with clients: report them
+            await session.save_to_db()
+            return {"status": "partial", "project_id": project_id, "error": str(e), **stats}
+        await flush()
         
-        # Auto-save
         await session.save_to_db()
-        return {"status": "success", "project_id": project_id}
+        return {"status": "success", "project_id": project_id, **stats}
+
+    @staticmethod
+    def _apply_import_batch(session: CollaborativeTimeline, batch: List[tuple]):
+        """Apply queued track/clip imports; must run inside a doc transaction"""
+        # Resolve existing clips once per batch; the index picks up the appends at commit
+        existing = {}
+        for kind, _, fields in batch:
+            if kind == "clip":
+                found = session.find_clip(fields["_id"])
+                if found:
+                    existing[fields["_id"]] = found[2]
+        
+        for kind, track_idx, fields in batch:
+            if kind == "track":
+                track_fields = {k: fields[k] for k in ("name", "kind") if isinstance(fields.get(k), str)}
+                update_map_fields(session.ensure_track(track_idx), track_fields)
+            elif fields["_id"] in existing:
+                update_map_fields(existing[fields["_id"]], fields)
+            else:
+                y_clips = session.ensure_track(track_idx)["clips"]
+                y_clips.append(Map(fields))
+                existing[fields["_id"]] = y_clips[len(y_clips) - 1]
+
+    async def handle_agent_actions(self, project_id: str, actions: List[Dict[str, Any]]):
+        """
+        Applies a batch of agent actions in a single CRDT transaction.
+        Emits one update to connected clients and persists once.
+        Failed actions are reported per-action and do not stop the batch.
+        """
+        started = time.perf_counter()
+        session = await self.get_or_create_session(project_id)
+        state_before = session.doc.get_state()
+        
+        results = []
+        with session.doc.transaction():
+            for action in actions:
+                try:
+                    results.append({"status": "success", **session.apply_agent_action(action)})
+                except (KeyError, ValueError, TypeError) as e:
+                    results.append({"status": "error", "type": action.get("type"), "error": str(e)})
+        applied_at = time.perf_counter()
+        
+        update = session.doc.get_update(state_before)
+        self.connections.broadcast_update(project_id, update)
+        
+        await session.save_to_db()
+        finished = time.perf_counter()
+        
+        failed = sum(1 for r in results if r["status"] == "error")
+        return {
+            "status": "success" if not failed else ("partial" if failed < len(results) else "error"),
+            "project_id": project_id,
+            "applied": len(results) - failed,
+            "failed": failed,
+            "update_bytes": len(update),
+            "results": results,
+            "timing_ms": {
+                "apply": (applied_at - started) * 1000,
+                "persist": (finished - applied_at) * 1000,
+                "total": (finished - started) * 1000
+            }
+        }
 
 collaboration_service = CollaborationService()
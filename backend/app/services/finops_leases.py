@@ -0,0 +1,400 @@
+"""
+FinOps Credit Leases - Local credit slices for distributed budget gating
+
+With several API workers, a central balance store is the source of truth,
+but a round trip per tool call is too slow. Instead each worker reserves a
+slice of a tenant's credit (a lease) and spends it locally; when the slice
+runs low it is renewed in the background, and leases left idle for
+`lease_ttl` are returned so other workers can use the credit.
+
+Guarantees:
+- Credit is deducted centrally before it is spent locally, so without
+  overdraft the tenant can never spend more than its central balance.
+- With `max_overdraft` > 0, a worker whose slice ran out may keep spending
+  while its renewal is in flight, but never more than `max_overdraft` per
+  tenant beyond what it reserved. Total overspend for a tenant is therefore
+  bounded by workers x max_overdraft; the debt is settled by the next
+  reservation (or debited centrally when the lease is returned).
+- Once the store has run dry for a tenant, further spends are rejected
+  locally for `exhausted_backoff` seconds instead of hammering the store.
+- Credit stranded in other workers' leases is bounded by workers x slice_size.
+- Setting a balance starts a new epoch. Leases taken before it can still spend
+  what they hold, but their unspent credit and debt are never returned into the
+  new balance, and their next reservation starts from zero.
+
+InMemoryCreditStore is a local stand-in for the central store (tests and
+single-host development); RedisCreditStore does the same with one atomic
+script per operation.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger("finops.leases")
+
+
+class CreditStore:
+    """
+    Central tenant balances. Amounts are USD credits.
+    Each set_balance() bumps the tenant's epoch; releases from an older epoch are ignored.
+    """
+
+    async def reserve(self, tenant_id: str, amount: float) -> Tuple[float, float, int]:
+        """Atomically take up to `amount`; returns (granted, balance left, epoch)"""
+        raise NotImplementedError
+
+    async def release(self, tenant_id: str, amount: float, epoch: int) -> float:
+        """
+        Give back unspent credit (negative settles an overdraft) reserved in `epoch`;
+        a no-op if the balance was set since. Returns the balance.
+        """
+        raise NotImplementedError
+
+    async def set_balance(self, tenant_id: str, amount: float):
+        """Set the balance and start a new epoch"""
+        raise NotImplementedError
+
+    async def get_balance(self, tenant_id: str) -> float:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemoryCreditStore(CreditStore):
+    """Process-local stand-in for the central store; `latency` simulates the round trip"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._balances: Dict[str, float] = {}
+        self._epochs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"reserves": 0, "releases": 0}
+
+    async def _round_trip(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def reserve(self, tenant_id: str, amount: float) -> Tuple[float, float, int]:
+        await self._round_trip()
+        with self._lock:
+            balance = self._balances.get(tenant_id, 0.0)
+            granted = max(0.0, min(amount, balance))
+            self._balances[tenant_id] = balance - granted
+            self.metrics["reserves"] += 1
+            return granted, balance - granted, self._epochs.get(tenant_id, 0)
+
+    async def release(self, tenant_id: str, amount: float, epoch: int) -> float:
+        await self._round_trip()
+        with self._lock:
+            balance = self._balances.get(tenant_id, 0.0)
+            if epoch == self._epochs.get(tenant_id, 0):
+                balance += amount
+                self._balances[tenant_id] = balance
+            self.metrics["releases"] += 1
+            return balance
+
+    async def set_balance(self, tenant_id: str, amount: float):
+        with self._lock:
+            self._balances[tenant_id] = amount
+            self._epochs[tenant_id] = self._epochs.get(tenant_id, 0) + 1
+
+    async def get_balance(self, tenant_id: str) -> float:
+        with self._lock:
+            return self._balances.get(tenant_id, 0.0)
+
+
+# KEYS[1] = balance key, KEYS[2] = epoch key, ARGV[1] = amount; returns {granted, left, epoch} as strings
+_RESERVE_SCRIPT = """
+local balance = tonumber(redis.call('GET', KEYS[1]) or '0')
+local granted = math.max(0, math.min(tonumber(ARGV[1]), balance))
+redis.call('SET', KEYS[1], tostring(balance - granted))
+return {tostring(granted), tostring(balance - granted), redis.call('GET', KEYS[2]) or '0'}
+"""
+
+# KEYS as above, ARGV[1] = amount, ARGV[2] = epoch of the lease; returns the balance
+_RELEASE_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+  return redis.call('GET', KEYS[1]) or '0'
+end
+return redis.call('INCRBYFLOAT', KEYS[1], ARGV[1])
+"""
+
+# KEYS as above, ARGV[1] = new balance
+_SET_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1])
+return redis.call('INCR', KEYS[2])
+"""
+
+
+class RedisCreditStore(CreditStore):
+    """Balances in Redis, one key per tenant; reserve is a single Lua script"""
+
+    def __init__(self, url: str, key_prefix: str = "finops:credits:"):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self._prefix = key_prefix
+        self._reserve = self._redis.register_script(_RESERVE_SCRIPT)
+        self._release = self._redis.register_script(_RELEASE_SCRIPT)
+        self._set = self._redis.register_script(_SET_SCRIPT)
+
+    def _keys(self, tenant_id: str):
+        return [self._prefix + tenant_id, self._prefix + tenant_id + ":epoch"]
+
+    async def reserve(self, tenant_id: str, amount: float) -> Tuple[float, float, int]:
+        granted, left, epoch = await self._reserve(keys=self._keys(tenant_id), args=[amount])
+        return float(granted), float(left), int(epoch)
+
+    async def release(self, tenant_id: str, amount: float, epoch: int) -> float:
+        return float(await self._release(keys=self._keys(tenant_id), args=[amount, epoch]))
+
+    async def set_balance(self, tenant_id: str, amount: float):
+        await self._set(keys=self._keys(tenant_id), args=[amount])
+
+    async def get_balance(self, tenant_id: str) -> float:
+        value = await self._redis.get(self._prefix + tenant_id)
+        return float(value) if value is not None else 0.0
+
+    async def close(self):
+        await self._redis.close()
+
+
+def create_credit_store(url: Optional[str]) -> Optional[CreditStore]:
+    """Build the central store from FINOPS_CREDIT_STORE_URL; None disables lease mode"""
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return InMemoryCreditStore()
+    if scheme in ("redis", "rediss"):
+        return RedisCreditStore(url)
+    raise ValueError(f"Unsupported credit store URL: {url}")
+
+
+class _Lease:
+    __slots__ = ("remaining", "overdraft", "central_balance", "last_used", "renewing", "exhausted_at", "epoch", "returned")
+
+    def __init__(self, now: float):
+        self.remaining = 0.0
+        self.overdraft = 0.0
+        # Store epoch the lease's credit was reserved in (None before the first reservation)
+        self.epoch: Optional[int] = None
+        # Handed back to the store; a reservation still in flight must not revive it
+        self.returned = False
+        # Central balance as of the last reservation (what other workers had not yet leased)
+        self.central_balance = 0.0
+        self.last_used = now
+        self.renewing: Optional[asyncio.Future] = None
+        # When the central store last had nothing left to grant
+        self.exhausted_at: Optional[float] = None
+
+
+class CreditLeaseManager:
+    """Per-tenant credit leases held by this worker"""
+
+    def __init__(
+        self,
+        store: CreditStore,
+        slice_size: float = 1.0,
+        low_watermark: float = 0.25,
+        lease_ttl: float = 30.0,
+        max_overdraft: float = 0.0,
+        exhausted_backoff: float = 1.0
+    ):
+        self.store = store
+        self.slice_size = slice_size
+        # Renew in the background once a lease drops below this fraction of a slice
+        self.low_watermark = low_watermark * slice_size
+        self.lease_ttl = lease_ttl
+        self.max_overdraft = max_overdraft
+        # After the store runs dry, reject locally for this long instead of asking again
+        self.exhausted_backoff = exhausted_backoff
+        self._leases: Dict[str, _Lease] = {}
+        self._lock = threading.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._reaper: Optional[asyncio.Task] = None
+        self.metrics = {
+            "local_spends": 0,
+            "overdraft_spends": 0,
+            "reservations": 0,
+            "credit_reserved": 0.0,
+            "credit_returned": 0.0,
+            "reserve_errors": 0,
+            "exhausted_rejections": 0
+        }
+
+    def try_spend(self, tenant_id: str, cost: float) -> bool:
+        """Spend from the local lease without a round trip; False means a reservation is needed"""
+        with self._lock:
+            lease = self._leases.get(tenant_id)
+            if lease is None:
+                return False
+            lease.last_used = time.monotonic()
+            if lease.remaining >= cost:
+                lease.remaining -= cost
+                self.metrics["local_spends"] += 1
+            elif (
+                cost - lease.remaining <= self.max_overdraft - lease.overdraft
+                and cost - lease.remaining <= lease.central_balance
+            ):
+                # The central store had enough at last contact: bridge on bounded credit, settle on renewal
+                lease.overdraft += cost - lease.remaining
+                lease.remaining = 0.0
+                self.metrics["overdraft_spends"] += 1
+            else:
+                return False
+            renew = lease.remaining < self.low_watermark and lease.renewing is None
+        if renew:
+            self._renew_in_background(tenant_id)
+        return True
+
+    def available(self, tenant_id: str) -> float:
+        """
+        Best local view of the tenant's credit: central balance at last contact + this
+        worker's lease. 0.0 if this worker holds no lease; balance() asks the store then.
+        """
+        with self._lock:
+            lease = self._leases.get(tenant_id)
+            if lease is None:
+                return 0.0
+            return lease.central_balance + lease.remaining - lease.overdraft
+
+    async def balance(self, tenant_id: str) -> float:
+        """The tenant's credit: local view with a lease, else the central balance"""
+        with self._lock:
+            lease = self._leases.get(tenant_id)
+            if lease is not None and lease.epoch is not None:
+                return lease.central_balance + lease.remaining - lease.overdraft
+        return await self.store.get_balance(tenant_id)
+
+    async def refill(self, tenant_id: str, needed: float = 0.0) -> bool:
+        """
+        Reserve at least a slice (or `needed`) from the central store; concurrent
+        callers share a renewal. False once the store grants nothing (or fails).
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                lease = self._leases.get(tenant_id)
+                if lease is None:
+                    lease = self._leases[tenant_id] = _Lease(time.monotonic())
+                if (
+                    lease.exhausted_at is not None
+                    and lease.central_balance <= 0
+                    and time.monotonic() - lease.exhausted_at < self.exhausted_backoff
+                ):
+                    self.metrics["exhausted_rejections"] += 1
+                    return False
+                pending = lease.renewing
+                if pending is None or pending.get_loop() is not loop:
+                    future = lease.renewing = loop.create_future()
+                    want = max(self.slice_size, needed - lease.remaining) + lease.overdraft
+                    break
+            await asyncio.shield(pending)
+            with self._lock:
+                if lease.remaining >= needed:
+                    return True
+
+        granted = None
+        orphaned = False
+        try:
+            granted, central_balance, epoch = await self.store.reserve(tenant_id, want)
+        except Exception as e:
+            self.metrics["reserve_errors"] += 1
+            logger.warning(f"Credit reservation failed for tenant {tenant_id}: {e}")
+        finally:
+            with self._lock:
+                orphaned = lease.returned
+                if granted is not None and not orphaned:
+                    if epoch != lease.epoch:
+                        # The balance was set since: what the lease held or owed belonged to the old one
+                        lease.remaining = lease.overdraft = 0.0
+                        lease.epoch = epoch
+                    settled = min(granted, lease.overdraft)
+                    lease.overdraft -= settled
+                    lease.remaining += granted - settled
+                    lease.central_balance = central_balance
+                    lease.last_used = time.monotonic()
+                    lease.exhausted_at = lease.last_used if granted < want else None
+                lease.renewing = None
+            future.set_result(None)
+
+        if granted is None:
+            return False
+        self.metrics["reservations"] += 1
+        self.metrics["credit_reserved"] += granted
+        if orphaned:
+            # The lease was returned (e.g. reseeded) while reserving: hand the grant straight back
+            if granted:
+                await self.store.release(tenant_id, granted, epoch)
+                self.metrics["credit_returned"] += granted
+            return True  # Callers retry against a fresh lease
+        return granted > 0
+
+    def _renew_in_background(self, tenant_id: str):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop (sync caller): the next spend that runs dry reserves
+        task = loop.create_task(self.refill(tenant_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _return(self, tenant_id: str, lease: _Lease):
+        """Settle a lease already removed from _leases with the store"""
+        with self._lock:
+            net = lease.remaining - lease.overdraft
+            lease.remaining = lease.overdraft = 0.0
+            lease.returned = True
+        if net and lease.epoch is not None:
+            lease.central_balance = await self.store.release(tenant_id, net, lease.epoch)
+            self.metrics["credit_returned"] += net
+
+    async def release_idle(self) -> int:
+        """Return leases unused for lease_ttl to the central store; returns how many"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                (tenant_id, self._leases.pop(tenant_id))
+                for tenant_id, lease in list(self._leases.items())
+                if now - lease.last_used >= self.lease_ttl and lease.renewing is None
+            ]
+        for tenant_id, lease in idle:
+            await self._return(tenant_id, lease)
+        return len(idle)
+
+    async def invalidate(self, tenant_id: str):
+        """Return and drop a tenant's lease (e.g. after its central balance was reset)"""
+        with self._lock:
+            lease = self._leases.pop(tenant_id, None)
+        if lease is not None:
+            await self._return(tenant_id, lease)
+
+    def start(self, interval: Optional[float] = None):
+        """Periodically return idle leases (call from the running event loop)"""
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_forever(interval or self.lease_ttl / 2))
+
+    async def _reap_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.release_idle()
+            except Exception as e:
+                logger.warning(f"Returning idle credit leases failed: {e}")
+
+    async def close(self):
+        """Stop renewing and return every lease"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        with self._lock:
+            leases, self._leases = self._leases, {}
+        for tenant_id, lease in leases.items():
+            await self._return(tenant_id, lease)
@@ -0,0 +1,248 @@
+"""
+FinOps Ledger - Durable write-behind spend log for FinOpsService
+
+Every balance change (credit seeding and each allowed spend) is appended to
+an in-memory queue while the tenant's lock is held, so budget checks never
+wait on storage. A background thread drains the queue every
+`flush_interval` seconds and writes each batch in a single SQLite
+transaction (group commit, WAL mode). Once the log holds more than
+`compact_threshold` entries it is folded into a per-tenant balance table.
+
+On startup, balances = balance table + replay of the log, in order.
+Entries still queued when the process dies are lost, so at most
+`flush_interval` worth of spend is at risk; close() drains the queue.
+Callers check `closed` before changing balances; an entry that still
+races in after close() is written through rather than dropped.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("finops.ledger")
+
+# (tenant_id, kind, amount, feature_tag, created_at)
+LedgerEntry = Tuple[str, str, float, Optional[str], float]
+
+KIND_SET = "set"
+KIND_SPEND = "spend"
+
+Balances = Tuple[Dict[str, float], Dict[str, Dict[str, float]]]
+
+
+def _apply(credits: Dict[str, float], usage: Dict[str, Dict[str, float]], tenant_id: str, kind: str, amount: float, feature_tag: Optional[str]):
+    """Replay one entry with the same arithmetic as FinOpsService, so balances match exactly"""
+    if kind == KIND_SET:
+        credits[tenant_id] = amount
+    else:
+        credits[tenant_id] = credits.get(tenant_id, 0.0) - amount
+        tag_usage = usage.setdefault(tenant_id, {})
+        tag_usage[feature_tag] = tag_usage.get(feature_tag, 0.0) + amount
+
+
+class SpendLedgerStore:
+    """SQLite balance table + append-only spend log"""
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            if self.db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS finops_balances (
+                    tenant_id TEXT PRIMARY KEY,
+                    credits REAL NOT NULL,
+                    usage_by_tag TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS finops_ledger (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tenant_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    feature_tag TEXT,
+                    created_at REAL NOT NULL
+                );
+            """)
+        return self._conn
+
+    def append(self, entries: List[LedgerEntry]):
+        """Append a batch of entries in one transaction"""
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT INTO finops_ledger (tenant_id, kind, amount, feature_tag, created_at) VALUES (?, ?, ?, ?, ?)",
+                entries
+            )
+            db.commit()
+
+    def _replay(self, db: sqlite3.Connection) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]], Optional[int]]:
+        credits: Dict[str, float] = {}
+        usage: Dict[str, Dict[str, float]] = {}
+        for tenant_id, tenant_credits, usage_json in db.execute(
+            "SELECT tenant_id, credits, usage_by_tag FROM finops_balances"
+        ):
+            credits[tenant_id] = tenant_credits
+            tag_usage = json.loads(usage_json)
+            if tag_usage:
+                usage[tenant_id] = tag_usage
+        last_id = None
+        for last_id, tenant_id, kind, amount, feature_tag in db.execute(
+            "SELECT id, tenant_id, kind, amount, feature_tag FROM finops_ledger ORDER BY id"
+        ):
+            _apply(credits, usage, tenant_id, kind, amount, feature_tag)
+        return credits, usage, last_id
+
+    def load(self) -> Balances:
+        """(credits, usage_by_tag) for every tenant: balance table + replayed log"""
+        with self._lock:
+            credits, usage, _ = self._replay(self._db())
+        return credits, usage
+
+    def log_length(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM finops_ledger").fetchone()[0]
+
+    def compact(self) -> int:
+        """Fold the log into the balance table; returns the number of entries folded"""
+        with self._lock:
+            db = self._db()
+            credits, usage, last_id = self._replay(db)
+            if last_id is None:
+                return 0
+            now = time.time()
+            db.executemany(
+                "INSERT OR REPLACE INTO finops_balances (tenant_id, credits, usage_by_tag, updated_at) VALUES (?, ?, ?, ?)",
+                [
+                    (tenant_id, credits.get(tenant_id, 0.0), json.dumps(usage.get(tenant_id, {})), now)
+                    for tenant_id in set(credits) | set(usage)
+                ]
+            )
+            folded = db.execute("DELETE FROM finops_ledger WHERE id <= ?", (last_id,)).rowcount
+            db.commit()
+        return folded
+
+
+class SpendLedger:
+    """
+    Write-behind queue in front of a SpendLedgerStore.
+    record() is O(1) and safe from any thread or event loop.
+    """
+
+    def __init__(
+        self,
+        store: SpendLedgerStore,
+        flush_interval: float = 0.05,
+        max_batch: int = 5000,
+        compact_threshold: int = 100_000
+    ):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.compact_threshold = compact_threshold
+        self._queue: Deque[LedgerEntry] = deque()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._log_length = 0
+        self.metrics = {
+            "entries_recorded": 0,
+            "flushes": 0,
+            "entries_flushed": 0,
+            "flush_errors": 0,
+            "compactions": 0
+        }
+
+    def load(self) -> Balances:
+        """Recover balances on startup (before any new entries are recorded)"""
+        self._log_length = self.store.log_length()
+        return self.store.load()
+
+    def record_set(self, tenant_id: str, amount: float):
+        self._record((tenant_id, KIND_SET, amount, None, time.time()))
+
+    def record_spend(self, tenant_id: str, amount: float, feature_tag: str):
+        self._record((tenant_id, KIND_SPEND, amount, feature_tag, time.time()))
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _record(self, entry: LedgerEntry):
+        self._queue.append(entry)
+        self.metrics["entries_recorded"] += 1
+        if self._closed:
+            # The balance already changed: write it now rather than lose it after close()'s drain
+            self.flush()
+        elif self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._flush_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="finops-ledger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # Logged and re-queued by flush(); retried next interval
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def flush(self) -> int:
+        """Write everything queued so far, max_batch entries per transaction; returns entries written"""
+        written = 0
+        with self._flush_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.max_batch:
+                    batch.append(self._queue.popleft())
+                try:
+                    self.store.append(batch)
+                except Exception:
+                    # Put the batch back in order so nothing is lost; the next flush retries it
+                    self._queue.extendleft(reversed(batch))
+                    self.metrics["flush_errors"] += 1
+                    logger.exception(f"Failed to flush {len(batch)} spend ledger entries")
+                    raise
+                written += len(batch)
+                self._log_length += len(batch)
+                self.metrics["flushes"] += 1
+                self.metrics["entries_flushed"] += len(batch)
+
+            if self._log_length > self.compact_threshold:
+                folded = self.store.compact()
+                self._log_length = 0
+                self.metrics["compactions"] += 1
+                logger.info(f"Compacted {folded} spend ledger entries into balances")
+        return written
+
+    def close(self):
+        """Stop the flusher and write whatever is still queued"""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
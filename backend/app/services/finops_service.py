@@ -1,79 +1,261 @@
 import asyncio
+import os
 import time
 from typing import Dict, Any, Tuple, Optional
 from enum import Enum
 import threading
 
+from app.core.paths import data_path
+from app.services.finops_ledger import SpendLedger, SpendLedgerStore
+from app.services.finops_leases import CreditLeaseManager, create_credit_store
+
 class BudgetStatus(Enum):
     ALLOWED = "allowed"
     REJECTED_INSUFFICIENT_FUNDS = "rejected_insufficient_funds"
     REJECTED_RATE_LIMIT = "rejected_rate_limit"
 
+def _parse_tier_rps(spec: str) -> Dict[str, float]:
+    """'free=5,pro=20' -> {'free': 5.0, 'pro': 20.0}"""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            tier, rps = item.split("=", 1)
+            rates[tier.strip()] = float(rps)
+    return rates
+
+class _TokenBucket:
+    """Per-tenant rate limit state: O(1) check, three floats of memory"""
+    __slots__ = ("tokens", "updated", "rate")
+
+    def __init__(self, rate: float, now: float):
+        self.tokens = max(rate, 1.0)
+        self.updated = now
+        self.rate = rate
+
+    def take(self, rate: float, now: float) -> bool:
+        if rate != self.rate:
+            # Keep what was already used this second against the new limit
+            self.tokens += max(rate, 1.0) - max(self.rate, 1.0)
+            self.rate = rate
+        # Refill at `rate` tokens/s, bursting up to one second's worth (at least one request,
+        # so tiers below 1 RPS still get a request every 1/rate seconds)
+        self.tokens = min(max(rate, 1.0), self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+    def refill_seconds(self) -> float:
+        """Idle time after which the bucket is full again, however empty it was"""
+        return max(self.rate, 1.0) / self.rate if self.rate > 0 else float("inf")
+
 class FinOpsService:
     """
     2026 Gold Standard FinOps Service.
     Handles Atomic Credit Deductions and Rate Limiting for AI Agents.
+
+    Tenant state is guarded by striped locks (FINOPS_LOCK_STRIPES), so tenants
+    on different stripes never wait on each other. Critical sections only touch
+    in-memory dicts; logging and alerts happen after the lock is released.
+    Async callers never block the event loop on a stripe held by another thread:
+    they sleep with exponential backoff and retry instead.
+
+    Rate limiting is a token bucket per tenant (MAX_RPS, or the rate of the
+    tenant's tier from FINOPS_TIER_RPS). Buckets idle for FINOPS_IDLE_REAP_SECONDS,
+    and long enough to have refilled at their tier's rate, are full again, so they
+    are dropped; each stripe sweeps its own buckets at most once per that interval.
+
+    With a ledger (FINOPS_LEDGER_PATH, on by default), every balance change is also
+    queued to a write-behind SQLite log and balances are recovered from it on startup.
+
+    In lease mode (FINOPS_CREDIT_STORE_URL) balances live in a central store
+    shared by all workers; credits are spent from local leases (see
+    finops_leases) and only a dry lease costs a round trip.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        lock_stripes: Optional[int] = None,
+        ledger: Optional[SpendLedger] = None,
+        leases: Optional[CreditLeaseManager] = None
+    ):
         # Simulated DB: tenant_id -> credits (USD)
         self._credits: Dict[str, float] = {}
-        # Rate limit tracking: tenant_id -> [timestamps]
-        self._request_history: Dict[str, list] = {}
         # Cost tagging: tenant_id -> {feature_tag: total_cost}
         self._usage_by_tag: Dict[str, Dict[str, float]] = {}
+        # Durable spend log; replayed here so a restart keeps balances and usage
+        self.ledger = ledger
+        if ledger is not None:
+            self._credits, self._usage_by_tag = ledger.load()
+        # Central-store credit leases; when set, _credits is not used
+        self.leases = leases
         
-        # Thread lock for atomic simulation in Python memory
-        self._lock = threading.Lock()
+        # Striped thread locks for atomic simulation in Python memory
+        n_stripes = lock_stripes or int(os.getenv("FINOPS_LOCK_STRIPES", "64"))
+        self._locks = [threading.Lock() for _ in range(max(1, n_stripes))]
+        self.metrics = {"lock_contended": 0, "buckets_reaped": 0}
         
-        # Rate Limit config: max requests per second
+        # Rate Limit config: max requests per second (tenants without a tier)
         self.MAX_RPS = 10
+        # Per-tier overrides, e.g. FINOPS_TIER_RPS="free=5,pro=20,studio=50,business=100"
+        self.TIER_RPS: Dict[str, float] = _parse_tier_rps(os.getenv("FINOPS_TIER_RPS", "free=5,pro=20,studio=50,business=100"))
+        self._tenant_tiers: Dict[str, str] = {}
+        # Rate limit tracking, one dict per lock stripe: tenant_id -> token bucket
+        self._buckets = [{} for _ in self._locks]
+        # Sweep interval and minimum idle time; a bucket is also kept until it has refilled
+        # (burst / rate: 1s at 1 RPS and above, 5s at 0.2 RPS), since reaping sooner hands out extra requests
+        self.idle_reap_after = float(os.getenv("FINOPS_IDLE_REAP_SECONDS", "60"))
+        self._next_reap = [0.0] * len(self._locks)
+
+    def _stripe(self, tenant_id: str) -> int:
+        return hash(tenant_id) % len(self._locks)
+
+    def _lock_for(self, tenant_id: str) -> threading.Lock:
+        return self._locks[self._stripe(tenant_id)]
+
+    def set_tier(self, tenant_id: str, tier: Optional[str]):
+        """Assign a tenant's rate-limit tier (None reverts to MAX_RPS)"""
+        if tier is None:
+            self._tenant_tiers.pop(tenant_id, None)
+            return
+        if tier not in self.TIER_RPS:
+            raise ValueError(f"Unknown tier '{tier}' (expected one of {sorted(self.TIER_RPS)})")
+        self._tenant_tiers[tenant_id] = tier
+
+    def get_rate_limit(self, tenant_id: str) -> float:
+        """Requests per second allowed for the tenant"""
+        tier = self._tenant_tiers.get(tenant_id)
+        return self.TIER_RPS[tier] if tier in self.TIER_RPS else self.MAX_RPS
+
+    async def _acquire(self, lock: threading.Lock):
+        """Take a stripe without blocking the event loop if another thread holds it"""
+        if lock.acquire(blocking=False):
+            return
+        # Stripes are held for microseconds: poll from 50us, backing off to 5ms
+        delay = 50e-6
+        while not lock.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.005)
+        # Counted under the stripe, but all stripes share the dict, so the total is approximate
+        self.metrics["lock_contended"] += 1
         
     def set_credits(self, tenant_id: str, amount: float):
         """Mock method to seed credits"""
-        with self._lock:
+        if self.leases is not None:
+            raise RuntimeError("In lease mode credits live in the central store; use seed_credits()")
+        self._check_ledger_open()
+        with self._lock_for(tenant_id):
             self._credits[tenant_id] = amount
+            if self.ledger is not None:
+                self.ledger.record_set(tenant_id, amount)
+
+    async def seed_credits(self, tenant_id: str, amount: float):
+        """
+        Seed credits in either mode. Lease mode: set the central balance (a new epoch, so
+        leases other workers took from the old balance are never returned into it) and
+        drop this worker's lease.
+        """
+        if self.leases is None:
+            self.set_credits(tenant_id, amount)
+            return
+        self._check_ledger_open()
+        await self.leases.invalidate(tenant_id)
+        await self.leases.store.set_balance(tenant_id, amount)
+        if self.ledger is not None:
+            self.ledger.record_set(tenant_id, amount)
 
     async def check_and_spend(self, tenant_id: str, cost_estimate: float, feature_tag: str = "general") -> Tuple[BudgetStatus, Optional[str]]:
         """
         Atomic operation to check rules, deduct costs, and track usage by feature.
         In production: This would be a single SQL UPDATE with RETURNING.
         """
-        with self._lock:
-            # 1. Rate Limit Check
-            now = time.time()
-            history = self._request_history.get(tenant_id, [])
-            # Keep only last second
-            history = [t for t in history if now - t < 1.0]
-            
-            if len(history) >= self.MAX_RPS:
-                error_msg = f"Rate limit exceeded: {self.MAX_RPS} RPS"
-                self._trigger_alert(tenant_id, BudgetStatus.REJECTED_RATE_LIMIT, error_msg)
-                return BudgetStatus.REJECTED_RATE_LIMIT, error_msg
-            
-            # Update history
-            history.append(now)
-            self._request_history[tenant_id] = history
-
-            # 2. Credit Check & Atomic Deduction
+        stripe = self._stripe(tenant_id)
+        lock = self._locks[stripe]
+        await self._acquire(lock)
+        try:
+            status, error_msg, new_balance = self._check_and_spend_locked(stripe, tenant_id, cost_estimate, feature_tag)
+        finally:
+            lock.release()
+
+        while status is None:
+            # Lease ran dry: reserve from the central store outside the stripe lock, then retry.
+            # Concurrent spenders may use up the new slice first; retry until the store grants nothing.
+            can_refill = await self.leases.refill(tenant_id, cost_estimate)
+            await self._acquire(lock)
+            try:
+                status, error_msg, new_balance = self._spend_locked(tenant_id, cost_estimate, feature_tag, can_refill)
+            finally:
+                lock.release()
+
+        if status != BudgetStatus.ALLOWED:
+            self._trigger_alert(tenant_id, status, error_msg)
+            return status, error_msg
+        print(f"[FINOPS] Tenant {tenant_id} spent ${cost_estimate:.4f} on [{feature_tag}]. Balance: ${new_balance:.4f}")
+        return BudgetStatus.ALLOWED, None
+
+    def _check_and_spend_locked(self, stripe: int, tenant_id: str, cost_estimate: float, feature_tag: str) -> Tuple[Optional[BudgetStatus], Optional[str], float]:
+        """Body of check_and_spend; caller holds the tenant's stripe. Status None: the lease needs a refill"""
+        # A closed ledger refuses the spend below anyway: don't take a rate-limit token for it
+        self._check_ledger_open()
+        # 1. Rate Limit Check
+        now = time.monotonic()
+        if now >= self._next_reap[stripe]:
+            self._reap_idle(stripe, now)
+        buckets = self._buckets[stripe]
+        rate = self.get_rate_limit(tenant_id)
+        bucket = buckets.get(tenant_id)
+        if bucket is None:
+            bucket = buckets[tenant_id] = _TokenBucket(rate, now)
+        
+        if not bucket.take(rate, now):
+            return BudgetStatus.REJECTED_RATE_LIMIT, f"Rate limit exceeded: {rate:g} RPS", 0.0
+
+        return self._spend_locked(tenant_id, cost_estimate, feature_tag, can_refill=True)
+
+    def _spend_locked(self, tenant_id: str, cost_estimate: float, feature_tag: str, can_refill: bool) -> Tuple[Optional[BudgetStatus], Optional[str], float]:
+        # Refuse before deducting anything: a spend the ledger cannot log must not be charged
+        self._check_ledger_open()
+        # 2. Credit Check & Atomic Deduction
+        if self.leases is not None:
+            if not self.leases.try_spend(tenant_id, cost_estimate):
+                if can_refill:
+                    return None, None, 0.0
+                available = self.leases.available(tenant_id)
+                error_msg = f"Insufficient funds: ${available:.4f} < ${cost_estimate:.4f}"
+                return BudgetStatus.REJECTED_INSUFFICIENT_FUNDS, error_msg, available
+            new_balance = self.leases.available(tenant_id)
+        else:
             current_balance = self._credits.get(tenant_id, 0.0)
-            
             if current_balance < cost_estimate:
                 error_msg = f"Insufficient funds: ${current_balance:.4f} < ${cost_estimate:.4f}"
-                self._trigger_alert(tenant_id, BudgetStatus.REJECTED_INSUFFICIENT_FUNDS, error_msg)
-                return BudgetStatus.REJECTED_INSUFFICIENT_FUNDS, error_msg
-            
+                return BudgetStatus.REJECTED_INSUFFICIENT_FUNDS, error_msg, current_balance
             # Atomic subtraction
-            self._credits[tenant_id] -= cost_estimate
-            new_balance = self._credits[tenant_id]
-            
-            # 3. Cost Attribution (Tagging)
-            if tenant_id not in self._usage_by_tag:
-                self._usage_by_tag[tenant_id] = {}
-            current_tag_usage = self._usage_by_tag[tenant_id].get(feature_tag, 0.0)
-            self._usage_by_tag[tenant_id][feature_tag] = current_tag_usage + cost_estimate
-            
-            print(f"[FINOPS] Tenant {tenant_id} spent ${cost_estimate:.4f} on [{feature_tag}]. Balance: ${new_balance:.4f}")
-            return BudgetStatus.ALLOWED, None
+            new_balance = current_balance - cost_estimate
+            self._credits[tenant_id] = new_balance
+        
+        # 3. Cost Attribution (Tagging)
+        tag_usage = self._usage_by_tag.setdefault(tenant_id, {})
+        tag_usage[feature_tag] = tag_usage.get(feature_tag, 0.0) + cost_estimate
+        if self.ledger is not None:
+            # Queued under the stripe lock, so the log keeps each tenant's order
+            self.ledger.record_spend(tenant_id, cost_estimate, feature_tag)
+        return BudgetStatus.ALLOWED, None, new_balance
+
+    def _check_ledger_open(self):
+        if self.ledger is not None and self.ledger.closed:
+            raise RuntimeError("Spend ledger is closed")
+
+    def _reap_idle(self, stripe: int, now: float):
+        """Drop this stripe's buckets idle long enough to have refilled; caller holds the stripe"""
+        self._next_reap[stripe] = now + self.idle_reap_after
+        buckets = self._buckets[stripe]
+        idle = [
+            tenant_id for tenant_id, bucket in buckets.items()
+            if now - bucket.updated >= max(self.idle_reap_after, bucket.refill_seconds())
+        ]
+        for tenant_id in idle:
+            del buckets[tenant_id]
+        self.metrics["buckets_reaped"] += len(idle)
 
     def _trigger_alert(self, tenant_id: str, status: BudgetStatus, message: str):
         """
@@ -85,10 +267,45 @@ class FinOpsService:
 
     def get_tag_usage(self, tenant_id: str, feature_tag: str) -> float:
         """Get total spend for a specific feature tag."""
-        with self._lock:
+        with self._lock_for(tenant_id):
             return self._usage_by_tag.get(tenant_id, {}).get(feature_tag, 0.0)
 
     def get_balance(self, tenant_id: str) -> float:
+        """In lease mode only this worker's view: 0.0 without a lease (see get_balance_async)"""
+        if self.leases is not None:
+            return self.leases.available(tenant_id)
+        return self._credits.get(tenant_id, 0.0)
+
+    async def get_balance_async(self, tenant_id: str) -> float:
+        """Balance in either mode; in lease mode asks the central store if this worker holds no lease"""
+        if self.leases is not None:
+            return await self.leases.balance(tenant_id)
         return self._credits.get(tenant_id, 0.0)
 
-finops_service = FinOpsService()
+def _default_ledger() -> Optional[SpendLedger]:
+    """
+    Write-behind ledger at FINOPS_LEDGER_PATH (default $DATA_DIR/finops_ledger.db);
+    FINOPS_LEDGER_PATH=off keeps spend data in memory only
+    """
+    path = os.getenv("FINOPS_LEDGER_PATH") or data_path("finops_ledger.db")
+    if path.lower() == "off":
+        return None
+    return SpendLedger(
+        SpendLedgerStore(path),
+        flush_interval=float(os.getenv("FINOPS_LEDGER_FLUSH_MS", "50")) / 1000,
+        compact_threshold=int(os.getenv("FINOPS_LEDGER_COMPACT_ENTRIES", "100000"))
+    )
+
+def _default_leases() -> Optional[CreditLeaseManager]:
+    """Lease mode against FINOPS_CREDIT_STORE_URL (redis://...); None keeps balances in this process"""
+    store = create_credit_store(os.getenv("FINOPS_CREDIT_STORE_URL"))
+    if store is None:
+        return None
+    return CreditLeaseManager(
+        store,
+        slice_size=float(os.getenv("FINOPS_LEASE_SLICE_USD", "1.0")),
+        lease_ttl=float(os.getenv("FINOPS_LEASE_TTL_SECONDS", "30")),
+        max_overdraft=float(os.getenv("FINOPS_LEASE_MAX_OVERDRAFT_USD", "0"))
+    )
+
+finops_service = FinOpsService(ledger=_default_ledger(), leases=_default_leases())
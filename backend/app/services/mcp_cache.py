@@ -0,0 +1,212 @@
+"""
+MCP Read Cache - Read-through cache for MCP resources and read-only tools
+
+Agents poll project metadata and status constantly. Entries are keyed by
+(resource, tenant, key), expire after a TTL and are tagged (e.g.
+"project:<id>", "tenant:<id>") so the collaboration and generation services
+can drop them explicitly when the underlying data changes.
+
+Every entry carries an ETag; callers that send If-None-Match with the
+current ETag get a not-modified answer without the payload. Concurrent
+misses on one key share a single load, and hit ratios are tracked per
+resource.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+CacheKey = Tuple[str, str, str]
+
+
+def compute_etag(value: Any) -> str:
+    """Strong ETag (quoted) for a str/bytes payload or JSON-serializable value"""
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+    elif isinstance(value, (bytes, bytearray)):
+        data = bytes(value)
+    else:
+        data = json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return '"%s"' % hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match semantics: '*', a single tag or a comma-separated list, quotes optional"""
+    if not if_none_match:
+        return False
+    bare = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate.strip('"') == bare:
+            return True
+    return False
+
+
+class CacheEntry:
+    __slots__ = ("value", "etag", "expires_at", "tags")
+
+    def __init__(self, value: Any, etag: str, expires_at: float, tags: Tuple[str, ...]):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class ReadCache:
+    """LRU of CacheEntry with TTL, tag invalidation and per-resource hit stats"""
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._by_tag: Dict[str, Set[CacheKey]] = {}
+        self._loading: Dict[CacheKey, asyncio.Future] = {}
+        # Invalidations per tag while a load carrying that tag is in flight: a load
+        # that raced an invalidation of one of its own tags is not stored
+        self._tag_generations: Dict[str, int] = {}
+        self._tag_loads: Dict[str, int] = {}
+        # Bumped by clear(), which affects every load
+        self._epoch = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, resource: str, field: str, n: int = 1):
+        stats = self._stats.get(resource)
+        if stats is None:
+            stats = self._stats[resource] = {
+                "hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0, "evictions": 0
+            }
+        stats[field] += n
+
+    def get(self, resource: str, tenant: str, key: str) -> Optional[CacheEntry]:
+        """Fresh entry or None (does not count towards hit stats)"""
+        cache_key = (resource, tenant, key)
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._drop(cache_key)
+            return None
+        self._entries.move_to_end(cache_key)
+        return entry
+
+    async def get_or_load(
+        self,
+        resource: str,
+        tenant: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Iterable[str] = (),
+        ttl: Optional[float] = None
+    ) -> CacheEntry:
+        """Cached entry, or load it once (concurrent callers share the load)"""
+        entry = self.get(resource, tenant, key)
+        if entry is not None:
+            self._count(resource, "hits")
+            return entry
+
+        cache_key = (resource, tenant, key)
+        pending = self._loading.get(cache_key)
+        if pending is not None:
+            self._count(resource, "hits")
+            return await asyncio.shield(pending)
+
+        self._count(resource, "misses")
+        future = asyncio.get_running_loop().create_future()
+        self._loading[cache_key] = future
+        tags = tuple(dict.fromkeys(tags))
+        generations = self._watch(tags)
+        epoch = self._epoch
+        try:
+            value = await loader()
+            entry = CacheEntry(value, compute_etag(value), time.monotonic() + (self.ttl if ttl is None else ttl), tags)
+            if self._epoch == epoch and generations == tuple(self._tag_generations[tag] for tag in tags):
+                self._store(cache_key, entry)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; don't warn if there are none
+            raise
+        finally:
+            del self._loading[cache_key]
+            self._unwatch(tags)
+
+    def _watch(self, tags: Tuple[str, ...]) -> Tuple[int, ...]:
+        """Start tracking invalidations of `tags` for a load; returns their current generations"""
+        for tag in tags:
+            self._tag_loads[tag] = self._tag_loads.get(tag, 0) + 1
+            self._tag_generations.setdefault(tag, 0)
+        return tuple(self._tag_generations[tag] for tag in tags)
+
+    def _unwatch(self, tags: Tuple[str, ...]):
+        for tag in tags:
+            self._tag_loads[tag] -= 1
+            if not self._tag_loads[tag]:
+                del self._tag_loads[tag]
+                del self._tag_generations[tag]
+
+    def record_not_modified(self, resource: str):
+        self._count(resource, "not_modified")
+
+    def _store(self, cache_key: CacheKey, entry: CacheEntry):
+        if cache_key in self._entries:
+            self._drop(cache_key)
+        self._entries[cache_key] = entry
+        for tag in entry.tags:
+            self._by_tag.setdefault(tag, set()).add(cache_key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._count(oldest[0], "evictions")
+            self._drop(oldest)
+
+    def _drop(self, cache_key: CacheKey):
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(cache_key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every entry carrying `tag`; returns how many were dropped"""
+        if tag in self._tag_generations:
+            self._tag_generations[tag] += 1
+        keys = self._by_tag.pop(tag, ())
+        for cache_key in list(keys):
+            self._count(cache_key[0], "invalidations")
+            self._drop(cache_key)
+        return len(keys)
+
+    def invalidate_project(self, project_id: str) -> int:
+        return self.invalidate(f"project:{project_id}")
+
+    def invalidate_tenant(self, tenant_id: str) -> int:
+        return self.invalidate(f"tenant:{tenant_id}")
+
+    def clear(self):
+        self._epoch += 1
+        self._entries.clear()
+        self._by_tag.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-resource counters and hit ratio, plus the current entry count"""
+        resources = {}
+        for resource, counters in self._stats.items():
+            lookups = counters["hits"] + counters["misses"]
+            resources[resource] = dict(counters, hit_ratio=round(counters["hits"] / lookups, 4) if lookups else 0.0)
+        return {"entries": len(self._entries), "ttl_seconds": self.ttl, "resources": resources}
+
+
+mcp_read_cache = ReadCache(
+    ttl=float(os.getenv("MCP_CACHE_TTL_SECONDS", "5")),
+    max_entries=int(os.getenv("MCP_CACHE_MAX_ENTRIES", "10000"))
+)
@@ -0,0 +1,197 @@
+"""
+MCP Metrics - Per-tool, per-tenant latency, errors, budget rejections and spend
+
+Filled in by the tool decorators (instrument_tool, mcp_error_handler,
+budget_gate) and exported in Prometheus text format or as a JSON summary.
+Tenant labels are capped (MCP_METRICS_MAX_TENANTS); further tenants are
+folded into "_other" so label cardinality stays bounded.
+"""
+
+import math
+import os
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+# Seconds; upper bounds of the latency histogram buckets (+Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OTHER_TENANT = "_other"
+NO_TENANT = "_none"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float, buckets: Tuple[float, ...]):
+        self.counts[bisect_left(buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value))
+
+
+class ToolMetrics:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, max_tenants: int = 1000):
+        self.buckets = tuple(sorted(buckets))
+        self.max_tenants = max_tenants
+        self._tenants: set = set()
+        self._latency: Dict[Tuple[str, str], _Histogram] = {}
+        self._errors: Dict[Tuple[str, str, str], int] = {}
+        self._rejections: Dict[Tuple[str, str, str], int] = {}
+        self._spend: Dict[Tuple[str, str], float] = {}
+
+    def _tenant(self, tenant_id) -> str:
+        if not tenant_id:
+            return NO_TENANT
+        tenant_id = str(tenant_id)
+        if tenant_id in self._tenants:
+            return tenant_id
+        if len(self._tenants) >= self.max_tenants:
+            return OTHER_TENANT
+        self._tenants.add(tenant_id)
+        return tenant_id
+
+    def observe_call(self, tool: str, tenant_id, seconds: float):
+        key = (tool, self._tenant(tenant_id))
+        histogram = self._latency.get(key)
+        if histogram is None:
+            histogram = self._latency[key] = _Histogram(len(self.buckets))
+        histogram.observe(seconds, self.buckets)
+
+    def record_error(self, tool: str, tenant_id, code: str):
+        key = (tool, self._tenant(tenant_id), str(code))
+        self._errors[key] = self._errors.get(key, 0) + 1
+
+    def record_rejection(self, tool: str, tenant_id, reason: str):
+        key = (tool, self._tenant(tenant_id), reason)
+        self._rejections[key] = self._rejections.get(key, 0) + 1
+
+    def record_spend(self, tool: str, tenant_id, amount: float):
+        key = (tool, self._tenant(tenant_id))
+        self._spend[key] = self._spend.get(key, 0.0) + amount
+
+    def _quantile(self, histogram: _Histogram, q: float):
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)"""
+        if not histogram.count:
+            return 0.0
+        rank = q * histogram.count
+        seen = 0
+        for bound, count in zip(self.buckets, histogram.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per-tool totals across tenants, with per-tenant call/spend breakdown"""
+        tools: Dict[str, Dict] = {}
+
+        def tool_entry(tool: str) -> Dict:
+            entry = tools.get(tool)
+            if entry is None:
+                entry = tools[tool] = {
+                    "calls": 0, "latency": _Histogram(len(self.buckets)), "errors": {},
+                    "budget_rejections": {}, "spend_usd": 0.0, "tenants": {}
+                }
+            return entry
+
+        def tenant_entry(tool: str, tenant: str) -> Dict:
+            return tool_entry(tool)["tenants"].setdefault(
+                tenant, {"calls": 0, "errors": 0, "budget_rejections": 0, "spend_usd": 0.0}
+            )
+
+        for (tool, tenant), histogram in self._latency.items():
+            entry = tool_entry(tool)
+            merged = entry["latency"]
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.sum += histogram.sum
+            merged.count += histogram.count
+            entry["calls"] += histogram.count
+            tenant_entry(tool, tenant)["calls"] += histogram.count
+        for (tool, tenant, code), count in self._errors.items():
+            errors = tool_entry(tool)["errors"]
+            errors[code] = errors.get(code, 0) + count
+            tenant_entry(tool, tenant)["errors"] += count
+        for (tool, tenant, reason), count in self._rejections.items():
+            rejections = tool_entry(tool)["budget_rejections"]
+            rejections[reason] = rejections.get(reason, 0) + count
+            tenant_entry(tool, tenant)["budget_rejections"] += count
+        for (tool, tenant), amount in self._spend.items():
+            tool_entry(tool)["spend_usd"] += amount
+            tenant_entry(tool, tenant)["spend_usd"] += amount
+
+        for entry in tools.values():
+            histogram = entry.pop("latency")
+            entry["latency_seconds"] = {
+                "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                "p50_le": self._quantile(histogram, 0.5),
+                "p95_le": self._quantile(histogram, 0.95),
+                "p99_le": self._quantile(histogram, 0.99)
+            }
+        return tools
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP flowai_mcp_tool_latency_seconds MCP tool call latency.",
+            "# TYPE flowai_mcp_tool_latency_seconds histogram"
+        ]
+        for (tool, tenant), histogram in sorted(self._latency.items()):
+            labels = f'tool="{_escape(tool)}",tenant="{_escape(tenant)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), histogram.counts):
+                cumulative += count
+                lines.append(f'flowai_mcp_tool_latency_seconds_bucket{{{labels},le="{_number(bound)}"}} {cumulative}')
+            lines.append(f"flowai_mcp_tool_latency_seconds_sum{{{labels}}} {_number(histogram.sum)}")
+            lines.append(f"flowai_mcp_tool_latency_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP flowai_mcp_tool_errors_total MCP tool calls that failed, by error code.",
+            "# TYPE flowai_mcp_tool_errors_total counter"
+        ]
+        for (tool, tenant, code), count in sorted(self._errors.items()):
+            lines.append(
+                f'flowai_mcp_tool_errors_total{{tool="{_escape(tool)}",tenant="{_escape(tenant)}",code="{_escape(code)}"}} {count}'
+            )
+
+        lines += [
+            "# HELP flowai_mcp_budget_rejections_total MCP tool calls blocked by the budget gate.",
+            "# TYPE flowai_mcp_budget_rejections_total counter"
+        ]
+        for (tool, tenant, reason), count in sorted(self._rejections.items()):
+            lines.append(
+                f'flowai_mcp_budget_rejections_total{{tool="{_escape(tool)}",tenant="{_escape(tenant)}",reason="{_escape(reason)}"}} {count}'
+            )
+
+        lines += [
+            "# HELP flowai_mcp_tool_spend_usd_total Credits spent through MCP tools (USD).",
+            "# TYPE flowai_mcp_tool_spend_usd_total counter"
+        ]
+        for (tool, tenant), amount in sorted(self._spend.items()):
+            lines.append(
+                f'flowai_mcp_tool_spend_usd_total{{tool="{_escape(tool)}",tenant="{_escape(tenant)}"}} {_number(amount)}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        self._tenants.clear()
+        self._latency.clear()
+        self._errors.clear()
+        self._rejections.clear()
+        self._spend.clear()
+
+
+mcp_metrics = ToolMetrics(max_tenants=int(os.getenv("MCP_METRICS_MAX_TENANTS", "1000")))
@@ -3,56 +3,120 @@ try:
 except ImportError:
     from app.services import otio_stub as otio
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import uuid
 import pycrdt
 from pycrdt import Doc, Map, Array
 
+# Namespace for ids derived from clip content when OTIO carries no flowai_id
+_FALLBACK_ID_NAMESPACE = uuid.UUID("6f1c2a9e-3b7d-5e40-9a8c-1d2e3f405162")
+
+def fallback_clip_id(track_idx: int, name: str, media_url: str, occurrence: int) -> str:
+    """
+    Deterministic id for a clip without `flowai_id`: the same clip (track, name,
+    media and how many identical ones precede it) maps to the same id on every
+    sync, so it is updated in place instead of deleted and re-created.
+    """
+    return str(uuid.uuid5(_FALLBACK_ID_NAMESPACE, f"{track_idx}\0{name}\0{media_url}\0{occurrence}"))
+
+def otio_clip_fields(item: otio.schema.Clip, fallback_id: Optional[str] = None) -> Dict[str, Any]:
+    """Flatten an OTIO Clip into the fields stored in its Y.Map"""
+    clip_id = item.metadata.get("flowai_id") or fallback_id or str(uuid.uuid4())
+    
+    # Time range calculation
+    tr = item.source_range
+    start = tr.start_time.value / tr.start_time.rate if tr else 0.0
+    duration = tr.duration.value / tr.duration.rate if tr else 5.0
+    
+    return {
+        "_id": clip_id,
+        "name": item.name,
+        "media_url": item.media_reference.target_url if item.media_reference else "",
+        "start": start,
+        "duration": duration
+    }
+
+def update_map_fields(y_map: Map, fields: Dict[str, Any]):
+    """Write only the fields that changed, so unchanged keys produce no CRDT ops"""
+    for key, value in fields.items():
+        if y_map.get(key) != value:
+            y_map[key] = value
+
+def sync_clips(y_clips: Array, target: List[Dict[str, Any]]):
+    """
+    Structural diff of a track's clips against a target list, keyed by `_id`.
+    Matching clips are updated in place; only inserted, moved or removed
+    clips touch the array. Must be called inside a transaction.
+    """
+    target_ids = {fields["_id"] for fields in target}
+    
+    # 1. Remove clips that are no longer present (back to front keeps indices valid)
+    for pos in range(len(y_clips) - 1, -1, -1):
+        if y_clips[pos].get("_id") not in target_ids:
+            del y_clips[pos]
+    
+    # 2. Walk the target order, updating matches and inserting/moving the rest
+    for pos, fields in enumerate(target):
+        if pos < len(y_clips) and y_clips[pos].get("_id") == fields["_id"]:
+            update_map_fields(y_clips[pos], fields)
+            continue
+        
+        for later in range(pos + 1, len(y_clips)):
+            if y_clips[later].get("_id") == fields["_id"]:
+                del y_clips[later]  # Moved: re-inserted below
+                break
+        y_clips.insert(pos, Map(fields))
+    
+    # 3. Drop anything left past the end (duplicates of moved ids)
+    while len(y_clips) > len(target):
+        del y_clips[len(y_clips) - 1]
+
 def otio_to_yjs(timeline: otio.schema.Timeline, doc: Doc):
     """
-    Converts an OTIO Timeline into a Y.Doc structure using pycrdt.
+    Syncs an OTIO Timeline into a Y.Doc structure using pycrdt.
     Root: "tracks" (Array)
+    
+    Uses a structural diff instead of clear-and-rebuild: tracks are matched
+    by position and clips by `_id`, so the resulting CRDT update only
+    contains what actually changed and concurrent human edits survive.
     """
     if "tracks" not in doc:
         with doc.transaction():
             doc["tracks"] = Array()
             
     y_tracks = doc["tracks"]
+    tracks = list(timeline.tracks)
     
     with doc.transaction():
-        # Clear existing if any for overwrite sync
-        if len(y_tracks) > 0:
-            y_tracks.clear()
+        # Drop tracks beyond the target timeline
+        while len(y_tracks) > len(tracks):
+            del y_tracks[len(y_tracks) - 1]
         
-        for track in timeline.tracks:
-            # Create track map and append it immediately to integrate it into the doc
-            y_track = Map({
-                "name": track.name,
-                "kind": track.kind,
-                "clips": Array()
-            })
-            y_tracks.append(y_track)
+        for idx, track in enumerate(tracks):
+            if idx >= len(y_tracks):
+                # Create track map and append it immediately to integrate it into the doc
+                y_tracks.append(Map({
+                    "name": track.name,
+                    "kind": track.kind,
+                    "clips": Array()
+                }))
+            y_track = y_tracks[idx]
+            update_map_fields(y_track, {"name": track.name, "kind": track.kind})
             
             # Now we can safely access y_track["clips"] because it's in the doc
-            y_clips = y_track["clips"]
+            target = []
+            seen: Dict[tuple, int] = {}
             for item in track:
-                if isinstance(item, otio.schema.Clip):
-                    # Generate stable UUID if not present
-                    clip_id = item.metadata.get("flowai_id") or str(uuid.uuid4())
-                    
-                    # Time range calculation
-                    tr = item.source_range
-                    start = tr.start_time.value / tr.start_time.rate if tr else 0.0
-                    duration = tr.duration.value / tr.duration.rate if tr else 5.0
-                    
-                    y_clip = Map({
-                        "_id": clip_id,
-                        "name": item.name,
-                        "media_url": item.media_reference.target_url if item.media_reference else "",
-                        "start": start,
-                        "duration": duration
-                    })
-                    y_clips.append(y_clip)
+                if not isinstance(item, otio.schema.Clip):
+                    continue
+                fallback_id = None
+                if not item.metadata.get("flowai_id"):
+                    media_url = item.media_reference.target_url if item.media_reference else ""
+                    occurrence = seen[item.name, media_url] = seen.get((item.name, media_url), -1) + 1
+                    fallback_id = fallback_clip_id(idx, item.name, media_url, occurrence)
+                    item.metadata["flowai_id"] = fallback_id  # Keep it for round trips of this timeline
+                target.append(otio_clip_fields(item, fallback_id))
+            sync_clips(y_track["clips"], target)
 
 def yjs_to_otio(doc: Doc) -> otio.schema.Timeline:
     """
@@ -0,0 +1,345 @@
+"""
+OTIO Streaming - Incremental OTIO JSON export/import for collaborative timelines
+
+Export walks the Y.Doc track by track and emits OTIO JSON fragments, so a
+multi-hour project is never materialized as an OTIO object graph or one
+big string. The output matches `yjs_to_otio(doc).to_dict()`.
+
+Import is an incremental JSON parser: it only descends into the structural
+parts of an OTIO document ("tracks" / "children") and decodes each clip as
+one small value, emitting events as soon as a clip is complete. Memory is
+bounded by the largest single clip, not the document.
+"""
+
+import asyncio
+import codecs
+import json
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pycrdt import Doc
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Frame rate used for RationalTime values, as in otio_schema.yjs_to_otio
+EXPORT_RATE = 24
+
+if orjson is not None:
+    def _dumps(value) -> bytes:
+        return orjson.dumps(value)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def _dumps(value) -> bytes:
+        return _encoder.encode(value).encode("utf-8")
+
+
+# --- Export ---
+
+def _time_json(seconds: float) -> bytes:
+    return b'{"OTIO_SCHEMA":"RationalTime.1","value":%s,"rate":%d}' % (
+        _dumps(seconds * EXPORT_RATE), EXPORT_RATE
+    )
+
+def _clip_json(y_clip) -> bytes:
+    return b"".join((
+        b'{"OTIO_SCHEMA":"Clip.1","name":', _dumps(y_clip.get("name", "Clip")),
+        b',"media_reference":{"OTIO_SCHEMA":"ExternalReference.1","target_url":',
+        _dumps(y_clip.get("media_url", "")), b',"metadata":{}}',
+        b',"source_range":{"OTIO_SCHEMA":"TimeRange.1","start_time":', _time_json(float(y_clip.get("start", 0.0))),
+        b',"duration":', _time_json(float(y_clip.get("duration", 1.0))), b'}',
+        b',"metadata":', _dumps({"flowai_id": y_clip.get("_id")}), b'}'
+    ))
+
+def iter_otio_json(doc: Doc, name: str = "Collaborative Timeline") -> Iterator[bytes]:
+    """Yield OTIO JSON fragments for the doc, one clip at a time"""
+    yield b'{"OTIO_SCHEMA":"Timeline.1","name":%s,"tracks":{"OTIO_SCHEMA":"Stack.1","children":[' % _dumps(name)
+    for track_idx, y_track in enumerate(doc["tracks"]):
+        yield _track_head_json(track_idx, y_track)
+        y_clips = y_track.get("clips")
+        for clip_idx, y_clip in enumerate(y_clips or ()):
+            yield (b"," + _clip_json(y_clip)) if clip_idx else _clip_json(y_clip)
+        yield b'],"metadata":{}}'
+    yield b'],"metadata":{}},"metadata":{}}'
+
+def _track_head_json(track_idx: int, y_track) -> bytes:
+    return b'%s{"OTIO_SCHEMA":"Track.1","name":%s,"kind":%s,"children":[' % (
+        b"," if track_idx else b"",
+        _dumps(y_track.get("name", "Track")),
+        _dumps(y_track.get("kind", "Video"))
+    )
+
+def write_otio_json(doc: Doc, fp, buffer_size: int = 1 << 16) -> int:
+    """Stream the doc as OTIO JSON into a binary file-like object; returns bytes written"""
+    written = 0
+    for chunk in iter_otio_chunks(doc, buffer_size):
+        fp.write(chunk)
+        written += len(chunk)
+    return written
+
+
+class _ExportCursor:
+    """
+    Where a chunked export of the live doc stopped: track index, clip position and
+    the id of the last clip written. Between chunks the walk resumes after that id,
+    so clips inserted or removed earlier in the track neither repeat nor get skipped.
+    """
+
+    def __init__(self, doc: Doc, name: str):
+        self.y_tracks = doc["tracks"]
+        self.name = name
+        self.track_idx = -1  # -1: timeline header not written yet
+        self.clip_pos = 0
+        self.last_id: Optional[str] = None
+        self.done = False
+
+    def read(self, buffer_size: int) -> bytes:
+        """Next ~buffer_size bytes; call inside a doc transaction"""
+        buffer = bytearray()
+        if self.track_idx < 0:
+            buffer += b'{"OTIO_SCHEMA":"Timeline.1","name":%s,"tracks":{"OTIO_SCHEMA":"Stack.1","children":[' % _dumps(self.name)
+            self._start_track(0, buffer)
+        while len(buffer) < buffer_size:
+            if self.track_idx >= len(self.y_tracks):
+                buffer += b'],"metadata":{}},"metadata":{}}'
+                self.done = True
+                break
+            y_clips = self.y_tracks[self.track_idx].get("clips") or ()
+            self._resume(y_clips)
+            while self.clip_pos < len(y_clips) and len(buffer) < buffer_size:
+                y_clip = y_clips[self.clip_pos]
+                if self.clip_pos or self.last_id is not None:
+                    buffer += b","
+                buffer += _clip_json(y_clip)
+                self.last_id = y_clip.get("_id")
+                self.clip_pos += 1
+            if self.clip_pos >= len(y_clips):
+                buffer += b'],"metadata":{}}'
+                self._start_track(self.track_idx + 1, buffer)
+        return bytes(buffer)
+
+    def _start_track(self, track_idx: int, buffer: bytearray):
+        self.track_idx, self.clip_pos, self.last_id = track_idx, 0, None
+        if track_idx < len(self.y_tracks):
+            buffer += _track_head_json(track_idx, self.y_tracks[track_idx])
+
+    def _resume(self, y_clips):
+        """Re-find the position after the last written clip if edits shifted it"""
+        if self.last_id is None:
+            return
+        pos = self.clip_pos
+        if 0 < pos <= len(y_clips) and y_clips[pos - 1].get("_id") == self.last_id:
+            return
+        for pos, y_clip in enumerate(y_clips):
+            if y_clip.get("_id") == self.last_id:
+                self.clip_pos = pos + 1
+                return
+        # The last written clip was removed: carry on from the same offset
+        self.clip_pos = min(self.clip_pos, len(y_clips))
+
+
+def iter_otio_chunks(doc: Doc, buffer_size: int = 1 << 16, name: str = "Collaborative Timeline") -> Iterator[bytes]:
+    """
+    OTIO JSON in ~buffer_size chunks, read from the live doc. Each chunk is read in
+    one transaction; edits landing between chunks are seen by later chunks but
+    never tear the JSON or repeat a clip.
+    """
+    cursor = _ExportCursor(doc, name)
+    while not cursor.done:
+        with doc.transaction():
+            chunk = cursor.read(buffer_size)
+        yield chunk
+
+async def stream_otio_json(doc: Doc, buffer_size: int = 1 << 16) -> AsyncIterator[bytes]:
+    """
+    Async chunks for an HTTP streaming response, read from the live doc without
+    copying it, yielding to the event loop between chunks.
+    """
+    for chunk in iter_otio_chunks(doc, buffer_size):
+        yield chunk
+        await asyncio.sleep(0)
+
+
+# --- Import ---
+
+# Keys whose values are descended into instead of decoded whole
+_STRUCTURAL_KEYS = ("tracks", "children")
+
+class _Frame:
+    __slots__ = ("is_object", "key", "fields", "state", "track_started")
+
+    def __init__(self, is_object: bool):
+        self.is_object = is_object
+        self.key: Optional[str] = None
+        self.fields: Dict[str, Any] = {}
+        self.state = "first"
+        self.track_started = False
+
+
+class OTIOStreamParser:
+    """
+    Push parser for OTIO JSON. feed() text/bytes chunks and get events:
+    ("track_start", fields), ("clip", fields), ("track_end", fields), ("timeline", fields).
+    Clip fields are the decoded OTIO clip keys (name, media_reference, source_range, metadata, ...).
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._frames: List[_Frame] = []
+        self._started = False
+        self._eof = False
+
+    def feed(self, chunk: Union[bytes, str]) -> List[Tuple[str, Dict[str, Any]]]:
+        self._buffer = self._buffer[self._pos:] + (
+            self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        )
+        self._pos = 0
+        return self._parse()
+
+    def close(self) -> List[Tuple[str, Dict[str, Any]]]:
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(b"", final=True)
+        self._pos = 0
+        self._eof = True
+        events = self._parse()
+        if self._frames or not self._started:
+            raise ValueError("Truncated OTIO JSON")
+        return events
+
+    def _skip_ws(self) -> bool:
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in " \t\r\n":
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _decode(self):
+        """Decode one complete JSON value at the cursor; raises _NeedMore if it may be cut off"""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if self._eof:
+                raise ValueError(f"Invalid OTIO JSON at offset {self._pos}")
+            raise _NeedMore()
+        if end == len(self._buffer) and not self._eof and isinstance(value, (int, float)):
+            raise _NeedMore()  # A number at the end of the buffer may continue in the next chunk
+        self._pos = end
+        return value
+
+    def _parse(self) -> List[Tuple[str, Dict[str, Any]]]:
+        events: List[Tuple[str, Dict[str, Any]]] = []
+        try:
+            while self._skip_ws():
+                if not self._frames:
+                    if self._started:
+                        raise ValueError("Unexpected data after OTIO document")
+                    if self._buffer[self._pos] != "{":
+                        raise ValueError("OTIO document must be a JSON object")
+                    self._pos += 1
+                    self._frames.append(_Frame(is_object=True))
+                    self._started = True
+                    continue
+                self._step(self._frames[-1], events)
+        except _NeedMore:
+            pass
+        return events
+
+    def _step(self, frame: _Frame, events: List[Tuple[str, Dict[str, Any]]]):
+        c = self._buffer[self._pos]
+
+        if frame.state in ("first", "next") and frame.is_object:
+            if c == "}" and frame.state == "first":
+                self._pos += 1
+                self._close(events)
+                return
+            key = self._decode()
+            if not isinstance(key, str):
+                raise ValueError(f"Invalid OTIO JSON key at offset {self._pos}")
+            frame.key = key
+            frame.state = "colon"
+        elif frame.state == "colon":
+            if c != ":":
+                raise ValueError(f"Expected ':' at offset {self._pos}")
+            self._pos += 1
+            frame.state = "value"
+        elif frame.state in ("first", "next", "value"):
+            if not frame.is_object and c == "]" and frame.state == "first":
+                self._pos += 1
+                self._close(events)
+                return
+            descend = c in "{[" and (not frame.is_object or frame.key in _STRUCTURAL_KEYS)
+            if descend:
+                if frame.is_object and frame.key == "children" and frame.fields.get("OTIO_SCHEMA", "").startswith("Track."):
+                    frame.track_started = True
+                    events.append(("track_start", dict(frame.fields)))
+                self._pos += 1
+                frame.state = "after"
+                self._frames.append(_Frame(is_object=c == "{"))
+                return
+            value = self._decode()
+            if frame.is_object:
+                frame.fields[frame.key] = value
+            frame.state = "after"
+        else:  # after a value
+            if c == ",":
+                self._pos += 1
+                frame.state = "next"
+            elif c == ("}" if frame.is_object else "]"):
+                self._pos += 1
+                self._close(events)
+            else:
+                raise ValueError(f"Unexpected {c!r} at offset {self._pos}")
+
+    def _close(self, events: List[Tuple[str, Dict[str, Any]]]):
+        frame = self._frames.pop()
+        if not frame.is_object:
+            return
+        schema = frame.fields.get("OTIO_SCHEMA", "")
+        if schema.startswith("Clip."):
+            events.append(("clip", frame.fields))
+        elif schema.startswith("Track."):
+            if not frame.track_started:
+                events.append(("track_start", frame.fields))
+            events.append(("track_end", frame.fields))
+        elif schema.startswith("Timeline."):
+            events.append(("timeline", frame.fields))
+
+
+class _NeedMore(Exception):
+    """Internal: the buffered input ends inside a value"""
+
+
+def iter_otio_events(chunks: Iterable[Union[bytes, str]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    parser = OTIOStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+def _seconds(rational: Optional[Dict[str, Any]], default: float) -> float:
+    if not rational:
+        return default
+    rate = rational.get("rate") or 1
+    return float(rational.get("value", 0)) / rate
+
+def clip_fields_from_otio(clip: Dict[str, Any]) -> Dict[str, Any]:
+    """Y.Map fields for a decoded OTIO clip, mirroring otio_schema.otio_clip_fields"""
+    source_range = clip.get("source_range") or {}
+    media_reference = clip.get("media_reference")
+    if media_reference is None:
+        # Clip.2 (OTIO >= 0.15) keeps several references keyed by name
+        references = clip.get("media_references") or {}
+        media_reference = references.get(clip.get("active_media_reference_key", "DEFAULT_MEDIA"))
+    media_reference = media_reference or {}
+    metadata = clip.get("metadata") or {}
+    return {
+        "_id": str(metadata.get("flowai_id") or uuid.uuid4()),
+        "name": clip.get("name", ""),
+        "media_url": media_reference.get("target_url", "") or "",
+        "start": _seconds(source_range.get("start_time"), 0.0),
+        "duration": _seconds(source_range.get("duration"), 5.0)
+    }
@@ -1,7 +1,21 @@
 # Lightweight stub for OpenTimelineIO to bypass build failures on newer Python versions (3.14+)
 # and environments with limited C++ toolchains.
+#
+# Classes use __slots__ so timelines with tens of thousands of clips stay compact,
+# and write_json()/to_json() serialize OTIO JSON straight into a buffer without
+# building the nested to_dict() tree (orjson is used when installed).
+
+import io
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 class RationalTime:
+    __slots__ = ("value", "rate")
+
     def __init__(self, value=0, rate=24):
         self.value = value
         self.rate = rate
@@ -14,6 +28,8 @@ class RationalTime:
         }
 
 class TimeRange:
+    __slots__ = ("start_time", "duration")
+
     def __init__(self, start_time=None, duration=None):
         self.start_time = start_time or RationalTime()
         self.duration = duration or RationalTime()
@@ -26,6 +42,8 @@ class TimeRange:
         }
 
 class ExternalReference:
+    __slots__ = ("target_url",)
+
     def __init__(self, target_url=""):
         self.target_url = target_url
     
@@ -37,6 +55,8 @@ class ExternalReference:
         }
 
 class Clip:
+    __slots__ = ("name", "media_reference", "source_range", "metadata")
+
     def __init__(self, name="", media_reference=None, source_range=None):
         self.name = name
         self.media_reference = media_reference or ExternalReference()
@@ -53,6 +73,8 @@ class Clip:
         }
 
 class Track:
+    __slots__ = ("name", "kind", "items")
+
     def __init__(self, name="", kind="Video"):
         self.name = name
         self.kind = kind
@@ -80,6 +102,8 @@ class Track:
         }
 
 class Stack:
+    __slots__ = ("tracks",)
+
     def __init__(self):
         self.tracks = []
     
@@ -103,6 +127,8 @@ class Stack:
         }
 
 class Timeline:
+    __slots__ = ("name", "tracks")
+
     def __init__(self, name=""):
         self.name = name
         self.tracks = Stack()
@@ -115,6 +141,95 @@ class Timeline:
             "metadata": {}
         }
 
+    def to_json(self) -> bytes:
+        return to_json(self)
+
+# --- Buffered JSON serialization ---
+
+if orjson is not None:
+    def _dumps(value) -> bytes:
+        return orjson.dumps(value)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def _dumps(value) -> bytes:
+        return _encoder.encode(value).encode("utf-8")
+
+def _time_json(rt: RationalTime) -> bytes:
+    return b'{"OTIO_SCHEMA":"RationalTime.1","value":%s,"rate":%s}' % (_dumps(rt.value), _dumps(rt.rate))
+
+def _clip_json(clip: Clip) -> bytes:
+    """A whole clip in one go: clips are leaves and by far the most numerous objects"""
+    tr = clip.source_range
+    return b"".join((
+        b'{"OTIO_SCHEMA":"Clip.1","name":', _dumps(clip.name),
+        b',"media_reference":{"OTIO_SCHEMA":"ExternalReference.1","target_url":',
+        _dumps(clip.media_reference.target_url), b',"metadata":{}}',
+        b',"source_range":{"OTIO_SCHEMA":"TimeRange.1","start_time":', _time_json(tr.start_time),
+        b',"duration":', _time_json(tr.duration), b'}',
+        b',"metadata":', _dumps(clip.metadata), b'}'
+    ))
+
+def _children(open_bytes: bytes, children, close_bytes: bytes) -> list:
+    """Work items for a container, in write order (comma-separated children)"""
+    items = [open_bytes]
+    for i, child in enumerate(children):
+        if i:
+            items.append(b",")
+        items.append(child)
+    items.append(close_bytes)
+    return items
+
+def _expand(obj) -> list:
+    """One level of an object: literal byte fragments and child objects still to expand"""
+    if isinstance(obj, Clip):
+        return [_clip_json(obj)]
+    if isinstance(obj, Track):
+        return _children(
+            b'{"OTIO_SCHEMA":"Track.1","name":%s,"kind":%s,"children":[' % (_dumps(obj.name), _dumps(obj.kind)),
+            obj.items,
+            b'],"metadata":{}}'
+        )
+    if isinstance(obj, Stack):
+        return _children(b'{"OTIO_SCHEMA":"Stack.1","children":[', obj.tracks, b'],"metadata":{}}')
+    if isinstance(obj, Timeline):
+        return [b'{"OTIO_SCHEMA":"Timeline.1","name":%s,"tracks":' % _dumps(obj.name), obj.tracks, b',"metadata":{}}']
+    return [_dumps(obj.to_dict())]
+
+def iter_json(obj):
+    """
+    Yield OTIO JSON fragments for `obj` using an explicit work stack instead of
+    recursion, so deep or huge timelines never build an intermediate dict tree.
+    """
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, bytes):
+            yield item
+        else:
+            stack.extend(reversed(_expand(item)))
+
+def write_json(obj, fp, buffer_size: int = 1 << 16) -> int:
+    """Write OTIO JSON to a binary file-like object in ~buffer_size chunks; returns bytes written"""
+    buffer = bytearray()
+    written = 0
+    for fragment in iter_json(obj):
+        buffer += fragment
+        if len(buffer) >= buffer_size:
+            fp.write(buffer)
+            written += len(buffer)
+            buffer.clear()
+    if buffer:
+        fp.write(buffer)
+        written += len(buffer)
+    return written
+
+def to_json(obj) -> bytes:
+    """OTIO JSON for a stub object, equivalent to json.dumps(obj.to_dict())"""
+    out = io.BytesIO()
+    write_json(obj, out)
+    return out.getvalue()
+
 schema = type('obj', (object,), {
     'Timeline': Timeline,
     'Track': Track,
@@ -0,0 +1,432 @@
+"""
+Timeline Index - Clip lookups by id and by time for a collaborative Y.Doc
+
+Keeps, per track:
+- the clip ids in array order (ClipOrder), so a clip's position is O(log n)
+- an IntervalIndex of clip [start, start + duration)
+
+Both are updated from `observe_deep` events on the "tracks" array as they
+arrive, so human, agent and relayed edits all keep them current: array
+deltas insert/delete clips (and tracks) in O(log n) per clip, and a
+start/duration change moves only that clip's interval. Renames and other
+non-positional field changes touch nothing. A track is only re-indexed
+from scratch when its whole clips array is replaced or a clip's `_id`
+changes.
+
+Observe events arrive when a transaction commits; clips appended inside a
+still-open transaction are registered with `record_append` so lookups in
+the same transaction find them.
+"""
+
+import logging
+import random
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pycrdt import Doc, Map
+
+logger = logging.getLogger("collab.timeline_index")
+
+
+class _Node:
+    """Treap node shared by ClipOrder (by position) and IntervalIndex (by start, id)"""
+
+    __slots__ = ("clip_id", "start", "end", "prio", "left", "right", "parent", "size", "max_end")
+
+    def __init__(self, clip_id: Optional[str], start: float = 0.0, end: float = 0.0):
+        self.clip_id = clip_id
+        self.start = start
+        self.end = end
+        self.prio = random.random()
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+        self.parent: Optional["_Node"] = None
+        self.size = 1
+        self.max_end = end
+
+
+def _pull(node: _Node):
+    """Recompute size and max end from the children and re-parent them"""
+    size, max_end = 1, node.end
+    left, right = node.left, node.right
+    if left is not None:
+        size += left.size
+        if left.max_end > max_end:
+            max_end = left.max_end
+        left.parent = node
+    if right is not None:
+        size += right.size
+        if right.max_end > max_end:
+            max_end = right.max_end
+        right.parent = node
+    node.size = size
+    node.max_end = max_end
+
+
+def _merge(a: Optional[_Node], b: Optional[_Node]) -> Optional[_Node]:
+    """Join two treaps where every node of `a` comes before every node of `b`"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        _pull(a)
+        return a
+    b.left = _merge(a, b.left)
+    _pull(b)
+    return b
+
+
+def _split_at(node: Optional[_Node], count: int) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """(first `count` nodes in order, the rest)"""
+    if node is None:
+        return None, None
+    left_size = node.left.size if node.left is not None else 0
+    if count <= left_size:
+        left, node.left = _split_at(node.left, count)
+        _pull(node)
+        return left, node
+    node.right, right = _split_at(node.right, count - left_size - 1)
+    _pull(node)
+    return node, right
+
+
+def _split_key(node: Optional[_Node], key: Tuple[float, str], inclusive: bool) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """(nodes with (start, id) < key, or <= key if inclusive; the rest)"""
+    if node is None:
+        return None, None
+    node_key = (node.start, node.clip_id)
+    if node_key < key or (inclusive and node_key == key):
+        node.right, right = _split_key(node.right, key, inclusive)
+        _pull(node)
+        return node, right
+    left, node.left = _split_key(node.left, key, inclusive)
+    _pull(node)
+    return left, node
+
+
+def _build(nodes: List[_Node]) -> Optional[_Node]:
+    """Treap over nodes already in order, in O(n) (Cartesian tree on the priorities)"""
+    stack: List[_Node] = []
+    for node in nodes:
+        node.left = node.right = None
+        last = None
+        while stack and stack[-1].prio < node.prio:
+            last = stack.pop()
+            _pull(last)
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    for node in reversed(stack):
+        _pull(node)
+    if not stack:
+        return None
+    stack[0].parent = None
+    return stack[0]
+
+
+def _in_order(node: Optional[_Node]) -> Iterator[_Node]:
+    stack: List[_Node] = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+class ClipOrder:
+    """
+    Clip ids of one track in array order.
+    Insert/delete by position and position-of-id are O(log n).
+    Clips without an `_id` keep their slot (None) so positions match the array.
+    """
+
+    def __init__(self, clip_ids: Iterable[Optional[str]] = ()):
+        self._nodes: Dict[str, _Node] = {}
+        self._root = _build(self._new_nodes(clip_ids))
+
+    def _new_nodes(self, clip_ids: Iterable[Optional[str]]) -> List[_Node]:
+        nodes = [_Node(clip_id) for clip_id in clip_ids]
+        for node in nodes:
+            if node.clip_id is not None:
+                self._nodes[node.clip_id] = node
+        return nodes
+
+    def insert(self, pos: int, clip_ids: List[Optional[str]]):
+        left, right = _split_at(self._root, pos)
+        self._root = _merge(_merge(left, _build(self._new_nodes(clip_ids))), right)
+        if self._root is not None:
+            self._root.parent = None
+
+    def delete(self, pos: int, count: int) -> List[str]:
+        """Remove `count` slots at `pos`; returns the ids that are no longer present"""
+        left, right = _split_at(self._root, pos)
+        removed, right = _split_at(right, count)
+        self._root = _merge(left, right)
+        if self._root is not None:
+            self._root.parent = None
+        gone = []
+        for node in _in_order(removed):
+            # With duplicate ids only the slot the id currently resolves to counts
+            if node.clip_id is not None and self._nodes.get(node.clip_id) is node:
+                del self._nodes[node.clip_id]
+                gone.append(node.clip_id)
+        return gone
+
+    def position(self, clip_id: str) -> Optional[int]:
+        node = self._nodes.get(clip_id)
+        if node is None:
+            return None
+        pos = node.left.size if node.left is not None else 0
+        while node.parent is not None:
+            parent = node.parent
+            if parent.right is node:
+                pos += (parent.left.size if parent.left is not None else 0) + 1
+            node = parent
+        return pos
+
+    def __contains__(self, clip_id: str) -> bool:
+        return clip_id in self._nodes
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return (node.clip_id for node in _in_order(self._root))
+
+    def __len__(self) -> int:
+        return self._root.size if self._root is not None else 0
+
+
+class IntervalIndex:
+    """
+    Intervals of one track in a treap keyed by (start, id), augmented with the
+    max end of each subtree. add/discard are O(log n); stabbing/overlap
+    queries are O(log n + k log n) for k matches.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[float, float, str]] = ()):
+        self._nodes: Dict[str, _Node] = {}
+        for start, end, clip_id in intervals:
+            self._nodes[clip_id] = _Node(clip_id, start, end)
+        self._root = _build(sorted(self._nodes.values(), key=lambda n: (n.start, n.clip_id)))
+
+    def add(self, start: float, end: float, clip_id: str):
+        """Insert or move a clip's interval"""
+        self.discard(clip_id)
+        node = self._nodes[clip_id] = _Node(clip_id, start, end)
+        left, right = _split_key(self._root, (start, clip_id), inclusive=False)
+        self._root = _merge(_merge(left, node), right)
+        self._root.parent = None
+
+    def discard(self, clip_id: str):
+        node = self._nodes.pop(clip_id, None)
+        if node is None:
+            return
+        key = (node.start, clip_id)
+        left, right = _split_key(self._root, key, inclusive=False)
+        _, right = _split_key(right, key, inclusive=True)
+        self._root = _merge(left, right)
+        if self._root is not None:
+            self._root.parent = None
+
+    def at(self, t: float) -> List[str]:
+        """Ids of clips covering time t (start <= t < end), in start order"""
+        found: List[str] = []
+        self._collect(self._root, t, True, t, found)
+        return found
+
+    def overlapping(self, start: float, end: float) -> List[str]:
+        """Ids of clips overlapping [start, end), in start order"""
+        found: List[str] = []
+        self._collect(self._root, end, False, start, found)
+        return found
+
+    def _collect(self, node: Optional[_Node], limit: float, inclusive: bool, after: float, found: List[str]):
+        """Clips starting before `limit` (or at it, if inclusive) whose end is past `after`"""
+        if node is None or node.max_end <= after:
+            return
+        self._collect(node.left, limit, inclusive, after, found)
+        if node.start < limit or (inclusive and node.start == limit):
+            if node.end > after:
+                found.append(node.clip_id)
+            self._collect(node.right, limit, inclusive, after, found)
+
+    def __contains__(self, clip_id: str) -> bool:
+        return clip_id in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+
+class _TrackIndex:
+    __slots__ = ("idx", "order", "intervals")
+
+    def __init__(self, idx: int, order: ClipOrder, intervals: IntervalIndex):
+        self.idx = idx
+        self.order = order
+        self.intervals = intervals
+
+
+def _clip_entry(y_clip) -> Tuple[Optional[str], float, float]:
+    """(clip id, start, end) of a clip map; id None for non-clips"""
+    if not isinstance(y_clip, Map):
+        return None, 0.0, 0.0
+    start = float(y_clip.get("start", 0.0))
+    return y_clip.get("_id"), start, start + float(y_clip.get("duration", 0.0))
+
+
+class TimelineIndex:
+    """Clip id and time-interval index kept in sync with a timeline Y.Doc"""
+
+    def __init__(self, doc: Doc):
+        self._y_tracks = doc["tracks"]
+        self._tracks: List[_TrackIndex] = []
+        self._track_of: Dict[str, _TrackIndex] = {}
+        # Clips appended inside the open transaction: clip id -> (track, position)
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._stale = True
+        self.metrics = {"track_rebuilds": 0, "full_rebuilds": 0, "incremental_updates": 0, "lookups": 0}
+        self._subscription = self._y_tracks.observe_deep(self._on_events)
+
+    def _on_events(self, events):
+        # The transaction committed: its appends are in the events now
+        self._pending.clear()
+        if self._stale:
+            return
+        try:
+            # Parents first, so nested paths refer to tracks/clips already applied
+            for event in sorted(events, key=lambda e: len(e.path)):
+                self._apply(event)
+        except Exception:
+            logger.exception("Timeline index lost sync; rebuilding on next lookup")
+            self._stale = True
+
+    def _apply(self, event):
+        path = event.path
+        if not path:
+            self._apply_tracks_delta(event.delta)
+        elif len(path) == 1:
+            if "clips" in event.keys:
+                self._reindex_track(path[0])  # Whole clips array replaced
+        elif len(path) == 2 and path[1] == "clips":
+            self._apply_clips_delta(self._tracks[path[0]], event.delta)
+        elif len(path) == 3:
+            keys = event.keys
+            if "_id" in keys:
+                self._reindex_track(path[0])
+            elif "start" in keys or "duration" in keys:
+                clip_id, start, end = _clip_entry(event.target)
+                track = self._track_of.get(clip_id)
+                if track is not None:
+                    track.intervals.add(start, end, clip_id)
+                    self.metrics["incremental_updates"] += 1
+
+    def _apply_tracks_delta(self, delta):
+        pos = 0
+        for op in delta:
+            if "retain" in op:
+                pos += op["retain"]
+            elif "delete" in op:
+                for track in self._tracks[pos:pos + op["delete"]]:
+                    self._forget(track, [clip_id for clip_id in track.order if clip_id is not None])
+                del self._tracks[pos:pos + op["delete"]]
+            elif "insert" in op:
+                self._tracks[pos:pos] = [self._index_track(pos, y_track) for y_track in op["insert"]]
+                pos += len(op["insert"])
+        for idx, track in enumerate(self._tracks):
+            track.idx = idx
+
+    def _apply_clips_delta(self, track: _TrackIndex, delta):
+        pos = 0
+        for op in delta:
+            if "retain" in op:
+                pos += op["retain"]
+            elif "delete" in op:
+                self._forget(track, track.order.delete(pos, op["delete"]))
+            elif "insert" in op:
+                entries = [_clip_entry(y_clip) for y_clip in op["insert"]]
+                track.order.insert(pos, [clip_id for clip_id, _, _ in entries])
+                for clip_id, start, end in entries:
+                    if clip_id is not None:
+                        self._track_of[clip_id] = track
+                        track.intervals.add(start, end, clip_id)
+                pos += len(entries)
+            self.metrics["incremental_updates"] += 1
+
+    def _forget(self, track: _TrackIndex, clip_ids: List[str]):
+        for clip_id in clip_ids:
+            track.intervals.discard(clip_id)
+            if self._track_of.get(clip_id) is track:
+                del self._track_of[clip_id]
+
+    def _index_track(self, idx: int, y_track) -> _TrackIndex:
+        y_clips = y_track.get("clips") if isinstance(y_track, Map) else None
+        entries = [_clip_entry(y_clip) for y_clip in (y_clips or ())]
+        track = _TrackIndex(
+            idx,
+            ClipOrder(clip_id for clip_id, _, _ in entries),
+            IntervalIndex((start, end, clip_id) for clip_id, start, end in entries if clip_id is not None)
+        )
+        for clip_id, _, _ in entries:
+            if clip_id is not None:
+                self._track_of[clip_id] = track
+        self.metrics["track_rebuilds"] += 1
+        return track
+
+    def _reindex_track(self, idx: int):
+        old = self._tracks[idx]
+        self._forget(old, [clip_id for clip_id in old.order if clip_id is not None])
+        self._tracks[idx] = self._index_track(idx, self._y_tracks[idx])
+
+    def invalidate(self):
+        """Re-index everything on the next lookup (e.g. after replacing the document)"""
+        self._stale = True
+
+    def record_append(self, track_idx: int, clip_id: str, pos: int):
+        """
+        Register a clip appended inside a still-open transaction, so lookups in
+        the same transaction find it. The commit's observe event indexes it for real.
+        """
+        self._pending[clip_id] = (track_idx, pos)
+
+    def locate(self, clip_id: str) -> Optional[Tuple[int, int]]:
+        """
+        (track index, position) of a clip, or None. Inside an open transaction the
+        position reflects the last commit (plus record_append), so callers verify it.
+        """
+        self._refresh()
+        self.metrics["lookups"] += 1
+        track = self._track_of.get(clip_id)
+        if track is not None:
+            return track.idx, track.order.position(clip_id)
+        return self._pending.get(clip_id)
+
+    def clips_at(self, track_idx: int, t: float) -> List[str]:
+        """Ids of clips on a track covering time t"""
+        self._refresh()
+        self.metrics["lookups"] += 1
+        if not 0 <= track_idx < len(self._tracks):
+            return []
+        return self._tracks[track_idx].intervals.at(t)
+
+    def clips_in_range(self, track_idx: int, start: float, end: float) -> List[str]:
+        """Ids of clips on a track overlapping [start, end)"""
+        self._refresh()
+        self.metrics["lookups"] += 1
+        if not 0 <= track_idx < len(self._tracks):
+            return []
+        return self._tracks[track_idx].intervals.overlapping(start, end)
+
+    def _refresh(self):
+        if not self._stale:
+            return
+        self._stale = False
+        self._track_of = {}
+        self._tracks = [self._index_track(idx, y_track) for idx, y_track in enumerate(self._y_tracks)]
+        self.metrics["full_rebuilds"] += 1
+
+    def close(self):
+        if self._subscription is not None:
+            self._y_tracks.unobserve(self._subscription)
+            self._subscription = None
@@ -0,0 +1,227 @@
+"""
+Timeline Snapshot - Columnar, memory-mappable binary format for read-only consumers
+
+Renderers, thumbnailers and analytics only need clip times, media and ids.
+A snapshot stores them per track as flat little-endian columns, so loading
+one is just parsing a fixed header and a small track directory; the columns
+are exposed as zero-copy memoryviews over the bytes or an mmap'd file.
+
+Layout (version 1, all offsets absolute, columns 8-byte aligned):
+
+    header      <4sHHIIQ   magic "FTLS", version, flags, n_tracks, n_strings, strings_offset
+    directory   n_tracks x <IIIIQQQQQ
+                n_clips, name_idx, kind_idx, reserved,
+                starts_offset, durations_offset, url_idx_offset, id_offsets_offset, id_blob_offset
+    per track   starts float64[n] | durations float64[n] | url_idx uint32[n]
+                | id offsets uint32[n + 1] | id blob (UTF-8)
+    strings     offsets uint32[n_strings + 1] | blob (UTF-8)
+
+Media URLs, track names and kinds are interned in the string table.
+Clips are stored in timeline (position) order.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterator, List, Tuple, Union
+
+from pycrdt import Doc
+
+SNAPSHOT_MAGIC = b"FTLS"
+SNAPSHOT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIIQ")
+_TRACK_ENTRY = struct.Struct("<IIIIQQQQQ")
+_ALIGN = 8
+_NATIVE_LE = sys.byteorder == "little"
+
+
+def _column_bytes(typecode: str, values) -> bytes:
+    column = array(typecode, values)
+    if not _NATIVE_LE:
+        column.byteswap()
+    return column.tobytes()
+
+
+def _padding(size: int) -> bytes:
+    return b"\0" * (-size % _ALIGN)
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.strings: List[bytes] = []
+
+    def intern(self, value: str) -> int:
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.strings)
+            self.strings.append(value.encode("utf-8"))
+        return idx
+
+
+def build_snapshot(doc: Doc) -> bytes:
+    """Serialize the doc's tracks into a columnar snapshot"""
+    strings = _StringTable()
+    tracks = []
+    for y_track in doc["tracks"]:
+        starts, durations, url_idx, ids = [], [], [], []
+        for y_clip in y_track.get("clips") or ():
+            starts.append(float(y_clip.get("start", 0.0)))
+            durations.append(float(y_clip.get("duration", 0.0)))
+            url_idx.append(strings.intern(y_clip.get("media_url", "") or ""))
+            ids.append(str(y_clip.get("_id", "")).encode("utf-8"))
+        tracks.append((
+            strings.intern(y_track.get("name", "") or ""),
+            strings.intern(y_track.get("kind", "Video") or "Video"),
+            starts, durations, url_idx, ids
+        ))
+
+    body: List[bytes] = []
+    offset = _HEADER.size + _TRACK_ENTRY.size * len(tracks)
+    offset += len(_padding(offset))
+    directory = []
+
+    def put(data: bytes) -> int:
+        nonlocal offset
+        start = offset
+        body.append(data)
+        body.append(_padding(len(data)))
+        offset += len(data) + len(body[-1])
+        return start
+
+    for name_idx, kind_idx, starts, durations, url_idx, ids in tracks:
+        id_offsets = [0]
+        for clip_id in ids:
+            id_offsets.append(id_offsets[-1] + len(clip_id))
+        directory.append(_TRACK_ENTRY.pack(
+            len(starts), name_idx, kind_idx, 0,
+            put(_column_bytes("d", starts)),
+            put(_column_bytes("d", durations)),
+            put(_column_bytes("I", url_idx)),
+            put(_column_bytes("I", id_offsets)),
+            put(b"".join(ids))
+        ))
+
+    string_offsets = [0]
+    for value in strings.strings:
+        string_offsets.append(string_offsets[-1] + len(value))
+    strings_offset = put(_column_bytes("I", string_offsets))
+    put(b"".join(strings.strings))
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(tracks), len(strings.strings), strings_offset)
+    head = header + b"".join(directory)
+    return head + _padding(len(head)) + b"".join(body)
+
+
+def write_snapshot(doc: Doc, path: str) -> int:
+    """Atomically write a snapshot file; returns its size"""
+    data = build_snapshot(doc)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+class SnapshotTrack:
+    """Columns of one track; numeric columns are zero-copy memoryviews"""
+
+    __slots__ = ("_snapshot", "name", "kind", "starts", "durations", "url_index", "_id_offsets", "_id_blob")
+
+    def __init__(self, snapshot: "TimelineSnapshot", entry: Tuple[int, ...]):
+        n_clips, name_idx, kind_idx, _, starts_off, durations_off, url_off, id_offsets_off, id_blob_off = entry
+        self._snapshot = snapshot
+        self.name = snapshot.string(name_idx)
+        self.kind = snapshot.string(kind_idx)
+        self.starts = snapshot._column(starts_off, "d", n_clips)
+        self.durations = snapshot._column(durations_off, "d", n_clips)
+        self.url_index = snapshot._column(url_off, "I", n_clips)
+        self._id_offsets = snapshot._column(id_offsets_off, "I", n_clips + 1)
+        self._id_blob = id_blob_off
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def clip_id(self, pos: int) -> str:
+        start, end = self._id_offsets[pos], self._id_offsets[pos + 1]
+        return bytes(self._snapshot._view[self._id_blob + start:self._id_blob + end]).decode("utf-8")
+
+    def media_url(self, pos: int) -> str:
+        return self._snapshot.string(self.url_index[pos])
+
+    def clips(self) -> Iterator[Tuple[str, float, float, str]]:
+        """(clip_id, start, duration, media_url) in timeline order"""
+        for pos in range(len(self)):
+            yield self.clip_id(pos), self.starts[pos], self.durations[pos], self.media_url(pos)
+
+
+class TimelineSnapshot:
+    """
+    Read-only view over snapshot bytes or a memory-mapped snapshot file.
+    Construction parses only the header and track directory.
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview, mmap.mmap]):
+        self._data = data
+        self._view = memoryview(data)
+        if len(self._view) < _HEADER.size:
+            raise ValueError("Not a timeline snapshot: too short")
+        magic, version, _, n_tracks, n_strings, strings_offset = _HEADER.unpack_from(self._view, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a timeline snapshot: bad magic")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported timeline snapshot version {version} (expected {SNAPSHOT_VERSION})")
+        self.version = version
+
+        self._string_offsets = self._column(strings_offset, "I", n_strings + 1)
+        self._string_blob = strings_offset + 4 * (n_strings + 1)
+        self._string_blob += -self._string_blob % _ALIGN
+        self._strings: Dict[int, str] = {}
+        self.tracks = [
+            SnapshotTrack(self, _TRACK_ENTRY.unpack_from(self._view, _HEADER.size + i * _TRACK_ENTRY.size))
+            for i in range(n_tracks)
+        ]
+
+    @classmethod
+    def open(cls, path: str) -> "TimelineSnapshot":
+        """Memory-map a snapshot file (pages are only read when columns are touched)"""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _column(self, offset: int, typecode: str, count: int):
+        raw = self._view[offset:offset + count * array(typecode).itemsize]
+        if len(raw) != count * array(typecode).itemsize:
+            raise ValueError("Truncated timeline snapshot")
+        if _NATIVE_LE:
+            return raw.cast(typecode)
+        column = array(typecode, raw.tobytes())
+        column.byteswap()
+        return column
+
+    def string(self, idx: int) -> str:
+        value = self._strings.get(idx)
+        if value is None:
+            start, end = self._string_offsets[idx], self._string_offsets[idx + 1]
+            value = self._strings[idx] = bytes(
+                self._view[self._string_blob + start:self._string_blob + end]
+            ).decode("utf-8")
+        return value
+
+    @property
+    def clip_count(self) -> int:
+        return sum(len(track) for track in self.tracks)
+
+    def release(self):
+        """Drop the memoryviews so an underlying mmap can be closed"""
+        for track in self.tracks:
+            for column in (track.starts, track.durations, track.url_index, track._id_offsets):
+                if isinstance(column, memoryview):
+                    column.release()
+        if isinstance(self._string_offsets, memoryview):
+            self._string_offsets.release()
+        self._view.release()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
@@ -8,19 +8,31 @@ claims in educational content, enabling truth-based monetization.
 
 Key Features:
 - Claim extraction from video transcripts
+- Streaming verification for live transcripts
+- Near-duplicate claim memoization across videos (MinHash)
+- Bounded, disk-backed report storage
 - Scientific literature retrieval (Semantic Scholar API)
 - Bibliometric scoring (H-index, citations, journal impact)
 - Evidence Score calculation for monetization
 """
 
 from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+from collections import OrderedDict
 from enum import Enum
 import asyncio
+import bisect
 import math
+import time
 from datetime import datetime
 import uuid
 import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from app.core.paths import data_path
 
 
 class VerificationStatus(Enum):
@@ -160,9 +172,14 @@ class ClaimExtractor:
         
         # Split into sentences (simplified)
         sentences = transcript.replace("!", ".").replace("?", ".").split(".")
+        time_index = self._build_time_index(transcript, timestamps) if timestamps else None
         
-        for idx, sentence in enumerate(sentences):
-            sentence = sentence.strip()
+        offset = 0
+        for idx, raw_sentence in enumerate(sentences):
+            sentence_offset = offset
+            offset += len(raw_sentence) + 1  # +1 for the delimiter
+            
+            sentence = raw_sentence.strip()
             if len(sentence) < self.min_claim_length:
                 continue
             
@@ -171,12 +188,21 @@ class ClaimExtractor:
             if claim_type:
                 confidence = self._calculate_extraction_confidence(sentence)
                 
+                if time_index:
+                    lead = len(raw_sentence) - len(raw_sentence.lstrip())
+                    start_char = sentence_offset + lead
+                    timestamp_start = self._time_at(time_index, start_char)
+                    timestamp_end = self._time_at(time_index, start_char + len(sentence))
+                else:
+                    timestamp_start = idx * 5.0  # Approximate
+                    timestamp_end = (idx + 1) * 5.0
+                
                 claim = ExtractedClaim(
                     claim_id=str(uuid.uuid4()),
                     text=sentence[:self.max_claim_length],
                     claim_type=claim_type,
-                    timestamp_start=idx * 5.0,  # Approximate
-                    timestamp_end=(idx + 1) * 5.0,
+                    timestamp_start=timestamp_start,
+                    timestamp_end=timestamp_end,
                     confidence=confidence,
                     context=self._get_context(sentences, idx)
                 )
@@ -184,6 +210,73 @@ class ClaimExtractor:
         
         return claims
     
+    def build_claim(
+        self,
+        sentence: str,
+        timestamp_start: float,
+        timestamp_end: float,
+        context: str = ""
+    ) -> Optional[ExtractedClaim]:
+        """Build a claim from a single sentence, or None if it is not verifiable"""
+        sentence = sentence.strip()
+        if len(sentence) < self.min_claim_length:
+            return None
+        
+        claim_type = self._identify_claim_type(sentence)
+        if not claim_type:
+            return None
+        
+        return ExtractedClaim(
+            claim_id=str(uuid.uuid4()),
+            text=sentence[:self.max_claim_length],
+            claim_type=claim_type,
+            timestamp_start=timestamp_start,
+            timestamp_end=timestamp_end,
+            confidence=self._calculate_extraction_confidence(sentence),
+            context=context[:200]
+        )
+    
+    @staticmethod
+    def _build_time_index(
+        transcript: str,
+        timestamps: List[Tuple[float, float, str]]
+    ) -> List[Tuple[int, int, float, float]]:
+        """
+        Locate each (start, end, text) segment in the transcript
+        
+        Returns (char_start, char_end, time_start, time_end) spans in order.
+        Segments that cannot be found in the transcript are skipped.
+        """
+        index = []
+        cursor = 0
+        for start, end, text in timestamps:
+            text = text.strip()
+            if not text:
+                continue
+            pos = transcript.find(text, cursor)
+            if pos == -1:
+                continue
+            index.append((pos, pos + len(text), float(start), float(end)))
+            cursor = pos + len(text)
+        return index
+    
+    @staticmethod
+    def _time_at(index: List[Tuple[int, int, float, float]], char_pos: int) -> float:
+        """Interpolate the media time of a character offset from a time index"""
+        if not index:
+            return 0.0
+        
+        pos = bisect.bisect_right([span[0] for span in index], char_pos) - 1
+        if pos < 0:
+            return index[0][2]
+        
+        char_start, char_end, time_start, time_end = index[pos]
+        if char_pos >= char_end:
+            return time_end
+        
+        fraction = (char_pos - char_start) / max(char_end - char_start, 1)
+        return time_start + fraction * (time_end - time_start)
+    
     def _identify_claim_type(self, text: str) -> Optional[ClaimType]:
         """Identify the type of claim based on content"""
         text_lower = text.lower()
@@ -233,6 +326,89 @@ class ClaimExtractor:
         return " ".join(context_parts)[:200]
 
 
+class StreamingClaimExtractor:
+    """
+    Incremental claim extraction for live transcripts
+    
+    Transcript segments arrive with real (start, end) timestamps. Text is
+    buffered until a sentence terminator is seen, so sentences that span
+    segment boundaries are extracted once, with timestamps interpolated
+    from the segments they came from.
+    """
+    
+    SENTENCE_TERMINATORS = ".!?"
+    
+    def __init__(self, extractor: Optional[ClaimExtractor] = None):
+        self.extractor = extractor or ClaimExtractor()
+        self._buffer = ""
+        # (char_start, char_end, time_start, time_end) spans within _buffer
+        self._spans: List[Tuple[int, int, float, float]] = []
+        self._previous_sentence = ""
+    
+    def feed(self, start: float, end: float, text: str) -> List[ExtractedClaim]:
+        """Add a transcript segment and return claims from completed sentences"""
+        text = text.strip()
+        if not text:
+            return []
+        
+        if self._buffer:
+            self._buffer += " "
+        char_start = len(self._buffer)
+        self._buffer += text
+        self._spans.append((char_start, len(self._buffer), float(start), float(end)))
+        
+        cut = max(self._buffer.rfind(t) for t in self.SENTENCE_TERMINATORS)
+        if cut == -1:
+            return []
+        return self._consume(cut + 1)
+    
+    def flush(self) -> List[ExtractedClaim]:
+        """Extract claims from any trailing, unterminated text"""
+        if not self._buffer:
+            return []
+        return self._consume(len(self._buffer))
+    
+    def _consume(self, length: int) -> List[ExtractedClaim]:
+        """Extract claims from the first `length` buffered characters and drop them"""
+        claims = []
+        sentence_start = 0
+        for pos in range(length + 1):
+            if pos < length and self._buffer[pos] not in self.SENTENCE_TERMINATORS:
+                continue
+            
+            raw_sentence = self._buffer[sentence_start:pos]
+            sentence = raw_sentence.strip()
+            if sentence:
+                lead = len(raw_sentence) - len(raw_sentence.lstrip())
+                start_char = sentence_start + lead
+                claim = self.extractor.build_claim(
+                    sentence,
+                    timestamp_start=ClaimExtractor._time_at(self._spans, start_char),
+                    timestamp_end=ClaimExtractor._time_at(self._spans, start_char + len(sentence)),
+                    context=self._previous_sentence
+                )
+                if claim:
+                    claims.append(claim)
+                self._previous_sentence = sentence
+            sentence_start = pos + 1
+        
+        # Drop the consumed text and rebase the remaining time spans onto it
+        rest = self._buffer[length:]
+        cut = length + len(rest) - len(rest.lstrip())
+        remaining = []
+        for char_start, char_end, time_start, time_end in self._spans:
+            if char_end <= cut:
+                continue
+            if char_start < cut:
+                # Segment straddles the cut: keep only its unconsumed tail
+                time_start = ClaimExtractor._time_at([(char_start, char_end, time_start, time_end)], cut)
+                char_start = cut
+            remaining.append((char_start - cut, char_end - cut, time_start, time_end))
+        self._buffer = self._buffer[cut:]
+        self._spans = remaining
+        return claims
+
+
 class BibliometricScorer:
     """
     Calculate bibliometric scores for sources
@@ -318,6 +494,13 @@ class RAGRetriever:
     
     def __init__(self):
         self.cache: Dict[str, List[ScientificSource]] = {}
+        # Single-flight: cache_key -> fetch task shared by concurrent identical queries
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.metrics = {
+            "cache_hits": 0,
+            "backend_calls": 0,
+            "coalesced_requests": 0
+        }
         
     async def retrieve_sources(
         self,
@@ -327,13 +510,49 @@ class RAGRetriever:
         """
         Retrieve relevant scientific sources for a query
         
-        In production, this would call Semantic Scholar API.
+        Concurrent calls for the same query share one in-flight backend
+        request instead of each missing the cache. The request runs in its
+        own task, so cancelling any caller (including the first) leaves the
+        others waiting on it.
         """
         # Check cache
         cache_key = hashlib.md5(query.encode()).hexdigest()
         if cache_key in self.cache:
+            self.metrics["cache_hits"] += 1
             return self.cache[cache_key]
         
+        task = self._in_flight.get(cache_key)
+        if task is not None:
+            self.metrics["coalesced_requests"] += 1
+        else:
+            self.metrics["backend_calls"] += 1
+            task = asyncio.create_task(self._fetch_and_cache(cache_key, query, max_results))
+            # Retrieve the outcome even if every caller was cancelled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._in_flight[cache_key] = task
+        return await asyncio.shield(task)
+    
+    async def _fetch_and_cache(self, cache_key: str, query: str, max_results: int) -> List[ScientificSource]:
+        try:
+            sources = await self._fetch_sources(query, max_results)
+            self.cache[cache_key] = sources
+            return sources
+        finally:
+            del self._in_flight[cache_key]
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self.metrics, "in_flight": len(self._in_flight), "cached_queries": len(self.cache)}
+    
+    async def _fetch_sources(
+        self,
+        query: str,
+        max_results: int
+    ) -> List[ScientificSource]:
+        """
+        Fetch sources from the literature backend
+        
+        In production, this would call Semantic Scholar API.
+        """
         # Simulate API response with realistic-looking data
         sources = []
         
@@ -355,7 +574,6 @@ class RAGRetriever:
             )
             sources.append(source)
         
-        self.cache[cache_key] = sources
         return sources
     
     async def verify_claim_against_sources(
@@ -393,6 +611,510 @@ class RAGRetriever:
         return strength, supporting, contradicting
 
 
+class StreamingVerificationSession:
+    """
+    Live verification session for a streaming video
+    
+    Transcript segments are fed as they arrive; each extracted claim is
+    verified in the background and its result is pushed to `results()`
+    as soon as it completes. `close()` flushes the trailing sentence,
+    waits for outstanding verifications and stores the final report.
+    """
+    
+    def __init__(self, service: "ValsciVerificationService", video_id: str, creator_id: str):
+        self.service = service
+        self.video_id = video_id
+        self.creator_id = creator_id
+        self.extractor = StreamingClaimExtractor(service.claim_extractor)
+        self.claims: List[ExtractedClaim] = []
+        self.claim_results: List[VerificationResult] = []
+        self.closed = False
+        self._pending: set = set()
+        self._results: asyncio.Queue = asyncio.Queue()
+    
+    async def add_segment(self, start: float, end: float, text: str) -> List[ExtractedClaim]:
+        """Feed a transcript segment; returns the claims it completed"""
+        if self.closed:
+            raise ValueError(f"Stream for video {self.video_id} is closed")
+        
+        claims = self.extractor.feed(start, end, text)
+        self._schedule(claims)
+        return claims
+    
+    async def results(self):
+        """Yield (claim, result) pairs as verifications complete, until closed"""
+        while True:
+            item = await self._results.get()
+            if item is None:
+                return
+            yield item
+    
+    async def close(self) -> VideoVerificationReport:
+        """Finish the stream and return the aggregated report"""
+        if not self.closed:
+            self.closed = True
+            self._schedule(self.extractor.flush())
+            if self._pending:
+                await asyncio.gather(*self._pending)
+            await self._results.put(None)
+            # Results arrive in completion order; report them in transcript order
+            order = {claim.claim_id: (claim.timestamp_start, i) for i, claim in enumerate(self.claims)}
+            self.claim_results.sort(key=lambda r: order[r.claim_id])
+
+        report = self.service._build_report(self.video_id, self.claims, self.claim_results)
+        await self.service.active_verifications.put_async(report)
+        return report
+    
+    def _schedule(self, claims: List[ExtractedClaim]):
+        for claim in claims:
+            self.claims.append(claim)
+            task = asyncio.create_task(self._verify(claim))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+    
+    async def _verify(self, claim: ExtractedClaim):
+        result = await self.service._verify_single_claim(claim)
+        self.claim_results.append(result)
+        await self._results.put((claim, result))
+
+
+class ClaimResultMemo:
+    """
+    Memo of verification results keyed by a normalized claim fingerprint
+    
+    Popular claims are repeated across thousands of videos with small
+    wording changes. Claims are normalized into word shingles and hashed
+    into a MinHash signature; LSH banding finds candidate near-duplicates
+    and a result is reused when the estimated Jaccard similarity is above
+    `similarity_threshold`. Entries expire after `ttl_seconds`.
+    """
+    
+    _MERSENNE_PRIME = (1 << 61) - 1
+    _STOPWORDS = {"a", "an", "the", "that", "this", "of", "in", "on", "to", "is", "are", "and", "it"}
+    
+    def __init__(
+        self,
+        similarity_threshold: float = 0.8,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 50000,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 2
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        
+        # Deterministic permutations so signatures are stable across processes;
+        # each one is seeded by its own index so no two are the same
+        self._perms = []
+        for i in range(num_perm):
+            seed = hashlib.sha256(b"valsci-minhash" + i.to_bytes(4, "big")).digest()
+            self._perms.append((
+                int.from_bytes(seed[:8], "big") % self._MERSENNE_PRIME | 1,
+                int.from_bytes(seed[8:16], "big") % self._MERSENNE_PRIME
+            ))
+        
+        # fingerprint -> (signature, result, stored_at)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, ...], VerificationResult, float]]" = OrderedDict()
+        # (band index, band hash) -> fingerprints
+        self._buckets: Dict[Tuple[int, int], set] = {}
+        
+        self.metrics = {
+            "lookups": 0,
+            "exact_hits": 0,
+            "near_duplicate_hits": 0,
+            "misses": 0,
+            "stale_evictions": 0,
+            "capacity_evictions": 0
+        }
+    
+    def normalize(self, text: str) -> List[str]:
+        """Lowercase, strip punctuation and drop stopwords"""
+        cleaned = "".join(c if c.isalnum() or c in "% " else " " for c in text.lower())
+        return [w for w in cleaned.split() if w not in self._STOPWORDS]
+    
+    def fingerprint(self, text: str) -> str:
+        """Exact fingerprint of the normalized claim text"""
+        return hashlib.sha1(" ".join(self.normalize(text)).encode()).hexdigest()
+    
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """MinHash signature over word shingles of the normalized claim"""
+        words = self.normalize(text)
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))}
+        hashes = [
+            int.from_bytes(hashlib.blake2b(sh.encode(), digest_size=8).digest(), "big")
+            for sh in shingles
+        ]
+        prime = self._MERSENNE_PRIME
+        return tuple(
+            min((a * h + b) % prime for h in hashes)
+            for a, b in self._perms
+        )
+    
+    def similarity(self, sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity between two signatures"""
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / self.num_perm
+    
+    def get(self, text: str) -> Optional[VerificationResult]:
+        """Return a memoized result for this claim or a near-duplicate of it"""
+        self.metrics["lookups"] += 1
+        now = time.time()
+        
+        fingerprint = self.fingerprint(text)
+        entry = self._fresh_entry(fingerprint, now)
+        if entry:
+            self._entries.move_to_end(fingerprint)
+            self.metrics["exact_hits"] += 1
+            return entry[1]
+        
+        signature = self.signature(text)
+        best_fp, best_sim = None, 0.0
+        for candidate in self._candidates(signature):
+            entry = self._fresh_entry(candidate, now)
+            if not entry:
+                continue
+            sim = self.similarity(signature, entry[0])
+            if sim > best_sim:
+                best_fp, best_sim = candidate, sim
+        
+        if best_fp and best_sim >= self.similarity_threshold:
+            self._entries.move_to_end(best_fp)
+            self.metrics["near_duplicate_hits"] += 1
+            return self._entries[best_fp][1]
+        
+        self.metrics["misses"] += 1
+        return None
+    
+    def put(self, text: str, result: VerificationResult):
+        """Memoize the verification result for a claim"""
+        fingerprint = self.fingerprint(text)
+        if fingerprint in self._entries:
+            self._remove(fingerprint)
+        
+        signature = self.signature(text)
+        self._entries[fingerprint] = (signature, result, time.time())
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(fingerprint)
+        
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.metrics["capacity_evictions"] += 1
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        hits = self.metrics["exact_hits"] + self.metrics["near_duplicate_hits"]
+        lookups = self.metrics["lookups"]
+        return {
+            **self.metrics,
+            "entries": len(self._entries),
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+    
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+        return [
+            (band, hash(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+    
+    def _candidates(self, signature: Tuple[int, ...]) -> set:
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        return candidates
+    
+    def _fresh_entry(self, fingerprint: str, now: float):
+        entry = self._entries.get(fingerprint)
+        if entry and now - entry[2] > self.ttl_seconds:
+            self._remove(fingerprint)
+            self.metrics["stale_evictions"] += 1
+            return None
+        return entry
+    
+    def _remove(self, fingerprint: str):
+        signature, _, _ = self._entries.pop(fingerprint)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(fingerprint)
+                if not bucket:
+                    del self._buckets[key]
+
+
+class VerificationReportStore:
+    """
+    Bounded, disk-backed store for video verification reports
+    
+    Recent reports stay in an in-memory LRU of at most `max_reports`
+    entries. Every report is also written to SQLite in a compact form:
+    journal and author names are interned in a shared string table and
+    sources are stored once per `paper_id`, with claim results referencing
+    them as (paper_id, relevance) pairs. Evicted reports are rehydrated
+    on access, so lookups keep working after eviction or restart.
+    
+    Supports the dict operations the service relies on
+    (`in`, `[]`, `[]=`, `len`, `pop`); async callers use the `*_async`
+    variants so SQLite reads and writes run off the event loop.
+    """
+    
+    def __init__(self, db_path: str = ":memory:", max_reports: int = 1000):
+        self.db_path = db_path
+        self.max_reports = max_reports
+        self._reports: "OrderedDict[str, VideoVerificationReport]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._string_ids: Dict[str, int] = {}
+        self._strings: Dict[int, str] = {}
+        # _lock guards the connection and string table, _cache_lock the LRU,
+        # so memory hits never wait behind a disk write
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+    
+    def __contains__(self, video_id: str) -> bool:
+        with self._cache_lock:
+            if video_id in self._reports:
+                return True
+        return self._stored(video_id)
+    
+    async def contains_async(self, video_id: str) -> bool:
+        """`in` with a cache miss checked in a worker thread"""
+        with self._cache_lock:
+            if video_id in self._reports:
+                return True
+        return await asyncio.to_thread(self._stored, video_id)
+    
+    def __getitem__(self, video_id: str) -> VideoVerificationReport:
+        report = self.get(video_id)
+        if report is None:
+            raise KeyError(video_id)
+        return report
+    
+    def __setitem__(self, video_id: str, report: VideoVerificationReport):
+        self.put(report)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+    
+    async def len_async(self) -> int:
+        """len() in a worker thread"""
+        return await asyncio.to_thread(len, self)
+    
+    def get(self, video_id: str) -> Optional[VideoVerificationReport]:
+        report = self._cached(video_id)
+        if report is None:
+            report = self._read(video_id)
+            if report is not None:
+                self._cache(report)
+        return report
+    
+    async def get_async(self, video_id: str) -> Optional[VideoVerificationReport]:
+        """get() with a cache miss read in a worker thread"""
+        report = self._cached(video_id)
+        if report is None:
+            report = await asyncio.to_thread(self._read, video_id)
+            if report is not None:
+                self._cache(report)
+        return report
+    
+    def put(self, report: VideoVerificationReport):
+        self._write(report)
+        self._cache(report)
+    
+    async def put_async(self, report: VideoVerificationReport):
+        """put() with the SQLite write in a worker thread"""
+        await asyncio.to_thread(self._write, report)
+        self._cache(report)
+    
+    def pop(self, video_id: str, default: Any = None) -> Any:
+        report = self.get(video_id)
+        if report is None:
+            return default
+        with self._cache_lock:
+            self._reports.pop(video_id, None)
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM reports WHERE video_id = ?", (video_id,))
+            db.commit()
+        return report
+    
+    def _cached(self, video_id: str) -> Optional[VideoVerificationReport]:
+        with self._cache_lock:
+            report = self._reports.get(video_id)
+            if report is not None:
+                self._reports.move_to_end(video_id)
+            return report
+    
+    def _stored(self, video_id: str) -> bool:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT 1 FROM reports WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return row is not None
+    
+    def _read(self, video_id: str) -> Optional[VideoVerificationReport]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT payload FROM reports WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            return self._from_compact(json.loads(row[0]))
+    
+    def _write(self, report: VideoVerificationReport):
+        with self._lock:
+            db = self._db()
+            payload = json.dumps(self._to_compact(report), separators=(",", ":"))
+            db.execute(
+                "INSERT OR REPLACE INTO reports (video_id, payload) VALUES (?, ?)",
+                (report.video_id, payload)
+            )
+            db.commit()
+    
+    def _cache(self, report: VideoVerificationReport):
+        with self._cache_lock:
+            self._reports[report.video_id] = report
+            self._reports.move_to_end(report.video_id)
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+    
+    def _db(self) -> sqlite3.Connection:
+        """Open the database lazily so importing the service touches no files"""
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS strings (id INTEGER PRIMARY KEY, value TEXT UNIQUE NOT NULL);
+                CREATE TABLE IF NOT EXISTS sources (paper_id TEXT PRIMARY KEY, payload TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS reports (video_id TEXT PRIMARY KEY, payload TEXT NOT NULL);
+            """)
+            for string_id, value in self._conn.execute("SELECT id, value FROM strings"):
+                self._string_ids[value] = string_id
+                self._strings[string_id] = value
+        return self._conn
+    
+    def _intern(self, value: str) -> int:
+        if value not in self._string_ids:
+            cursor = self._conn.execute("INSERT INTO strings (value) VALUES (?)", (value,))
+            self._string_ids[value] = cursor.lastrowid
+            self._strings[cursor.lastrowid] = value
+        return self._string_ids[value]
+    
+    def _source_refs(self, sources: List[ScientificSource]) -> List[List[Any]]:
+        """Store each source once and return (paper_id, relevance) references"""
+        for source in sources:
+            payload = [
+                source.title,
+                [self._intern(a) for a in source.authors],
+                source.publication_year,
+                self._intern(source.journal),
+                source.citation_count,
+                source.h_index_avg,
+                source.doi,
+                source.abstract,
+                source.credibility_score
+            ]
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sources (paper_id, payload) VALUES (?, ?)",
+                (source.paper_id, json.dumps(payload, separators=(",", ":")))
+            )
+        return [[s.paper_id, s.relevance_score] for s in sources]
+    
+    def _load_sources(self, refs: List[List[Any]]) -> List[ScientificSource]:
+        sources = []
+        for paper_id, relevance in refs:
+            row = self._conn.execute(
+                "SELECT payload FROM sources WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            title, author_ids, year, journal_id, citations, h_index, doi, abstract, credibility = json.loads(row[0])
+            sources.append(ScientificSource(
+                paper_id=paper_id,
+                title=title,
+                authors=[self._strings[a] for a in author_ids],
+                publication_year=year,
+                journal=self._strings[journal_id],
+                citation_count=citations,
+                h_index_avg=h_index,
+                doi=doi,
+                abstract=abstract,
+                relevance_score=relevance,
+                credibility_score=credibility
+            ))
+        return sources
+    
+    def _to_compact(self, report: VideoVerificationReport) -> Dict[str, Any]:
+        return {
+            "id": report.video_id,
+            "v": [
+                report.total_claims,
+                report.verified_claims,
+                report.partially_verified_claims,
+                report.unverified_claims,
+                report.disputed_claims,
+                report.overall_evidence_score,
+                report.overall_credibility,
+                report.token_reward_multiplier,
+                report.created_at.isoformat()
+            ],
+            "c": [
+                [
+                    r.claim_id,
+                    r.status.value,
+                    r.evidence_strength.value,
+                    self._source_refs(r.supporting_sources),
+                    self._source_refs(r.contradicting_sources),
+                    r.evidence_score,
+                    r.bibliometric_score,
+                    r.explanation,
+                    r.verified_at.isoformat()
+                ]
+                for r in report.claim_results
+            ]
+        }
+    
+    def _from_compact(self, data: Dict[str, Any]) -> VideoVerificationReport:
+        (total, verified, partial, unverified, disputed,
+         evidence, credibility, multiplier, created_at) = data["v"]
+        claim_results = [
+            VerificationResult(
+                claim_id=claim_id,
+                status=VerificationStatus(status),
+                evidence_strength=EvidenceStrength(strength),
+                supporting_sources=self._load_sources(supporting),
+                contradicting_sources=self._load_sources(contradicting),
+                evidence_score=evidence_score,
+                bibliometric_score=biblio_score,
+                explanation=explanation,
+                verified_at=datetime.fromisoformat(verified_at)
+            )
+            for (claim_id, status, strength, supporting, contradicting,
+                 evidence_score, biblio_score, explanation, verified_at) in data["c"]
+        ]
+        return VideoVerificationReport(
+            video_id=data.get("id", ""),
+            total_claims=total,
+            verified_claims=verified,
+            partially_verified_claims=partial,
+            unverified_claims=unverified,
+            disputed_claims=disputed,
+            overall_evidence_score=evidence,
+            overall_credibility=credibility,
+            token_reward_multiplier=multiplier,
+            claim_results=claim_results,
+            created_at=datetime.fromisoformat(created_at)
+        )
+
+
 class ValsciVerificationService:
     """
     Main service for content verification and truth-based monetization
@@ -404,11 +1126,12 @@ class ValsciVerificationService:
     4. Evidence Score calculation for token rewards
     """
     
-    def __init__(self):
+    def __init__(self, report_store: Optional[VerificationReportStore] = None):
         self.claim_extractor = ClaimExtractor()
         self.bibliometric_scorer = BibliometricScorer()
         self.rag_retriever = RAGRetriever()
-        self.active_verifications: Dict[str, VideoVerificationReport] = {}
+        self.claim_memo = ClaimResultMemo()
+        self.active_verifications = report_store if report_store is not None else VerificationReportStore()
         
     async def verify_video_content(
         self,
@@ -430,6 +1153,21 @@ class ValsciVerificationService:
             result = await self._verify_single_claim(claim)
             claim_results.append(result)
         
+        report = self._build_report(video_id, claims, claim_results)
+        await self.active_verifications.put_async(report)
+        return report
+    
+    def open_stream(self, video_id: str, creator_id: str) -> StreamingVerificationSession:
+        """Start a streaming verification session for a live video"""
+        return StreamingVerificationSession(self, video_id, creator_id)
+    
+    def _build_report(
+        self,
+        video_id: str,
+        claims: List[ExtractedClaim],
+        claim_results: List[VerificationResult]
+    ) -> VideoVerificationReport:
+        """Aggregate per-claim results into a video report"""
         # Calculate overall scores
         verified_count = sum(1 for r in claim_results 
                            if r.status == VerificationStatus.VERIFIED)
@@ -455,7 +1193,7 @@ class ValsciVerificationService:
             len(claims)
         )
         
-        report = VideoVerificationReport(
+        return VideoVerificationReport(
             video_id=video_id,
             total_claims=len(claims),
             verified_claims=verified_count,
@@ -467,12 +1205,14 @@ class ValsciVerificationService:
             token_reward_multiplier=reward_multiplier,
             claim_results=claim_results
         )
-        
-        self.active_verifications[video_id] = report
-        return report
     
     async def _verify_single_claim(self, claim: ExtractedClaim) -> VerificationResult:
         """Verify a single claim against scientific literature"""
+        # Reuse the result of an identical or near-duplicate claim
+        memoized = self.claim_memo.get(claim.text)
+        if memoized:
+            return replace(memoized, claim_id=claim.claim_id)
+        
         # Retrieve relevant sources
         sources = await self.rag_retriever.retrieve_sources(claim.text)
         
@@ -502,7 +1242,7 @@ class ValsciVerificationService:
             status = VerificationStatus.UNVERIFIED
             explanation = "Insufficient evidence found to verify this claim."
         
-        return VerificationResult(
+        result = VerificationResult(
             claim_id=claim.claim_id,
             status=status,
             evidence_strength=strength,
@@ -512,6 +1252,8 @@ class ValsciVerificationService:
             bibliometric_score=bibliometric_score,
             explanation=explanation
         )
+        self.claim_memo.put(claim.text, result)
+        return result
     
     def _calculate_evidence_score(
         self,
@@ -568,10 +1310,10 @@ class ValsciVerificationService:
         claim_id: str
     ) -> Optional[VerificationResult]:
         """Get detailed verification result for a specific claim"""
-        if video_id not in self.active_verifications:
+        report = await self.active_verifications.get_async(video_id)
+        if report is None:
             return None
         
-        report = self.active_verifications[video_id]
         for result in report.claim_results:
             if result.claim_id == claim_id:
                 return result
@@ -583,10 +1325,10 @@ class ValsciVerificationService:
         video_id: str
     ) -> Dict[str, Any]:
         """Get monetization metrics based on verification results"""
-        if video_id not in self.active_verifications:
+        report = await self.active_verifications.get_async(video_id)
+        if report is None:
             return {"error": "Video not verified"}
         
-        report = self.active_verifications[video_id]
         
         # Calculate potential earnings
         base_reward_per_view = 0.001  # $0.001 per view
@@ -648,4 +1390,9 @@ class ValsciVerificationService:
 
 
 # Singleton instance
-valsci_service = ValsciVerificationService()
+valsci_service = ValsciVerificationService(
+    report_store=VerificationReportStore(
+        db_path=os.getenv("VALSCI_REPORT_DB") or data_path("valsci_reports.db"),
+        max_reports=int(os.getenv("VALSCI_REPORT_CACHE_SIZE", "1000"))
+    )
+)
@@ -3,6 +3,8 @@ import uuid
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from app.services.mcp_cache import mcp_read_cache
+
 class VideoGenerationService:
     """
     Handles generative video pipeline (Runway/Luma/Sora).
@@ -48,6 +50,8 @@ class VideoGenerationService:
             "status": "completed"
         }
         
+        # Project status reads report the tenant's last generation
+        mcp_read_cache.invalidate_tenant(proposal["tenant_id"])
         print(f"[GEN] Video generated successfully for proposal {proposal_id}")
         return result
 
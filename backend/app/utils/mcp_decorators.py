@@ -1,7 +1,11 @@
 import functools
+import inspect
 import json
-from typing import Any, Callable, Dict, Optional
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
 from app.services.finops_service import finops_service, BudgetStatus
+from app.services.mcp_cache import etag_matches, mcp_read_cache
+from app.services.mcp_metrics import mcp_metrics
 
 def budget_gate(static_cost: float = 0.0, cost_func: Optional[Callable[..., float]] = None, feature_tag: str = "general"):
     """
@@ -20,6 +24,7 @@ def budget_gate(static_cost: float = 0.0, cost_func: Optional[Callable[..., floa
             tenant_id = kwargs.get("tenant_context")
             
             if not tenant_id:
+                mcp_metrics.record_rejection(func.__name__, None, "missing_tenant_context")
                 return json.dumps({
                     "error": "FinOps Violation",
                     "message": "Security Policy: Missing tenant_context. Action blocked."
@@ -36,14 +41,79 @@ def budget_gate(static_cost: float = 0.0, cost_func: Optional[Callable[..., floa
             if status != BudgetStatus.ALLOWED:
                 # Log audit event (Simulated)
                 print(f"[AUDIT] BLOCKED: Tenant {tenant_id} action {func.__name__} reason: {status.value}")
+                mcp_metrics.record_rejection(func.__name__, tenant_id, status.value)
                 return json.dumps({
                     "error": "FinOps Blocked",
                     "reason": status.value,
                     "message": error_msg or "Action blocked by Budget Gate."
                 })
 
+            mcp_metrics.record_spend(func.__name__, tenant_id, cost)
+
             # 4. Execute Tool
             return await func(*args, **kwargs)
             
         return wrapper
     return decorator
+
+
+def read_cache(resource: str, key_args: Tuple[str, ...] = ("project_id",), ttl: Optional[float] = None):
+    """
+    Read-through cache for read-only MCP tools (see app.services.mcp_cache).
+
+    Args:
+        resource: Name the hit ratio is reported under.
+        key_args: Tool arguments that identify the result (tenant_context is always part of the key).
+        ttl: Entry lifetime in seconds; defaults to MCP_CACHE_TTL_SECONDS.
+
+    Entries are tagged project:<project_id> and tenant:<tenant_context> for invalidation.
+    JSON object results gain an "etag" field; a call whose `if_none_match` argument
+    matches it gets {"status": "not_modified", "etag": ...} instead of the full result.
+    Apply below budget_gate so cached reads are still metered.
+    """
+    def decorator(func: Callable):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            tenant_id = kwargs.get("tenant_context") or "_shared"
+            key = json.dumps([kwargs.get(arg) for arg in key_args], default=str)
+            tags = [f"tenant:{tenant_id}"]
+            if kwargs.get("project_id") is not None:
+                tags.append(f"project:{kwargs['project_id']}")
+
+            async def load():
+                result = func(*args, **kwargs)
+                return await result if inspect.isawaitable(result) else result
+
+            entry = await mcp_read_cache.get_or_load(resource, tenant_id, key, load, tags=tags, ttl=ttl)
+            if etag_matches(kwargs.get("if_none_match"), entry.etag):
+                mcp_read_cache.record_not_modified(resource)
+                return json.dumps({"status": "not_modified", "etag": entry.etag})
+            value = entry.value
+            if isinstance(value, str) and value.endswith("}") and value.startswith("{") and len(value) > 2:
+                # Splice the ETag in rather than re-encoding the cached payload
+                return f'{value[:-1]},"etag":{json.dumps(entry.etag)}}}'
+            return value
+
+        return wrapper
+    return decorator
+
+
+def instrument_tool(func: Callable):
+    """
+    Record latency per tool and tenant (see app.services.mcp_metrics).
+    Apply directly under @mcp.tool() so the timing covers the error handler,
+    budget gate and cache. Exceptions that escape are counted by type.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        tenant_id = kwargs.get("tenant_context")
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            mcp_metrics.record_error(func.__name__, tenant_id, getattr(e, "error_code", type(e).__name__))
+            raise
+        finally:
+            mcp_metrics.observe_call(func.__name__, tenant_id, time.perf_counter() - started)
+
+    return wrapper
@@ -0,0 +1,32 @@
+"""
+Collaboration Relay Broker
+
+Local pub/sub broker that lets several uvicorn workers on one host share
+collaboration rooms. Point every worker at it with COLLAB_RELAY_URL.
+
+Usage:
+    python -m app.workers.collab_relay_broker unix:///tmp/flowai-collab.sock
+    COLLAB_RELAY_URL=unix:///tmp/flowai-collab.sock uvicorn main:app --workers 4
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.services.collab_relay import LocalRelayBroker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pub/sub broker for cross-worker collaboration rooms.")
+    parser.add_argument(
+        "address", nargs="?", default="unix:///tmp/flowai-collab.sock",
+        help="unix:///path or tcp://host:port to listen on"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(LocalRelayBroker(args.address).serve_forever())
+
+
+if __name__ == "__main__":
+    main()
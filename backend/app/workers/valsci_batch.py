@@ -0,0 +1,234 @@
+"""
+Valsci Batch Verification Worker
+
+Re-verifies a back-catalogue of transcripts from a JSONL file of
+{"video_id", "transcript", "creator_id"} records. Extraction and scoring
+run in a process pool; results are streamed to a JSONL output file in
+input order and progress is checkpointed so an interrupted job resumes
+where it stopped.
+
+Usage:
+    python -m app.workers.valsci_batch input.jsonl output.jsonl --workers 8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger("valsci.batch")
+
+# Per-process service, created by the pool initializer
+_worker_service = None
+
+
+def _init_worker():
+    global _worker_service
+    from app.services.valsci_verification_service import ValsciVerificationService
+    _worker_service = ValsciVerificationService()
+
+
+def _verify_record(line: str) -> Dict[str, Any]:
+    """Verify one JSONL record inside a pool worker"""
+    try:
+        record = json.loads(line)
+        report = asyncio.run(_worker_service.verify_video_content(
+            video_id=record["video_id"],
+            transcript=record["transcript"],
+            creator_id=record.get("creator_id", "")
+        ))
+    except Exception as e:
+        return {"error": str(e), "input": line[:200]}
+
+    # Only the summary below reaches the output file; the full report is dropped to keep workers flat
+    _worker_service.active_verifications.pop(report.video_id, None)
+    return {
+        "video_id": report.video_id,
+        "total_claims": report.total_claims,
+        "verified_claims": report.verified_claims,
+        "partially_verified_claims": report.partially_verified_claims,
+        "unverified_claims": report.unverified_claims,
+        "disputed_claims": report.disputed_claims,
+        "overall_evidence_score": report.overall_evidence_score,
+        "overall_credibility": report.overall_credibility,
+        "token_reward_multiplier": report.token_reward_multiplier,
+        "created_at": report.created_at.isoformat()
+    }
+
+
+class BatchVerificationJob:
+    """
+    Resumable batch verification over a JSONL transcript file.
+
+    Results are written in input order, so the checkpoint only needs the
+    number of input lines consumed and the output size at that point.
+    Only one job per output path may run at a time in this process.
+    """
+
+    _active_outputs: Set[str] = set()
+    _active_lock = threading.Lock()
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        checkpoint_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        checkpoint_every: int = 100,
+        max_records: Optional[int] = None
+    ):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or f"{output_path}.checkpoint"
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.checkpoint_every = checkpoint_every
+        self.max_records = max_records
+        self.stats: Dict[str, Any] = {
+            "status": "pending",
+            "processed": 0,
+            "failed": 0,
+            "skipped": 0,
+            "elapsed_seconds": 0.0,
+            "videos_per_second": 0.0
+        }
+
+    @classmethod
+    def is_running(cls, output_path: str) -> bool:
+        with cls._active_lock:
+            return os.path.realpath(output_path) in cls._active_outputs
+
+    def run(self) -> Dict[str, Any]:
+        """Run (or resume) the job and return throughput stats"""
+        output = os.path.realpath(self.output_path)
+        with self._active_lock:
+            if output in self._active_outputs:
+                raise RuntimeError(f"A batch job is already writing to {self.output_path}")
+            self._active_outputs.add(output)
+        try:
+            return self._run()
+        except Exception as e:
+            # e.g. BrokenProcessPool when a worker dies; the checkpoint still allows a resume
+            self.stats.update(status="failed", error=str(e))
+            raise
+        finally:
+            self.stats["finished_at"] = time.time()
+            with self._active_lock:
+                self._active_outputs.discard(output)
+
+    def _run(self) -> Dict[str, Any]:
+        checkpoint = self._load_checkpoint()
+        lines_done = checkpoint["lines_done"]
+        self.stats.update(status="running", skipped=lines_done)
+        started = time.perf_counter()
+
+        with open(self.output_path, "ab") as out:
+            # Drop anything written after the last checkpoint
+            out.truncate(checkpoint["output_bytes"])
+            out.seek(checkpoint["output_bytes"])
+
+            with open(self.input_path, "r", encoding="utf-8") as src, \
+                    ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+                pending = deque()
+                submitted = 0
+
+                for line_no, line in enumerate(src):
+                    if line_no < lines_done:
+                        continue
+                    if self.max_records is not None and submitted >= self.max_records:
+                        break
+                    if not line.strip():
+                        pending.append(None)
+                    else:
+                        pending.append(pool.submit(_verify_record, line))
+                        submitted += 1
+
+                    if len(pending) >= self.max_in_flight:
+                        lines_done = self._drain_one(pending, out, lines_done, started)
+
+                while pending:
+                    lines_done = self._drain_one(pending, out, lines_done, started)
+
+            self._save_checkpoint(lines_done, out)
+
+        self._update_throughput(started)
+        self.stats["status"] = "completed"
+        logger.info(
+            f"Batch verification done: {self.stats['processed']} videos, "
+            f"{self.stats['failed']} failed, {self.stats['videos_per_second']:.1f} videos/s"
+        )
+        return self.stats
+
+    def _drain_one(self, pending: deque, out, lines_done: int, started: float) -> int:
+        """Write the oldest pending result and checkpoint periodically"""
+        future = pending.popleft()
+        lines_done += 1
+        if future is None:
+            return lines_done
+
+        result = future.result()
+        if "error" in result:
+            self.stats["failed"] += 1
+        else:
+            self.stats["processed"] += 1
+        out.write(json.dumps(result).encode("utf-8") + b"\n")
+
+        done = self.stats["processed"] + self.stats["failed"]
+        if done % self.checkpoint_every == 0:
+            self._save_checkpoint(lines_done, out)
+            self._update_throughput(started)
+            logger.info(f"Verified {done} videos ({self.stats['videos_per_second']:.1f} videos/s)")
+        return lines_done
+
+    def _update_throughput(self, started: float):
+        elapsed = time.perf_counter() - started
+        done = self.stats["processed"] + self.stats["failed"]
+        self.stats["elapsed_seconds"] = elapsed
+        self.stats["videos_per_second"] = done / elapsed if elapsed > 0 else 0.0
+
+    def _load_checkpoint(self) -> Dict[str, int]:
+        if not os.path.exists(self.checkpoint_path):
+            return {"lines_done": 0, "output_bytes": 0}
+        with open(self.checkpoint_path, "r") as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, lines_done: int, out):
+        out.flush()
+        os.fsync(out.fileno())
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"lines_done": lines_done, "output_bytes": out.tell()}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Valsci verification over a JSONL transcript file.")
+    parser.add_argument("input", help="JSONL file of {video_id, transcript, creator_id} records")
+    parser.add_argument("output", help="JSONL file to stream verification results to")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint path (default: <output>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--checkpoint-every", type=int, default=100)
+    parser.add_argument("--max-records", type=int, default=None, help="Stop after this many records")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    job = BatchVerificationJob(
+        args.input,
+        args.output,
+        checkpoint_path=args.checkpoint,
+        workers=args.workers,
+        checkpoint_every=args.checkpoint_every,
+        max_records=args.max_records
+    )
+    print(json.dumps(job.run(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
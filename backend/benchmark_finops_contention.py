@@ -0,0 +1,63 @@
+import asyncio
+import contextlib
+import io
+import threading
+import time
+from app.services.finops_service import FinOpsService
+from app.utils import mcp_decorators
+from app.utils.mcp_decorators import budget_gate
+
+N_TENANTS = 5_000
+N_THREADS = 4  # Each thread calls once per tenant
+COST = 1.0
+
+@budget_gate(static_cost=COST, feature_tag="benchmark")
+async def gated_tool(tenant_context: str):
+    return "SUCCESS"
+
+async def _worker_loop(tenants, results):
+    """One thread's event loop: one concurrent call per tenant"""
+    results.extend(await asyncio.gather(*(gated_tool(tenant_context=t) for t in tenants)))
+
+def run(lock_stripes: int):
+    service = FinOpsService(lock_stripes=lock_stripes)
+    service.MAX_RPS = 1_000
+    tenants = [f"tenant-{i}" for i in range(N_TENANTS)]
+    for tenant in tenants:
+        # Enough for all but one call: every tenant must end with exactly one rejection
+        service.set_credits(tenant, COST * (N_THREADS - 1))
+    mcp_decorators.finops_service = service
+
+    results = []
+    # Every thread serves every tenant (in a different order), so each tenant is hit from all threads
+    threads = [
+        threading.Thread(target=asyncio.run, args=(_worker_loop(tenants[i:] + tenants[:i], results),))
+        for i in range(0, N_TENANTS, N_TENANTS // N_THREADS)
+    ]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    allowed = sum(1 for r in results if r == "SUCCESS")
+    overspent = [t for t in tenants if service.get_balance(t) < 0]
+    print(
+        f"stripes={lock_stripes:<4} {len(results) / elapsed:10.0f} calls/s"
+        f"  contended {service.metrics['lock_contended']:6d}"
+        f"  allowed {allowed}  overspent tenants {len(overspent)}"
+    )
+    assert not overspent
+    assert allowed == N_TENANTS * (N_THREADS - 1)
+    return elapsed
+
+def benchmark_finops_contention():
+    print(f"--- FINOPS LOCK CONTENTION BENCHMARK ({N_TENANTS} tenants, {N_THREADS} threads, budget_gate) ---")
+    for stripes in (1, 16, 64, 256):
+        run(stripes)
+    print("\nEvery stripe count must allow exactly N_THREADS - 1 calls per tenant: no tenant overspends.")
+
+if __name__ == "__main__":
+    benchmark_finops_contention()
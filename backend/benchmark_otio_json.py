@@ -0,0 +1,67 @@
+import io
+import json
+import time
+import tracemalloc
+from app.services import otio_stub
+from app.services.otio_stub import Timeline, Track, Clip, ExternalReference, RationalTime, TimeRange
+
+N_CLIPS = 50_000
+N_TRACKS = 4
+
+def build_timeline(n_clips: int = N_CLIPS, n_tracks: int = N_TRACKS) -> Timeline:
+    tl = Timeline(name="Benchmark")
+    tracks = [Track(name=f"Video {i + 1}", kind="Video") for i in range(n_tracks)]
+    for i in range(n_clips):
+        clip = Clip(name=f"Clip {i}")
+        clip.media_reference = ExternalReference(target_url=f"https://cdn.flowai.io/assets/{i % 500}.mp4")
+        clip.source_range = TimeRange(
+            start_time=RationalTime(i * 48, 24),
+            duration=RationalTime(48, 24)
+        )
+        clip.metadata["flowai_id"] = f"clip-{i}"
+        tracks[i % n_tracks].append(clip)
+    for track in tracks:
+        tl.tracks.append(track)
+    return tl
+
+def timed(label, fn, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<38} {best * 1000:8.1f} ms")
+    return result
+
+def benchmark_otio_json():
+    print(f"--- OTIO STUB SERIALIZATION BENCHMARK ({N_CLIPS} clips, orjson={'yes' if otio_stub.orjson else 'no'}) ---")
+
+    tracemalloc.start()
+    tl = build_timeline()
+    built, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{'timeline memory':<38} {built / 1024 / 1024:8.1f} MiB ({built / N_CLIPS:.0f} B/clip)")
+
+    timed("build timeline", build_timeline, repeat=1)
+    legacy = timed("to_dict() + json.dumps", lambda: json.dumps(tl.to_dict()).encode("utf-8"))
+    fast = timed("to_json() buffered", lambda: otio_stub.to_json(tl))
+    timed("write_json() to file buffer", lambda: otio_stub.write_json(tl, io.BytesIO()))
+
+    for label, fn in (
+        ("peak memory: to_dict + dumps", lambda: json.dumps(tl.to_dict()).encode("utf-8")),
+        ("peak memory: write_json", lambda: otio_stub.write_json(tl, io.BytesIO()))
+    ):
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<38} {peak / 1024 / 1024:8.1f} MiB")
+
+    if json.loads(fast) != json.loads(legacy):
+        print("\nFAILURE: buffered serializer output differs from to_dict()")
+        exit(1)
+    print(f"\nSUCCESS: identical OTIO JSON ({len(fast) / 1024 / 1024:.1f} MiB)")
+
+if __name__ == "__main__":
+    benchmark_otio_json()
@@ -2,10 +2,20 @@
 FlowAI Backend - Main FastAPI Application (2026 Standards)
 """
 from fastapi import FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
 import json
+import uuid
 from datetime import datetime
-from app.services.collaboration_service import collaboration_service
+from typing import Optional
+from app.services.collaboration_service import (
+    collaboration_service,
+    encode_state_vector,
+    decode_state_vector,
+)
+from app.services.otio_stream import stream_otio_json
+from app.services.mcp_metrics import mcp_metrics
+from app.services.finops_service import finops_service
 
 # Import routers
 from app.api import video_generation, co_streaming, emotes, safety, staking
@@ -47,55 +57,88 @@ async def startup_event():
     This allows AI agents to discover tools/resources via standard protocol.
     """
     app.state.mcp_server = MCPServer("FlowAI Main Server", "1.0.0")
+    if finops_service.leases:
+        finops_service.leases.start()  # Return idle credit leases to the central store
     print("FlowAI 2026: MCP Server integrated in state.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered collaborative edits and spend entries, return credit leases, and leave the cross-worker relay before the process exits."""
+    await collaboration_service.persistence.flush_all()
+    if collaboration_service.relay:
+        await collaboration_service.relay.close()
+    if finops_service.leases:
+        await finops_service.leases.close()
+    if finops_service.ledger:
+        finops_service.ledger.close()
+
 @app.post("/api/v1/mcp/rpc")
-async def mcp_rpc_endpoint(request: dict):
+async def mcp_rpc_endpoint(request: Request):
     """
     Standard RPC entry point for MCP interactions.
-    Accepts JSON-RPC 2.0 formatted requests.
+    Accepts JSON-RPC 2.0 formatted requests, or a batch array of them
+    (dispatched concurrently, responses in request order).
     Supports session_token for multi-tenant auth.
     """
-    return await app.state.mcp_server.handle_request(json.dumps(request))
+    # Decode the body once and hand the parsed object straight to the dispatcher
+    response = await app.state.mcp_server.handle_request(await request.body())
+    if response is None:
+        return Response(status_code=204)  # Only notifications: nothing to return
+    return JSONResponse(response)
+
+@app.get("/api/v1/mcp/metrics")
+async def mcp_metrics_endpoint():
+    """Per-tool / per-tenant latency histograms, error codes, budget rejections and spend (Prometheus text format)."""
+    return Response(mcp_metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # --- 2026 Collaborative WebSocket (Step 4) ---
 @app.websocket("/ws/collab/{project_id}")
-async def collaboration_websocket(websocket: WebSocket, project_id: str):
+async def collaboration_websocket(websocket: WebSocket, project_id: str, state_vector: Optional[str] = None):
     """
     WebSocket endpoint for real-time multiplayer editing (Live OTIO).
     Protocol:
     - Connect -> Server sends full state (Binary Blob).
+    - Connect with ?state_vector=<base64> -> Server sends only the missing diff,
+      then {"type": "sync_step1", "state_vector": ...} so the client can send what the server lacks.
+    - Client sends {"type": "sync_step1", "state_vector": ...} -> Server replies with the diff.
     - Client sends Update -> Server applies -> Broadcasts to others.
-    - Client sends Awareness -> Server broadcasts.
+    - Client sends Awareness -> Server keeps the latest state per user and broadcasts
+      {"type": "presence", "users": {...changed}, "removed": [...]} at a capped rate.
     """
     await websocket.accept()
     session = await collaboration_service.get_or_create_session(project_id)
     
-    # Register connection
+    # Register connection; all sends go through its bounded queue
     user_id = str(uuid.uuid4())
-    # In production, we'd manage a list of sockets to broadcast
-    # For this mock, we assume 1 active socket per user for simplicity or just loopback
+    connection = collaboration_service.join(project_id, websocket, user_id)
     
     try:
-        # 1. Send Initial State (Sync Step 1)
-        # In real Yjs, this is a handshake. Here we just dump the doc.
-        initial_state = session.get_update()
-        await websocket.send_bytes(initial_state)
+        # 1. Initial sync: diff against the client's state vector, or the full doc
+        client_state = decode_state_vector(state_vector)
+        connection.enqueue(session.get_update(client_state))
+        if client_state is not None:
+            connection.enqueue(json.dumps({
+                "type": "sync_step1",
+                "state_vector": encode_state_vector(session.get_state_vector())
+            }))
+        presence = collaboration_service.connections.get_room(project_id).presence
+        if presence.states:
+            connection.enqueue(presence.snapshot(), droppable=True)
         
         while True:
             # Receive message (Binary = Sync, Text = Awareness/Signal)
             message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
             
             if "bytes" in message and message["bytes"]:
                 # Sync Update
                 update_data = message["bytes"]
                 session.apply_update(update_data)
+                collaboration_service.connections.broadcast_update(project_id, update_data, origin=connection)
                 
-                # In a real app, we would broadcast this 'update_data' to other connected sockets
-                # broadcast(update_data, exclude=websocket)
-                
-                # Acknowledge or Echo for verification
-                await websocket.send_text(json.dumps({"type": "ack", "bytes_processed": len(update_data)}))
+                # Acknowledge for verification
+                connection.enqueue(json.dumps({"type": "ack", "bytes_processed": len(update_data)}))
                 
             elif "text" in message and message["text"]:
                 # Awareness / Signaling
@@ -103,16 +146,77 @@ async def collaboration_websocket(websocket: WebSocket, project_id: str):
                 msg_type = data.get("type")
                 
                 if msg_type == "awareness":
-                    # Propagate cursor/presence
-                    # broadcast(data, exclude=websocket)
-                    pass
+                    # Keep the latest cursor/presence; the room sends rate-capped presence deltas
+                    state = {k: v for k, v in data.items() if k != "type"}
+                    collaboration_service.update_presence(project_id, user_id, state)
+                elif msg_type == "sync_step1":
+                    # Client-initiated handshake: reply with only what it is missing
+                    connection.enqueue(session.get_update(decode_state_vector(data.get("state_vector"))))
                 elif msg_type == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
+                    connection.enqueue(json.dumps({"type": "pong"}))
 
     except WebSocketDisconnect:
+        pass
+    finally:
+        await collaboration_service.leave(project_id, connection)
         print(f"User {user_id} disconnected from project {project_id}")
 
 
+@app.post("/api/v1/collab/{project_id}/actions")
+async def collaboration_agent_actions(project_id: str, request: dict):
+    """
+    Batched agent edits: {"actions": [{"type": "add_clip", ...}, ...]}.
+    Applied in one CRDT transaction, broadcast once and persisted once.
+    """
+    actions = request.get("actions")
+    if not isinstance(actions, list) or not actions:
+        raise HTTPException(status_code=400, detail="'actions' must be a non-empty list")
+    return await collaboration_service.handle_agent_actions(project_id, actions)
+
+
+@app.get("/api/v1/collab/{project_id}/export.otio")
+async def collaboration_export_otio(project_id: str):
+    """Stream the live timeline as OTIO JSON without building it in memory."""
+    session = await collaboration_service.get_or_create_session(project_id)
+    return StreamingResponse(
+        stream_otio_json(session.doc),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{project_id}.otio"'}
+    )
+
+
+@app.get("/api/v1/collab/{project_id}/snapshot")
+async def collaboration_snapshot(project_id: str):
+    """Columnar binary snapshot of the timeline for renderers and analytics."""
+    session = await collaboration_service.get_or_create_session(project_id)
+    return Response(content=session.to_snapshot(), media_type="application/octet-stream")
+
+
+@app.post("/api/v1/collab/{project_id}/import")
+async def collaboration_import_otio(project_id: str, request: Request, batch_size: int = 500):
+    """
+    Import an OTIO JSON request body into the live timeline.
+    The body is parsed as it arrives and applied in CRDT batches of `batch_size` clips.
+    A body that turns out invalid after batches were applied returns 400 with
+    status "partial" and the tracks/clips already on the timeline.
+    """
+    if not 1 <= batch_size <= 10000:
+        raise HTTPException(status_code=400, detail="'batch_size' must be between 1 and 10000")
+    try:
+        result = await collaboration_service.import_otio_stream(project_id, request.stream(), batch_size=batch_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result["status"] == "partial":
+        return JSONResponse(status_code=400, content=result)
+    return result
+
+
+@app.get("/api/v1/collab/metrics")
+async def collaboration_metrics():
+    """Per-room fan-out metrics (messages in vs. out, merged updates, slow clients)."""
+    return collaboration_service.connections.get_metrics()
+
+
 # --- Health Check ---
 @app.get("/health")
 async def health_check():
@@ -1,13 +1,20 @@
 from fastmcp import FastMCP
+from fastmcp.exceptions import NotFoundError, ValidationError as FastMCPValidationError
+from pydantic import ValidationError as PydanticValidationError
+import asyncio
+import base64
 import json
+import os
 import uuid
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Union
 
 # Initialize FastMCP Server with name and dependencies
 # Initialize FastMCP Server with name and dependencies
 mcp = FastMCP("FlowAI Core")
 
-from app.utils.mcp_decorators import budget_gate
+from app.utils.mcp_decorators import budget_gate, instrument_tool, read_cache
+from app.services.mcp_metrics import mcp_metrics
+from app.services.mcp_cache import compute_etag, etag_matches, mcp_read_cache
 from app.core.errors import (
     FlowAIError, 
     RateLimitError, 
@@ -17,6 +24,7 @@ from app.core.errors import (
 )
 import functools
 import logging
+import re
 
 # --- Error Handling ---
 
@@ -31,6 +39,7 @@ def mcp_error_handler(func):
             return await func(*args, **kwargs)
         except FlowAIError as e:
             logging.warning(f"FlowAI Error in {func.__name__}: {e.message}")
+            mcp_metrics.record_error(func.__name__, kwargs.get("tenant_context"), e.error_code)
             # Return the structured error dict directly. 
             # FastMCP will serialize this as the result payload if we don't raise.
             # However, for an *error* reponse in JSON-RPC, we effectively want to communicate failure.
@@ -39,6 +48,7 @@ def mcp_error_handler(func):
             return json.dumps(e.to_mcp_response())
         except Exception as e:
             logging.error(f"Unexpected error in {func.__name__}: {str(e)}")
+            mcp_metrics.record_error(func.__name__, kwargs.get("tenant_context"), "INTERNAL_ERROR")
             # Mask internal errors
             return json.dumps({
                 "error": {
@@ -68,15 +78,34 @@ def get_project_metadata(project_id: str) -> str:
     }
     return json.dumps(fake_data)
 
+@mcp.resource("flowai://cache/stats")
+def get_cache_stats() -> str:
+    """
+    Read-cache hit ratios per resource/tool (never cached itself).
+    """
+    return json.dumps(mcp_read_cache.stats())
+
+@mcp.resource("flowai://metrics/tools")
+def get_tool_metrics() -> str:
+    """
+    Per-tool latency, error codes, budget rejections and spend, with a per-tenant breakdown.
+    Lets agents find slow or expensive tools before calling them.
+    """
+    return json.dumps(mcp_metrics.summary())
+
 # --- Tools ---
 # Active actions that require parameters (action architecture)
 
 @mcp.tool()
+@instrument_tool
 @mcp_error_handler
 @budget_gate(static_cost=0.005, feature_tag="project_query") # Enforce a small cost for querying status
-async def query_project_status(project_id: str, tenant_context: Optional[str] = None) -> str:
+@read_cache("query_project_status")
+async def query_project_status(project_id: str, tenant_context: Optional[str] = None, if_none_match: Optional[str] = None) -> str:
     """
     Queries the detailed status of a project, enforcing tenant isolation.
+    Pass the previous response's etag as if_none_match to get a short
+    not_modified answer when nothing changed.
     """
     if not tenant_context:
         raise FlowAIError("Missing tenant context", "INVALID_PARAMS")
@@ -94,6 +123,7 @@ async def query_project_status(project_id: str, tenant_context: Optional[str] =
     })
 
 @mcp.tool()
+@instrument_tool
 @mcp_error_handler
 @budget_gate(static_cost=0.50, feature_tag="video_gen") # Professional generation is expensive
 async def generate_cloud_video(prompt: str, duration: int = 5, tenant_context: Optional[str] = None) -> str:
@@ -111,6 +141,8 @@ async def generate_cloud_video(prompt: str, duration: int = 5, tenant_context: O
     
     # Mock Response
     video_id = str(uuid.uuid4())
+    # Project status reports the last generation
+    mcp_read_cache.invalidate_tenant(tenant_context)
     return json.dumps({
         "status": "processing",
         "video_id": video_id,
@@ -120,6 +152,24 @@ async def generate_cloud_video(prompt: str, duration: int = 5, tenant_context: O
     })
 
 @mcp.tool()
+@instrument_tool
+@mcp_error_handler
+@budget_gate(cost_func=lambda **kwargs: 0.001 * len(kwargs.get("actions") or []), feature_tag="timeline_edit")
+async def edit_timeline_batch(project_id: str, actions: List[Dict[str, Any]], tenant_context: Optional[str] = None) -> str:
+    """
+    Applies a list of timeline actions (add_clip / update_clip / remove_clip)
+    to a live collaborative project in one transaction.
+    Prefer this over repeated single edits: one update, one save.
+    """
+    if not actions:
+        raise FlowAIError("No actions provided", "INVALID_PARAMS")
+
+    from app.services.collaboration_service import collaboration_service
+    result = await collaboration_service.handle_agent_actions(project_id, actions)
+    return json.dumps(result)
+
+@mcp.tool()
+@instrument_tool
 @mcp_error_handler
 async def get_finops_status(tenant_context: str) -> str:
     """
@@ -127,15 +177,17 @@ async def get_finops_status(tenant_context: str) -> str:
     Pre-check before expensive operations.
     """
     from app.services.finops_service import finops_service
-    balance = finops_service.get_balance(tenant_context)
+    balance = await finops_service.get_balance_async(tenant_context)
     return json.dumps({
         "tenant_id": tenant_context,
         "balance_usd": balance,
         "currency": "USD",
+        "rate_limit_rps": finops_service.get_rate_limit(tenant_context),
         "can_afford_generation": balance >= 0.50
     })
 
 @mcp.tool()
+@instrument_tool
 # No error handler needed for admin tool usually, but adding for consistency if desired.
 # Skipping for seed_credits to keep it simple, or add it if strict.
 async def seed_credits(tenant_context: str, amount: float) -> str:
@@ -143,9 +195,190 @@ async def seed_credits(tenant_context: str, amount: float) -> str:
     ADMIN TOOL: Seeds credits for a tenant for testing purposes.
     """
     from app.services.finops_service import finops_service
-    finops_service.set_credits(tenant_context, amount)
+    await finops_service.seed_credits(tenant_context, amount)
     return json.dumps({"status": "success", "tenant_id": tenant_context, "new_balance": amount})
 
+# --- JSON-RPC front-end for the HTTP endpoint ---
+
+JSONRPC_PARSE_ERROR = -32700
+JSONRPC_INVALID_REQUEST = -32600
+JSONRPC_METHOD_NOT_FOUND = -32601
+JSONRPC_INVALID_PARAMS = -32602
+JSONRPC_INTERNAL_ERROR = -32603
+
+# scheme://<id>/<path>: cached as "<scheme>/<path>", tagged "<scheme>:<id>"
+_RESOURCE_URI = re.compile(r"^(?P<scheme>[a-z][a-z0-9+.-]*)://(?P<id>[^/]+)(?P<path>/.*)?$")
+
+
+def _jsonable(value: Any) -> Any:
+    """Plain JSON data for MCP/pydantic result objects across FastMCP versions"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", by_alias=True, exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    return value
+
+
+class MCPServer:
+    """
+    In-process JSON-RPC 2.0 dispatcher over the FastMCP tools and resources,
+    used by the HTTP endpoint (stdio clients talk to `mcp.run()` directly).
+
+    Accepts an already-decoded request object or a batch array. Batch entries
+    are dispatched concurrently, at most `max_concurrency` at a time per batch,
+    and the response array keeps request order. Notifications (no "id") get
+    no response; a batch of only notifications returns None.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        version: str,
+        mcp_app: Optional[FastMCP] = None,
+        max_concurrency: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+        cached_schemes: Tuple[str, ...] = ("project",)
+    ):
+        self.name = name
+        self.version = version
+        self.mcp = mcp_app or mcp
+        self.max_concurrency = max_concurrency or int(os.getenv("MCP_BATCH_CONCURRENCY", "8"))
+        self.max_batch_size = max_batch_size or int(os.getenv("MCP_MAX_BATCH_SIZE", "100"))
+        # Resource reads under these URI schemes go through the read cache
+        self.cached_schemes = cached_schemes
+        self._methods = {
+            "initialize": self._initialize,
+            "ping": self._ping,
+            "tools/list": self._list_tools,
+            "tools/call": self._call_tool,
+            "resources/read": self._read_resource,
+        }
+
+    async def handle_request(self, request: Union[Dict[str, Any], List[Any], str, bytes]) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """Handle a single JSON-RPC request or a batch; strings/bytes are decoded once"""
+        if isinstance(request, (str, bytes)):
+            try:
+                request = json.loads(request)
+            except ValueError:
+                return self._error(None, JSONRPC_PARSE_ERROR, "Parse error")
+
+        if not isinstance(request, list):
+            return await self._dispatch(request)
+
+        if not request:
+            return self._error(None, JSONRPC_INVALID_REQUEST, "Empty batch")
+        if len(request) > self.max_batch_size:
+            return self._error(None, JSONRPC_INVALID_REQUEST, f"Batch exceeds {self.max_batch_size} requests")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(entry):
+            async with semaphore:
+                return await self._dispatch(entry)
+
+        responses = await asyncio.gather(*(bounded(entry) for entry in request))
+        responses = [r for r in responses if r is not None]
+        return responses or None
+
+    async def _dispatch(self, request: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+            request_id = request.get("id") if isinstance(request, dict) else None
+            return self._error(request_id, JSONRPC_INVALID_REQUEST, "Invalid Request")
+
+        request_id = request.get("id")
+        is_notification = "id" not in request
+        handler = self._methods.get(request["method"])
+        params = request.get("params") or {}
+
+        if handler is None:
+            if is_notification:
+                return None  # e.g. notifications/initialized
+            return self._error(request_id, JSONRPC_METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+        if not isinstance(params, dict):
+            return self._error(request_id, JSONRPC_INVALID_PARAMS, "params must be an object")
+
+        try:
+            result = await handler(params)
+        except (
+            ValueError, KeyError, TypeError, LookupError,
+            NotFoundError, FastMCPValidationError, PydanticValidationError
+        ) as e:
+            response = self._error(request_id, JSONRPC_INVALID_PARAMS, str(e))
+        except Exception as e:
+            logging.error(f"Unexpected error in MCP method {request['method']}: {str(e)}")
+            response = self._error(request_id, JSONRPC_INTERNAL_ERROR, "Internal Server Error")
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        return None if is_notification else response
+
+    @staticmethod
+    def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+    async def _initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "protocolVersion": params.get("protocolVersion", "2024-11-05"),
+            "capabilities": {"tools": {}, "resources": {}},
+            "serverInfo": {"name": self.name, "version": self.version}
+        }
+
+    async def _ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+    async def _list_tools(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        tools = await self.mcp.list_tools()
+        return {"tools": [_jsonable(t.to_mcp_tool() if hasattr(t, "to_mcp_tool") else t) for t in tools]}
+
+    async def _call_tool(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        name = params.get("name")
+        if not isinstance(name, str):
+            raise ValueError("tools/call requires a tool 'name'")
+        result = await self.mcp.call_tool(name, params.get("arguments") or {})
+        content = getattr(result, "content", result)
+        return {"content": _jsonable(list(content)), "isError": bool(getattr(result, "is_error", False))}
+
+    async def _read_resource(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        resources/read. Cacheable URIs are served from the read cache, keyed per
+        tenant_context; the ETag is returned in _meta, and a matching
+        params.ifNoneMatch gets an empty, notModified result.
+        """
+        uri = params.get("uri")
+        if not isinstance(uri, str):
+            raise ValueError("resources/read requires a 'uri'")
+        match = _RESOURCE_URI.match(uri)
+        if not match or match.group("scheme") not in self.cached_schemes:
+            contents = await self._load_resource(uri)
+            return {"contents": contents, "_meta": {"etag": compute_etag(contents)}}
+
+        resource = match.group("scheme") + (match.group("path") or "")
+        entry = await mcp_read_cache.get_or_load(
+            resource,
+            params.get("tenant_context") or "_shared",
+            uri,
+            lambda: self._load_resource(uri),
+            tags=(f"{match.group('scheme')}:{match.group('id')}",)
+        )
+        if etag_matches(params.get("ifNoneMatch"), entry.etag):
+            mcp_read_cache.record_not_modified(resource)
+            return {"contents": [], "_meta": {"etag": entry.etag, "notModified": True}}
+        return {"contents": entry.value, "_meta": {"etag": entry.etag}}
+
+    async def _load_resource(self, uri: str) -> List[Dict[str, Any]]:
+        result = await self.mcp.read_resource(uri)
+        contents = []
+        for item in getattr(result, "contents", None) or [result]:
+            data = getattr(item, "content", item)
+            mime_type = getattr(item, "mime_type", None) or "text/plain"
+            if isinstance(data, bytes):
+                contents.append({"uri": uri, "mimeType": mime_type, "blob": base64.b64encode(data).decode("ascii")})
+            else:
+                contents.append({"uri": uri, "mimeType": mime_type, "text": data})
+        return contents
+
+
 if __name__ == "__main__":
     mcp.run()
 
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# File-backed stores default to DATA_DIR; keep test runs out of backend/data
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="flowai-test-data-"))
@@ -0,0 +1,198 @@
+import pytest
+try:
+    import opentimelineio as otio
+except ImportError:
+    from app.services import otio_stub as otio
+
+from pycrdt import Doc, Array, Map
+
+from app.services.collaboration_service import CollaborationService, CollaborativeTimeline
+from app.services.otio_schema import otio_to_yjs
+
+
+def _add(clip_id: str, track: int = 0, start: float = 0.0):
+    return {
+        "type": "add_clip", "name": f"Clip {clip_id}", "url": f"http://cdn/{clip_id}.mp4",
+        "start": start, "duration": 2, "track": track, "id": clip_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_agent_edit_produces_small_update_and_keeps_human_edits():
+    service = CollaborationService()
+    session = await service.get_or_create_session("incremental")
+    for i in range(300):
+        await service.handle_agent_action("incremental", _add(f"c{i}", start=i))
+
+    # Human client renames clip c5 while the agent appends another clip
+    human = Doc()
+    human["tracks"] = Array()
+    human.apply_update(session.get_update())
+    human_state = human.get_state()
+    human["tracks"][0]["clips"][5]["name"] = "Renamed by human"
+    human_edit = human.get_update(human_state)
+
+    state_before = session.doc.get_state()
+    await service.handle_agent_action("incremental", _add("agent-new", start=500))
+    agent_update = session.doc.get_update(state_before)
+
+    # Incremental: a few hundred bytes, not a rebuild of 300 clips
+    assert len(agent_update) < 300
+    assert len(agent_update) * 20 < len(session.get_update())
+
+    session.apply_update(human_edit)
+    clips = session.doc["tracks"][0]["clips"]
+    assert clips[5]["name"] == "Renamed by human"
+    assert clips[len(clips) - 1]["_id"] == "agent-new"
+
+
+@pytest.mark.asyncio
+async def test_update_and_remove_clip_by_id():
+    service = CollaborationService()
+    await service.handle_agent_action("by-id", _add("a"))
+    session = await service.get_or_create_session("by-id")
+    new_track = len(session.doc["tracks"])
+    await service.handle_agent_action("by-id", _add("b", track=new_track))
+
+    await service.handle_agent_action("by-id", {"type": "update_clip", "id": "b", "start": 7, "name": "B2"})
+    track_idx, pos, clip = session.find_clip("b")
+    assert (track_idx, pos) == (new_track, 0)
+    assert clip["start"] == 7.0 and clip["name"] == "B2"
+
+    # Re-adding an existing id is idempotent
+    await service.handle_agent_action("by-id", _add("a", start=3))
+    assert len(session.doc["tracks"][0]["clips"]) == 1
+    assert session.find_clip("a")[2]["start"] == 3.0
+
+    await service.handle_agent_action("by-id", {"type": "remove_clip", "id": "a"})
+    assert session.find_clip("a") is None
+
+    with pytest.raises(ValueError):
+        await service.handle_agent_action("by-id", {"type": "remove_clip", "id": "missing"})
+
+
+@pytest.mark.asyncio
+async def test_add_clip_rejects_out_of_range_tracks():
+    service = CollaborationService()
+    session = await service.get_or_create_session("tracks")
+    n_tracks = len(session.doc["tracks"])
+    for track in (n_tracks + 1, 10**6, -1, "0", True):
+        with pytest.raises(ValueError):
+            await service.handle_agent_action("tracks", _add("x", track=track))
+    assert len(session.doc["tracks"]) == n_tracks
+    assert session.find_clip("x") is None
+
+    result = await service.handle_agent_actions("tracks", [_add("y", track=-1), _add("z", track=n_tracks)])
+    assert [r["status"] for r in result["results"]] == ["error", "success"]
+    assert len(session.doc["tracks"]) == n_tracks + 1
+
+
+def test_bulk_otio_sync_is_a_structural_diff():
+    session = CollaborativeTimeline("bulk-diff")
+    with session.doc.transaction():
+        for i in range(200):
+            session.apply_agent_action(_add(f"c{i}", start=i))
+
+    # Reorder (last clip moves to front), rename c1, drop c2
+    source = session.to_otio()
+    clips = list(source.tracks[0])
+    clips[1].name = "C1 renamed"
+    timeline = otio.schema.Timeline(name="Edited")
+    track = otio.schema.Track(name=source.tracks[0].name)
+    for clip in [clips[-1], clips[0], clips[1]] + clips[3:-1]:
+        track.append(clip)
+    timeline.tracks.append(track)
+
+    state_before = session.doc.get_state()
+    otio_to_yjs(timeline, session.doc)
+    diff = session.doc.get_update(state_before)
+
+    ids = [c["_id"] for c in session.doc["tracks"][0]["clips"]]
+    assert ids[:3] == ["c199", "c0", "c1"]
+    assert "c2" not in ids and len(ids) == 199
+    assert session.find_clip("c1")[2]["name"] == "C1 renamed"
+    # Only the moved clip is re-inserted; the other 198 are untouched
+    assert len(diff) * 20 < len(session.get_update())
+
+    # Re-syncing an unchanged timeline produces no CRDT ops
+    state_before = session.doc.get_state()
+    otio_to_yjs(session.to_otio(), session.doc)
+    assert session.doc.get_state() == state_before
+
+
+@pytest.mark.asyncio
+async def test_batched_actions_single_transaction_and_save():
+    service = CollaborationService()
+    session = await service.get_or_create_session("batch")
+    saves = []
+    original_save = session.save_to_db
+
+    async def counting_save():
+        saves.append(1)
+        await original_save()
+    session.save_to_db = counting_save
+
+    updates = []
+    session.doc.observe(lambda event: updates.append(event.update))
+
+    actions = [_add(f"b{i}", track=i % 2, start=i) for i in range(40)]
+    actions.append({"type": "remove_clip", "id": "missing"})
+    result = await service.handle_agent_actions("batch", actions)
+
+    assert result["status"] == "partial"
+    assert result["applied"] == 40
+    assert result["failed"] == 1
+    assert result["results"][-1]["status"] == "error"
+    assert set(result["timing_ms"]) == {"apply", "persist", "total"}
+    assert len(updates) == 1
+    assert len(saves) == 1
+    assert len(session.doc["tracks"][1]["clips"]) == 20
+
+
+@pytest.mark.asyncio
+async def test_batch_tool_is_budget_gated():
+    import json
+    from app.services.finops_service import finops_service
+    from mcp_server import edit_timeline_batch
+
+    finops_service.set_credits("tenant-batch", 1.0)
+    raw = await edit_timeline_batch(
+        project_id="batch-tool",
+        actions=[_add("t1"), _add("t2")],
+        tenant_context="tenant-batch"
+    )
+    result = json.loads(raw)
+    assert result["applied"] == 2
+    assert abs(finops_service.get_balance("tenant-batch") - 0.998) < 1e-9
+
+
+def test_sync_keeps_clips_without_flowai_id_stable():
+    def timeline(first_start: float):
+        track = otio.schema.Track(name="V1")
+        for i, start in enumerate((first_start, 10.0, 20.0)):
+            clip = otio.schema.Clip(name="same" if i else "intro")
+            clip.media_reference = otio.schema.ExternalReference(target_url="http://cdn/a.mp4")
+            clip.source_range = otio.opentime.TimeRange(
+                start_time=otio.opentime.RationalTime(start * 24, 24),
+                duration=otio.opentime.RationalTime(48, 24)
+            )
+            track.append(clip)
+        result = otio.schema.Timeline(name="No ids")
+        result.tracks.append(track)
+        return result
+
+    session = CollaborativeTimeline("no-ids")
+    otio_to_yjs(timeline(0.0), session.doc)
+    ids = [c["_id"] for c in session.doc["tracks"][0]["clips"]]
+    assert len(set(ids)) == 3
+
+    # A freshly parsed copy of the same timeline matches every clip: no CRDT ops
+    state_before = session.doc.get_state()
+    otio_to_yjs(timeline(0.0), session.doc)
+    assert session.doc.get_state() == state_before
+
+    # Moving an id-less clip updates it in place
+    state_before = session.doc.get_state()
+    otio_to_yjs(timeline(5.0), session.doc)
+    assert [c["_id"] for c in session.doc["tracks"][0]["clips"]] == ids
+    assert len(session.doc.get_update(state_before)) < 100
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import time
+import pytest
+from pycrdt import Doc, Array, Map
+
+from app.services.collab_room import ConnectionRegistry, CLOSE_TRY_AGAIN_LATER
+from app.services.collaboration_service import CollaborationService
+
+
+class FakeWebSocket:
+    """Simulated client socket; `delay` makes it a slow reader"""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = []
+        self.close_code = None
+
+    async def send_bytes(self, data: bytes):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(data)
+
+    async def send_text(self, data: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(data)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+async def _drain(sockets, expected: int, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while any(len(ws.received) < expected for ws in sockets):
+        assert time.monotonic() < deadline, "broadcast did not complete in time"
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_load_fan_out_to_many_clients():
+    """N simulated clients: every update reaches every other client exactly once"""
+    n_clients, n_updates = 200, 20
+    registry = ConnectionRegistry(max_queue=n_updates * 2)
+    sockets = [FakeWebSocket() for _ in range(n_clients)]
+    connections = [registry.join("load-room", ws, f"user-{i}") for i, ws in enumerate(sockets)]
+
+    sender = connections[0]
+    started = time.perf_counter()
+    for i in range(n_updates):
+        registry.broadcast("load-room", f"update-{i}".encode(), exclude=sender)
+    await _drain(sockets[1:], n_updates)
+    elapsed = time.perf_counter() - started
+
+    assert sockets[0].received == []
+    assert all(ws.received == [f"update-{i}".encode() for i in range(n_updates)] for ws in sockets[1:])
+
+    room = registry.get_room("load-room")
+    assert room.metrics["messages_in"] == n_updates
+    assert room.metrics["messages_out"] == n_updates * (n_clients - 1)
+    print(f"Fan-out of {n_updates} updates to {n_clients} clients in {elapsed * 1000:.1f}ms")
+
+    for connection in connections:
+        await registry.leave("load-room", connection)
+    assert "load-room" not in registry.rooms
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_stall_room():
+    registry = ConnectionRegistry(max_queue=4)
+    fast = [FakeWebSocket() for _ in range(10)]
+    slow = FakeWebSocket(delay=10.0)
+    for i, ws in enumerate(fast):
+        registry.join("room", ws, f"fast-{i}")
+    registry.join("room", slow, "slow")
+
+    # Presence overflow is dropped, not fatal
+    for i in range(10):
+        registry.broadcast("room", json.dumps({"type": "awareness", "n": i}), droppable=True)
+        await asyncio.sleep(0)
+    assert "slow" in registry.get_room("room").connections
+
+    # CRDT update overflow disconnects the slow client
+    for i in range(10):
+        registry.broadcast("room", f"update-{i}".encode())
+        await asyncio.sleep(0)
+    await _drain(fast, 20)
+
+    room = registry.get_room("room")
+    assert len(room.connections) == 10
+    assert "slow" not in room.connections
+    assert room.metrics["slow_disconnects"] == 1
+    assert room.metrics["dropped_messages"] > 0
+    await asyncio.sleep(0)
+    assert slow.close_code == CLOSE_TRY_AGAIN_LATER
+
+    for connection in list(room.connections.values()):
+        await registry.leave("room", connection)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_close_task_is_held_until_done():
+    registry = ConnectionRegistry()
+    ws = FakeWebSocket()
+    connection = registry.join("room", ws, "slow")
+    room = registry.get_room("room")
+    connection.enqueue = lambda message, droppable=False: False  # Queue overflowed
+
+    registry.broadcast("room", b"update")
+    assert len(room._closing) == 1
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert ws.close_code == CLOSE_TRY_AGAIN_LATER
+    assert not room._closing
+
+
+@pytest.mark.asyncio
+async def test_agent_action_is_broadcast_to_clients():
+    service = CollaborationService()
+    ws = FakeWebSocket()
+    connection = service.connections.join("agent-room", ws, "human")
+
+    await service.handle_agent_action("agent-room", {
+        "type": "add_clip", "name": "Agent Clip", "url": "http://vid.mp4",
+        "start": 0, "duration": 5, "track": 0, "id": "clip-1"
+    })
+    await _drain([ws], 1)
+
+    # Applying the broadcast diff on a client that has the initial state converges
+    client = Doc()
+    client["tracks"] = Array()
+    for update in ws.received:
+        client.apply_update(update)
+    client.apply_update((await service.get_or_create_session("agent-room")).get_update())
+    clips = client["tracks"][0]["clips"]
+    assert [c["name"] for c in clips] == ["Agent Clip"]
+    await service.connections.leave("agent-room", connection)
+
+
+@pytest.mark.asyncio
+async def test_batching_window_merges_updates_per_tick():
+    registry = ConnectionRegistry(batch_interval=0.02)
+    dragger_ws, peer_ws = FakeWebSocket(), FakeWebSocket()
+    dragger = registry.join("drag-room", dragger_ws, "dragger")
+    registry.join("drag-room", peer_ws, "peer")
+
+    # A drag produces many tiny updates on the dragging client's doc
+    source = Doc()
+    source["clip"] = Map({"start": 0.0})
+    updates = [source.get_update()]
+    for i in range(30):
+        state = source.get_state()
+        source["clip"]["start"] = float(i)
+        updates.append(source.get_update(state))
+    for update in updates:
+        registry.broadcast_update("drag-room", update, origin=dragger)
+
+    await _drain([peer_ws], 1)
+    await asyncio.sleep(0.03)
+
+    # One combined message instead of 31, and the sender does not get its own edits back
+    assert len(peer_ws.received) == 1
+    assert dragger_ws.received == []
+    replica = Doc()
+    replica.apply_update(peer_ws.received[0])
+    assert replica.get("clip", type=Map)["start"] == 29.0
+
+    metrics = registry.get_metrics()["drag-room"]
+    assert metrics["messages_in"] == 31
+    assert metrics["messages_out"] == 1
+    assert metrics["batches_flushed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batched_senders_receive_each_others_updates():
+    registry = ConnectionRegistry(batch_interval=0.01)
+    ws_a, ws_b = FakeWebSocket(), FakeWebSocket()
+    conn_a = registry.join("pair", ws_a, "a")
+    conn_b = registry.join("pair", ws_b, "b")
+
+    doc_a, doc_b = Doc(), Doc()
+    doc_a["items"] = Array()
+    doc_b["items"] = Array()
+    state = doc_a.get_state()
+    doc_a["items"].append("from-a")
+    registry.broadcast_update("pair", doc_a.get_update(state), origin=conn_a)
+    state = doc_b.get_state()
+    doc_b["items"].append("from-b")
+    registry.broadcast_update("pair", doc_b.get_update(state), origin=conn_b)
+
+    await _drain([ws_a, ws_b], 1)
+    doc_a.apply_update(ws_a.received[0])
+    doc_b.apply_update(ws_b.received[0])
+    assert sorted(doc_a["items"]) == sorted(doc_b["items"]) == ["from-a", "from-b"]
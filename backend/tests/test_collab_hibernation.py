@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+
+from app.services.collab_persistence import TimelineStore, WriteBehindPersistence
+from app.services.collaboration_service import CollaborationService
+
+
+class FakeWebSocket:
+    async def send_bytes(self, data):
+        pass
+
+    async def send_text(self, data):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+
+def _service(grace: float) -> CollaborationService:
+    service = CollaborationService(persistence=WriteBehindPersistence(TimelineStore(), debounce=10.0))
+    service.idle_grace = grace
+    return service
+
+
+def _add(clip_id: str):
+    return {
+        "type": "add_clip", "name": clip_id, "url": "http://cdn/x.mp4",
+        "start": 0, "duration": 1, "track": 0, "id": clip_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_session_hibernates_after_last_socket_leaves_and_reloads():
+    service = _service(grace=0.05)
+    await service.get_or_create_session("idle")
+    connection = service.join("idle", FakeWebSocket(), "u1")
+    await service.handle_agent_action("idle", _add("kept"))
+
+    # Connected sessions stay resident past the grace period
+    await asyncio.sleep(0.1)
+    assert "idle" in service.sessions
+
+    await service.leave("idle", connection)
+    await asyncio.sleep(0.15)
+    assert "idle" not in service.sessions
+    assert service.metrics["sessions_hibernated"] == 1
+
+    # Lazily reloaded from persistence with the edit intact
+    session = await service.get_or_create_session("idle")
+    assert session.find_clip("kept") is not None
+    assert len(session.doc["tracks"]) == 1
+    assert service.metrics["sessions_loaded"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rejoin_during_grace_keeps_session():
+    service = _service(grace=0.05)
+    session = await service.get_or_create_session("rejoin")
+    first = service.join("rejoin", FakeWebSocket(), "u1")
+    await service.leave("rejoin", first)
+
+    second = service.join("rejoin", FakeWebSocket(), "u2")
+    await asyncio.sleep(0.1)
+    assert service.sessions["rejoin"] is session
+    await service.leave("rejoin", second)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_openers_share_one_load():
+    service = _service(grace=60)
+    loads = []
+    original_load = service.persistence.load
+
+    async def slow_load(project_id):
+        loads.append(project_id)
+        await asyncio.sleep(0.01)
+        return await original_load(project_id)
+    service.persistence.load = slow_load
+
+    sessions = await asyncio.gather(*[service.get_or_create_session("shared") for _ in range(10)])
+
+    assert len(loads) == 1
+    assert all(s is sessions[0] for s in sessions)
+    assert service.metrics["coalesced_loads"] == 9
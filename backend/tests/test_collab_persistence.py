@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+from pycrdt import Doc, Array, Map
+
+from app.services.collab_persistence import TimelineStore, WriteBehindPersistence
+from app.services.collaboration_service import CollaborationService
+
+
+def _human_update(session, clip_id: str) -> bytes:
+    client = Doc()
+    client["tracks"] = Array()
+    client.apply_update(session.get_update())
+    state = client.get_state()
+    client["tracks"][0]["clips"].append(Map({"_id": clip_id, "name": clip_id, "start": 0.0, "duration": 1.0}))
+    return client.get_update(state)
+
+
+@pytest.mark.asyncio
+async def test_human_edits_are_flushed_after_debounce_and_reload(tmp_path):
+    store = TimelineStore(str(tmp_path / "collab.db"))
+    persistence = WriteBehindPersistence(store, debounce=0.02)
+    service = CollaborationService(persistence=persistence)
+    session = await service.get_or_create_session("wb")
+
+    for i in range(5):
+        session.apply_update(_human_update(session, f"h{i}"))
+
+    # Nothing written synchronously; one batched flush after the debounce
+    assert persistence.has_pending("wb")
+    await asyncio.sleep(0.1)
+    assert not persistence.has_pending("wb")
+    assert persistence.metrics["flushes"] == 1
+    _, logged = store.load("wb")
+    assert len(logged) == 6  # default track + 5 human edits
+
+    # A fresh process on the same store restores the timeline without duplicating tracks
+    restarted = CollaborationService(persistence=WriteBehindPersistence(TimelineStore(str(tmp_path / "collab.db"))))
+    reloaded = await restarted.get_or_create_session("wb")
+    assert len(reloaded.doc["tracks"]) == 1
+    assert [c["_id"] for c in reloaded.doc["tracks"][0]["clips"]] == [f"h{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_log_is_compacted_into_snapshot():
+    store = TimelineStore()
+    persistence = WriteBehindPersistence(store, debounce=10.0, compact_threshold=2000)
+    service = CollaborationService(persistence=persistence)
+
+    for i in range(60):
+        await service.handle_agent_action("compact", {
+            "type": "add_clip", "name": f"Clip {i}", "url": f"http://cdn/{i}.mp4",
+            "start": i, "duration": 1, "track": 0, "id": f"c{i}"
+        })
+
+    # Agent edits are write-behind too: nothing reached storage before the debounce
+    assert persistence.metrics["flushes"] == 0
+    assert persistence.has_pending("compact")
+
+    await persistence.flush_all()
+    assert persistence.metrics["compactions"] >= 1
+    assert store.log_size("compact") <= 2000
+    snapshot, _ = store.load("compact")
+    assert snapshot is not None
+
+    state = await persistence.load("compact")
+    doc = Doc()
+    doc["tracks"] = Array()
+    doc.apply_update(state)
+    assert len(doc["tracks"][0]["clips"]) == 60
+
+
+@pytest.mark.asyncio
+async def test_continuous_edits_flush_within_max_delay():
+    store = TimelineStore()
+    persistence = WriteBehindPersistence(store, debounce=0.05, max_delay=0.1)
+
+    for i in range(20):
+        persistence.record("busy", b"\x00\x00")
+        await asyncio.sleep(0.02)  # Faster than the debounce, so it never goes quiet
+
+    assert persistence.metrics["flushes"] >= 2
+    await persistence.flush_all()
+    assert len(store.load("busy")[1]) == 20
+
+
+@pytest.mark.asyncio
+async def test_failed_timed_flush_is_retried_with_backoff():
+    class FlakyStore(TimelineStore):
+        failures = 2
+
+        def append_updates(self, project_id, updates):
+            if self.failures:
+                self.failures -= 1
+                raise OSError("database is locked")
+            super().append_updates(project_id, updates)
+
+    store = FlakyStore()
+    persistence = WriteBehindPersistence(store, debounce=0.01)
+    persistence.record("flaky", b"\x00\x00")
+    persistence.record("flaky", b"\x00\x00")
+
+    # No further edits arrive: the retries alone get the updates to storage
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if persistence.metrics["flushes"]:
+            break
+    assert persistence.metrics["flush_errors"] == 2
+    assert persistence.metrics["flushes"] == 1
+    assert len(store.load("flaky")[1]) == 2
+    assert not persistence._retry_delays
+
+
+@pytest.mark.asyncio
+async def test_log_size_is_tracked_without_rescanning_and_locks_are_pruned():
+    store = TimelineStore()
+    store.append_updates("seeded", [b"\x00" * 100])
+    scans = []
+    log_size = store.log_size
+    store.log_size = lambda project_id: scans.append(project_id) or log_size(project_id)
+    persistence = WriteBehindPersistence(store, debounce=10.0, compact_threshold=220)
+
+    for _ in range(4):
+        persistence.record("seeded", b"\x00" * 50)
+        await persistence.flush("seeded")
+
+    # Seeded once from the store, then counted: 100 + 3 * 50 crosses the threshold on the third flush
+    assert scans == ["seeded"]
+    assert persistence.metrics["compactions"] == 1
+    assert persistence._log_bytes["seeded"] == 50
+    assert not persistence._locks and not persistence._lock_users
+
+    persistence.forget("seeded")
+    assert "seeded" not in persistence._log_bytes
+
+
+@pytest.mark.asyncio
+async def test_flush_all_flushes_every_project_and_reports_failures():
+    class BrokenStore(TimelineStore):
+        def append_updates(self, project_id, updates):
+            if project_id == "broken":
+                raise OSError("disk full")
+            super().append_updates(project_id, updates)
+
+    store = BrokenStore()
+    persistence = WriteBehindPersistence(store, debounce=10.0)
+    for project_id in ("broken", "ok-1", "ok-2"):
+        persistence.record(project_id, b"\x00\x00")
+
+    with pytest.raises(RuntimeError, match="broken") as exc_info:
+        await persistence.flush_all()
+    assert isinstance(exc_info.value.__cause__, OSError)
+    assert len(store.load("ok-1")[1]) == 1 and len(store.load("ok-2")[1]) == 1
+    assert persistence.has_pending("broken")
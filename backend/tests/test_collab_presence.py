@@ -0,0 +1,74 @@
+import asyncio
+import json
+import pytest
+
+from app.services.collab_room import ConnectionRegistry
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.received = []
+
+    async def send_bytes(self, data):
+        self.received.append(data)
+
+    async def send_text(self, data):
+        self.received.append(data)
+
+    async def close(self, code=1000):
+        pass
+
+
+def _presence_messages(ws):
+    return [json.loads(m) for m in ws.received if isinstance(m, str)]
+
+
+@pytest.mark.asyncio
+async def test_cursor_storm_is_aggregated_at_capped_rate():
+    registry = ConnectionRegistry(presence_rate=20)
+    watcher = FakeWebSocket()
+    registry.join("room", watcher, "watcher")
+    for i in range(5):
+        registry.join("room", FakeWebSocket(), f"user-{i}")
+
+    # 5 users x 100 cursor moves over ~0.25s
+    for step in range(100):
+        for i in range(5):
+            registry.update_presence("room", f"user-{i}", {"cursor": step})
+        await asyncio.sleep(0.0025)
+    await asyncio.sleep(0.1)
+
+    messages = _presence_messages(watcher)
+    room = registry.get_room("room")
+    assert room.metrics["presence_updates"] == 500
+    # Roughly 20 Hz instead of 500 messages
+    assert 2 <= len(messages) <= 12
+    assert room.metrics["presence_broadcasts"] == len(messages)
+
+    # Only the latest state per user survives
+    final = {}
+    for message in messages:
+        final.update(message["users"])
+    assert final == {f"user-{i}": {"cursor": 99} for i in range(5)}
+    assert json.loads(room.presence.snapshot())["users"] == final
+
+
+@pytest.mark.asyncio
+async def test_leaving_and_stale_users_are_removed():
+    registry = ConnectionRegistry(presence_rate=0, presence_stale_after=0.05)
+    watcher = FakeWebSocket()
+    registry.join("room", watcher, "watcher")
+    leaver = registry.join("room", FakeWebSocket(), "leaver")
+
+    registry.update_presence("room", "leaver", {"cursor": 1})
+    registry.update_presence("room", "idle", {"cursor": 2})
+    await asyncio.sleep(0.01)
+    await registry.leave("room", leaver)
+    await asyncio.sleep(0.01)
+    assert _presence_messages(watcher)[-1]["removed"] == ["leaver"]
+
+    await asyncio.sleep(0.1)
+    room = registry.get_room("room")
+    assert _presence_messages(watcher)[-1]["removed"] == ["idle"]
+    assert room.presence.states == {}
+    assert room.metrics["presence_evictions"] == 1
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import time
+import pytest
+from pycrdt import Doc, Array
+
+from app.services.collab_persistence import TimelineStore, WriteBehindPersistence
+from app.services.collab_relay import (
+    CollabRelay, InMemoryBus, InMemoryHub, LocalRelayBroker, LocalSocketBus, KIND_AWARENESS
+)
+from app.services.collaboration_service import CollaborationService
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.received = []
+
+    async def send_bytes(self, data):
+        self.received.append(data)
+
+    async def send_text(self, data):
+        self.received.append(data)
+
+    async def close(self, code=1000):
+        pass
+
+
+def _worker(bus, store: TimelineStore) -> CollaborationService:
+    """One simulated uvicorn worker sharing the timeline store with its peers"""
+    return CollaborationService(
+        persistence=WriteBehindPersistence(store, debounce=10.0),
+        relay=CollabRelay(bus)
+    )
+
+
+def _add(clip_id: str):
+    return {
+        "type": "add_clip", "name": clip_id, "url": "http://cdn/x.mp4",
+        "start": 0, "duration": 1, "track": 0, "id": clip_id
+    }
+
+
+async def _until(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "relay did not deliver in time"
+        await asyncio.sleep(0.005)
+
+
+def _clip_ids(service: CollaborationService, project_id: str):
+    tracks = service.sessions[project_id].doc["tracks"]
+    return sorted(c["_id"] for t in tracks for c in t["clips"])
+
+
+@pytest.mark.asyncio
+async def test_edit_on_one_worker_reaches_sockets_on_another():
+    hub, store = InMemoryHub(), TimelineStore()
+    worker_a, worker_b = _worker(InMemoryBus(hub), store), _worker(InMemoryBus(hub), store)
+    await worker_a.get_or_create_session("p")
+    await worker_b.get_or_create_session("p")
+    ws = FakeWebSocket()
+    worker_a.join("p", ws, "human-on-a")
+
+    await worker_b.handle_agent_action("p", _add("from-b"))
+    await _until(lambda: any(isinstance(m, bytes) for m in ws.received))
+
+    assert _clip_ids(worker_a, "p") == _clip_ids(worker_b, "p") == ["from-b"]
+    # Both workers created the default track, yet there is still only one
+    assert len(worker_a.sessions["p"].doc["tracks"]) == 1
+
+    # The socket on worker A can rebuild the edit from what it was sent
+    client = Doc()
+    client["tracks"] = Array()
+    client.apply_update(worker_a.sessions["p"].get_update())
+    assert [c["_id"] for c in client["tracks"][0]["clips"]] == ["from-b"]
+
+    # Remote updates are persisted by their origin worker only
+    assert worker_a.persistence.metrics["updates_recorded"] == 1  # default track
+    assert worker_a.relay.metrics["ignored_own"] > 0
+
+
+@pytest.mark.asyncio
+async def test_late_opener_syncs_unflushed_edits_from_peer():
+    hub, store = InMemoryHub(), TimelineStore()
+    worker_a, worker_b = _worker(InMemoryBus(hub), store), _worker(InMemoryBus(hub), store)
+    await worker_a.handle_agent_action("late", _add("pending"))
+    worker_a.persistence._pending.clear()  # Not in the shared store yet
+
+    await worker_b.get_or_create_session("late")
+    await _until(lambda: _clip_ids(worker_b, "late") == ["pending"])
+    assert len(worker_b.sessions["late"].doc["tracks"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_awareness_is_relayed_and_hibernation_detaches():
+    hub, store = InMemoryHub(), TimelineStore()
+    worker_a, worker_b = _worker(InMemoryBus(hub), store), _worker(InMemoryBus(hub), store)
+    await worker_a.get_or_create_session("presence")
+    await worker_b.get_or_create_session("presence")
+    ws = FakeWebSocket()
+    connection = worker_b.join("presence", ws, "viewer")
+    editor = worker_a.join("presence", FakeWebSocket(), "editor-on-a")
+
+    worker_a.update_presence("presence", "editor-on-a", {"cursor": 3})
+    await _until(lambda: ws.received)
+    assert json.loads(ws.received[0])["users"] == {"editor-on-a": {"cursor": 3}}
+
+    # Leaving on worker A removes the user on worker B too
+    await worker_a.leave("presence", editor)
+    await _until(lambda: len(ws.received) == 2)
+    assert json.loads(ws.received[1])["removed"] == ["editor-on-a"]
+
+    await worker_b.leave("presence", connection)
+    assert await worker_b.hibernate("presence")
+    assert not worker_b.relay.is_attached("presence")
+    assert worker_a.relay.is_attached("presence")
+
+
+@pytest.mark.asyncio
+async def test_workers_sync_through_local_socket_broker(tmp_path):
+    address = f"unix://{tmp_path}/relay.sock"
+    broker = LocalRelayBroker(address)
+    await broker.start()
+    store = TimelineStore()
+    worker_a = _worker(LocalSocketBus(address), store)
+    worker_b = _worker(LocalSocketBus(address), store)
+    try:
+        await worker_a.get_or_create_session("sock")
+        await worker_b.get_or_create_session("sock")
+
+        await worker_a.handle_agent_actions("sock", [_add("a1"), _add("a2")])
+        await worker_b.handle_agent_action("sock", _add("b1"))
+        await _until(lambda: _clip_ids(worker_a, "sock") == _clip_ids(worker_b, "sock") == ["a1", "a2", "b1"])
+        assert broker.metrics["delivered"] > 0
+    finally:
+        await worker_a.relay.close()
+        await worker_b.relay.close()
+        await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_relayed_presence_is_capped_and_not_echoed():
+    hub, store = InMemoryHub(), TimelineStore()
+    worker_a, worker_b = _worker(InMemoryBus(hub), store), _worker(InMemoryBus(hub), store)
+    worker_a.connections.presence_rate = worker_b.connections.presence_rate = 20
+    await worker_a.get_or_create_session("storm")
+    await worker_b.get_or_create_session("storm")
+    published = {"a": 0, "b": 0}
+    for name, worker in (("a", worker_a), ("b", worker_b)):
+        publish = worker.relay.publish
+
+        def counting_publish(project_id, kind, payload, name=name, publish=publish):
+            if kind == KIND_AWARENESS:
+                published[name] += 1
+            publish(project_id, kind, payload)
+        worker.relay.publish = counting_publish
+
+    viewer = FakeWebSocket()
+    worker_b.join("storm", viewer, "viewer")
+    for i in range(3):
+        worker_a.join("storm", FakeWebSocket(), f"user-{i}")
+
+    # 3 users x 100 cursor moves over ~0.25s on worker A
+    for step in range(100):
+        for i in range(3):
+            worker_a.update_presence("storm", f"user-{i}", {"cursor": step})
+        await asyncio.sleep(0.0025)
+    await asyncio.sleep(0.15)
+
+    # Roughly 20 Hz of aggregate deltas instead of 300 relay messages, and B never re-publishes them
+    assert 2 <= published["a"] <= 12
+    assert published["b"] == 0
+    final = {}
+    for message in viewer.received:
+        final.update(json.loads(message)["users"])
+    assert final == {f"user-{i}": {"cursor": 99} for i in range(3)}
@@ -0,0 +1,69 @@
+import pytest
+from pycrdt import Doc, Array, Map
+
+from app.services.collaboration_service import (
+    CollaborativeTimeline,
+    decode_state_vector,
+    encode_state_vector,
+)
+
+
+def _big_timeline(project_id: str, clips: int) -> CollaborativeTimeline:
+    session = CollaborativeTimeline(project_id)
+    y_clips = session.doc["tracks"][0]["clips"]
+    with session.doc.transaction():
+        for i in range(clips):
+            y_clips.append(Map({
+                "_id": f"clip-{i}",
+                "name": f"Clip {i}",
+                "media_url": f"https://cdn.flowai.com/clips/{i}.mp4",
+                "start": float(i),
+                "duration": 1.0
+            }))
+    return session
+
+
+def test_reconnect_receives_only_missing_diff():
+    session = _big_timeline("sv-sync", clips=2000)
+
+    # Client synced fully, then blipped while one more clip was added
+    client = Doc()
+    client["tracks"] = Array()
+    client.apply_update(session.get_update())
+    with session.doc.transaction():
+        session.doc["tracks"][0]["clips"].append(Map({"_id": "late", "name": "Late", "start": 0.0, "duration": 1.0}))
+
+    full = session.get_update()
+    diff = session.get_update(client.get_state())
+
+    assert len(diff) < 200
+    assert len(full) > 100 * len(diff)
+
+    client.apply_update(diff)
+    assert len(client["tracks"][0]["clips"]) == 2001
+    assert client["tracks"][0]["clips"][2000]["_id"] == "late"
+
+
+def test_server_state_vector_lets_client_push_offline_edits():
+    session = _big_timeline("sv-push", clips=10)
+    client = Doc()
+    client["tracks"] = Array()
+    client.apply_update(session.get_update())
+
+    # Offline edit on the client
+    client["tracks"][0]["clips"].append(Map({"_id": "offline", "name": "Offline", "start": 0.0, "duration": 1.0}))
+
+    missing_on_server = client.get_update(decode_state_vector(encode_state_vector(session.get_state_vector())))
+    session.apply_update(missing_on_server)
+    assert [c["_id"] for c in session.doc["tracks"][0]["clips"]][-1] == "offline"
+
+
+def test_invalid_or_missing_state_vector_falls_back_to_full_state():
+    session = _big_timeline("sv-invalid", clips=5)
+    full = session.get_update()
+
+    assert session.get_update(None) == full
+    assert session.get_update(b"\xff\xff\xff") == full
+    assert decode_state_vector(None) is None
+    assert decode_state_vector("") is None
+    assert decode_state_vector(encode_state_vector(b"\x01\x02")) == b"\x01\x02"
@@ -0,0 +1,141 @@
+import random
+import pytest
+from pycrdt import Doc, Array, Map
+
+from app.services.collaboration_service import CollaborativeTimeline
+from app.services.timeline_index import IntervalIndex
+
+
+def _add(clip_id: str, start: float, duration: float, track: int = 0):
+    return {
+        "type": "add_clip", "name": clip_id, "url": "http://cdn/x.mp4",
+        "start": start, "duration": duration, "track": track, "id": clip_id
+    }
+
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(500):
+        start = rng.uniform(0, 1000)
+        intervals.append((start, start + rng.uniform(0.1, 30), f"c{i}"))
+    index = IntervalIndex(intervals)
+
+    for _ in range(200):
+        t = rng.uniform(-10, 1040)
+        expected = {cid for s, e, cid in intervals if s <= t < e}
+        assert set(index.at(t)) == expected
+
+        lo = rng.uniform(0, 1000)
+        hi = lo + rng.uniform(0, 50)
+        expected = {cid for s, e, cid in intervals if s < hi and e > lo}
+        assert set(index.overlapping(lo, hi)) == expected
+
+    assert IntervalIndex([]).at(1.0) == []
+
+
+def test_lookups_follow_agent_edits_in_one_transaction():
+    session = CollaborativeTimeline("idx")
+    with session.doc.transaction():
+        for i in range(50):
+            session.apply_agent_action(_add(f"c{i}", start=i * 2.0, duration=2.0, track=i % 2))
+        # Added earlier in the same, still-open transaction
+        session.apply_agent_action({"type": "update_clip", "id": "c10", "start": 500.0})
+        session.apply_agent_action({"type": "remove_clip", "id": "c3"})
+
+    track_idx, pos, y_clip = session.find_clip("c11")
+    assert (track_idx, y_clip["_id"]) == (1, "c11")
+    assert session.doc["tracks"][track_idx]["clips"][pos]["_id"] == "c11"
+    assert session.find_clip("c3") is None
+
+    assert session.clips_at(0, 21.0) == []  # c10 moved away
+    assert session.clips_at(0, 501.0) == ["c10"]
+    assert session.clips_at(1, 7.5) == []  # c3 removed
+    assert session.clips_in_range(0, 0.0, 6.0) == ["c0", "c2"]
+
+
+def test_index_tracks_remote_updates_and_skips_renames():
+    session = CollaborativeTimeline("remote")
+    session.apply_agent_action(_add("a", 0.0, 5.0))
+    assert session.clips_at(0, 1.0) == ["a"]
+
+    # A human edit arriving as a CRDT update from a client replica
+    client = Doc()
+    client["tracks"] = Array()
+    client.apply_update(session.get_update())
+    state = client.get_state()
+    with client.transaction():
+        client["tracks"][0]["clips"][0]["start"] = 10.0
+        client["tracks"][0]["clips"].append(Map({"_id": "b", "name": "b", "start": 0.0, "duration": 3.0}))
+    session.apply_update(client.get_update(state))
+
+    assert session.clips_at(0, 1.0) == ["b"]
+    assert session.clips_at(0, 12.0) == ["a"]
+    assert session.find_clip("b")[:2] == (0, 1)
+
+    rebuilds = session.index.metrics["track_rebuilds"]
+    session.apply_agent_action({"type": "update_clip", "id": "a", "name": "renamed"})
+    assert session.find_clip("a")[2]["name"] == "renamed"
+    assert session.index.metrics["track_rebuilds"] == rebuilds
+
+
+def test_interleaved_edits_and_lookups_do_not_rebuild_tracks():
+    session = CollaborativeTimeline("interleaved")
+    session.apply_agent_action(_add("seed", 0.0, 1.0))
+    session.find_clip("seed")
+    rebuilds = dict(session.index.metrics)
+
+    for i in range(200):
+        with session.doc.transaction():
+            session.apply_agent_action(_add(f"c{i}", start=i * 1.0 + 1.0, duration=1.0))
+        assert session.find_clip(f"c{i}")[1] == i + 1
+    session.apply_agent_action({"type": "update_clip", "id": "c5", "start": 900.0})
+    session.apply_agent_action({"type": "remove_clip", "id": "c0"})
+
+    assert session.clips_at(0, 900.5) == ["c5"]
+    assert session.clips_at(0, 1.5) == []
+    assert session.find_clip("c6")[1] == 6
+    assert session.index.metrics["track_rebuilds"] == rebuilds["track_rebuilds"]
+    assert session.index.metrics["full_rebuilds"] == rebuilds["full_rebuilds"]
+
+
+def test_find_clip_tolerates_positions_shifted_in_open_transaction():
+    session = CollaborativeTimeline("shifted")
+    for i in range(5):
+        session.apply_agent_action(_add(f"c{i}", start=i * 2.0, duration=2.0))
+    with session.doc.transaction():
+        session.apply_agent_action({"type": "remove_clip", "id": "c0"})
+        session.apply_agent_action({"type": "remove_clip", "id": "c1"})
+        # Committed position 4 is past the end of the 3 remaining clips
+        assert session.find_clip("c4")[1] == 2
+        session.apply_agent_action({"type": "update_clip", "id": "c4", "start": 50.0})
+    assert session.find_clip("c4")[1] == 2
+    assert session.clips_at(0, 51.0) == ["c4"]
+
+
+def test_index_matches_document_under_random_edits():
+    rng = random.Random(3)
+    session = CollaborativeTimeline("random")
+    live = []
+    for step in range(400):
+        with session.doc.transaction():
+            for _ in range(rng.randint(1, 4)):
+                roll = rng.random()
+                if roll < 0.5 or not live:
+                    clip_id = f"c{step}-{len(live)}-{rng.random():.6f}"
+                    track = rng.randint(0, min(2, len(session.doc["tracks"])))
+                    session.apply_agent_action(_add(clip_id, rng.uniform(0, 100), rng.uniform(0.5, 10), track))
+                    live.append(clip_id)
+                elif roll < 0.8:
+                    session.apply_agent_action({"type": "update_clip", "id": rng.choice(live), "start": rng.uniform(0, 100)})
+                else:
+                    clip_id = live.pop(rng.randrange(len(live)))
+                    session.apply_agent_action({"type": "remove_clip", "id": clip_id})
+
+    for track_idx, y_track in enumerate(session.doc["tracks"]):
+        clips = [(c["_id"], c["start"], c["start"] + c["duration"]) for c in y_track["clips"]]
+        for pos, (clip_id, _, _) in enumerate(clips):
+            assert session.index.locate(clip_id) == (track_idx, pos)
+        for t in (0.0, 12.5, 50.0, 99.0):
+            assert set(session.clips_at(track_idx, t)) == {cid for cid, s, e in clips if s <= t < e}
+    assert session.index.metrics["full_rebuilds"] == 1
@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+
+from app.services.finops_leases import CreditLeaseManager, InMemoryCreditStore
+from app.services.finops_service import FinOpsService, BudgetStatus
+
+
+def _workers(store, n, **lease_options):
+    workers = []
+    for _ in range(n):
+        worker = FinOpsService(leases=CreditLeaseManager(store, **lease_options))
+        worker.MAX_RPS = 10_000
+        workers.append(worker)
+    return workers
+
+
+async def _spend(workers, tenant_id, calls_per_worker, cost):
+    results = await asyncio.gather(*(
+        worker.check_and_spend(tenant_id, cost) for worker in workers for _ in range(calls_per_worker)
+    ))
+    return sum(1 for status, _ in results if status == BudgetStatus.ALLOWED)
+
+
+@pytest.mark.asyncio
+async def test_workers_spend_locally_and_never_overspend():
+    store = InMemoryCreditStore(latency=0.001)
+    await store.set_balance("t", 10.0)
+    workers = _workers(store, 3, slice_size=2.0)
+
+    allowed = await _spend(workers, "t", 20, 0.25)  # Demand: 15.0 against 10.0
+
+    assert allowed == 40  # Every credit is spent, none twice
+    assert store.metrics["reserves"] < allowed / 2  # Most spends never left the worker
+    for worker in workers:
+        await worker.leases.close()
+    assert await store.get_balance("t") == 0.0
+
+
+@pytest.mark.asyncio
+async def test_overdraft_is_bounded_and_conserved():
+    store = InMemoryCreditStore(latency=0.005)
+    await store.set_balance("t", 3.0)
+    workers = _workers(store, 3, slice_size=1.0, low_watermark=0.0, max_overdraft=0.5)
+
+    async def spend_in_turn(worker):
+        # One call at a time per worker, so a drained lease bridges on overdraft
+        return [(await worker.check_and_spend("t", 0.25))[0] for _ in range(10)]
+
+    outcomes = await asyncio.gather(*(spend_in_turn(worker) for worker in workers))
+    allowed = sum(statuses.count(BudgetStatus.ALLOWED) for statuses in outcomes)
+    overdraft = sum(w.leases.metrics["overdraft_spends"] for w in workers)
+
+    spent = allowed * 0.25
+    assert spent <= 3.0 + 3 * 0.5  # Overspend bounded by workers x max_overdraft
+    for worker in workers:
+        await worker.leases.close()
+    # Every credit spent was debited centrally, overdrafts included
+    assert await store.get_balance("t") == pytest.approx(3.0 - spent)
+    assert overdraft > 0  # The bridge was actually exercised
+
+
+@pytest.mark.asyncio
+async def test_idle_leases_return_credit_and_seed_resets():
+    store = InMemoryCreditStore()
+    worker = _workers(store, 1, slice_size=5.0, lease_ttl=0.0)[0]
+    await worker.seed_credits("t", 8.0)
+    with pytest.raises(RuntimeError):
+        worker.set_credits("t", 1.0)
+
+    assert (await worker.check_and_spend("t", 1.0))[0] == BudgetStatus.ALLOWED
+    assert worker.get_balance("t") == 7.0
+    assert await store.get_balance("t") == 3.0  # 5.0 leased to this worker
+
+    assert await worker.leases.release_idle() == 1
+    assert await store.get_balance("t") == 7.0
+
+    await worker.seed_credits("t", 0.5)
+    status, message = await worker.check_and_spend("t", 1.0)
+    assert status == BudgetStatus.REJECTED_INSUFFICIENT_FUNDS
+    assert worker.get_tag_usage("t", "general") == 1.0
+
+
+@pytest.mark.asyncio
+async def test_reseed_voids_leases_other_workers_took_from_the_old_balance():
+    store = InMemoryCreditStore()
+    worker_a, worker_b = _workers(store, 2, slice_size=5.0, lease_ttl=0.0)
+    await worker_a.seed_credits("t", 10.0)
+    assert (await worker_b.check_and_spend("t", 1.0))[0] == BudgetStatus.ALLOWED
+
+    await worker_a.seed_credits("t", 2.0)
+    assert await worker_b.leases.release_idle() == 1  # 4.0 left over from the old balance
+    assert await store.get_balance("t") == 2.0
+
+    # B's next reservation starts from the new balance, without the old lease's credit
+    assert (await worker_b.check_and_spend("t", 1.5))[0] == BudgetStatus.ALLOWED
+    assert worker_b.get_balance("t") == 0.5
+    await worker_b.leases.close()
+    assert await store.get_balance("t") == 0.5
+
+
+@pytest.mark.asyncio
+async def test_reseed_during_renewal_does_not_revive_the_returned_lease():
+    class SlowReserveStore(InMemoryCreditStore):
+        async def reserve(self, tenant_id, amount):
+            await asyncio.sleep(0.02)  # Lands after the reseed below
+            return await super().reserve(tenant_id, amount)
+
+    store = SlowReserveStore()
+    worker = _workers(store, 1, slice_size=5.0, low_watermark=0.5)[0]
+    await worker.seed_credits("t", 10.0)
+    assert (await worker.check_and_spend("t", 3.0))[0] == BudgetStatus.ALLOWED
+    assert worker.leases._tasks  # Below the watermark: renewal scheduled
+    await asyncio.sleep(0)  # ... and waiting on the store
+
+    await worker.seed_credits("t", 10.0)
+    await asyncio.gather(*worker.leases._tasks)
+    assert "t" not in worker.leases._leases  # The renewed grant went back, not into the old lease
+    await worker.leases.close()
+    assert await store.get_balance("t") == 10.0
+
+
+@pytest.mark.asyncio
+async def test_status_balance_reads_the_store_without_a_lease():
+    store = InMemoryCreditStore()
+    worker_a, worker_b = _workers(store, 2)
+    await worker_a.seed_credits("t", 4.0)
+
+    assert worker_b.get_balance("t") == 0.0  # No lease on this worker
+    assert await worker_b.get_balance_async("t") == 4.0
+    await worker_b.check_and_spend("t", 0.5)
+    assert await worker_b.get_balance_async("t") == 3.5
@@ -0,0 +1,134 @@
+import asyncio
+import time
+import pytest
+
+from app.services.finops_ledger import SpendLedger, SpendLedgerStore
+from app.core.paths import data_path
+from app.services.finops_service import FinOpsService, BudgetStatus, _default_ledger
+
+
+def _service(path, **ledger_options) -> FinOpsService:
+    service = FinOpsService(ledger=SpendLedger(SpendLedgerStore(str(path)), **ledger_options))
+    service.MAX_RPS = 10_000
+    return service
+
+
+@pytest.mark.asyncio
+async def test_restart_replays_balances_and_usage(tmp_path):
+    db = tmp_path / "ledger.db"
+    service = _service(db)
+    service.set_credits("a", 10.0)
+    service.set_credits("b", 1.0)
+    for cost, tag in [(1.0, "video_gen"), (0.05, "chat"), (0.1, "chat")]:
+        await service.check_and_spend("a", cost, tag)
+    assert (await service.check_and_spend("b", 2.0))[0] == BudgetStatus.REJECTED_INSUFFICIENT_FUNDS
+    service.set_credits("b", 3.0)
+    await service.check_and_spend("b", 2.0)
+    service.ledger.close()
+
+    restarted = _service(db)
+    assert restarted.get_balance("a") == service.get_balance("a")
+    assert restarted.get_balance("b") == 1.0
+    assert restarted.get_tag_usage("a", "chat") == service.get_tag_usage("a", "chat")
+    assert restarted.get_tag_usage("a", "video_gen") == 1.0
+    restarted.ledger.close()
+
+
+@pytest.mark.asyncio
+async def test_spends_are_group_committed_and_compacted(tmp_path):
+    db = tmp_path / "ledger.db"
+    service = _service(db, flush_interval=60, compact_threshold=150)
+    for i in range(10):
+        service.set_credits(f"t{i}", 100.0)
+    await asyncio.gather(*(service.check_and_spend(f"t{i % 10}", 0.5, "gen") for i in range(200)))
+
+    # Nothing reached storage yet: spends only queued
+    assert service.ledger.pending == 210
+    assert service.ledger.store.log_length() == 0
+
+    assert service.ledger.flush() == 210
+    assert service.ledger.metrics["flushes"] == 1  # One transaction for the whole batch
+    assert service.ledger.metrics["compactions"] == 1
+    assert service.ledger.store.log_length() == 0
+
+    await service.check_and_spend("t0", 0.5, "gen")
+    service.ledger.close()
+
+    restarted = _service(db)
+    assert restarted.get_balance("t0") == 89.5
+    assert restarted.get_balance("t9") == 90.0
+    assert restarted.get_tag_usage("t0", "gen") == 10.5
+    restarted.ledger.close()
+
+
+def test_background_flusher_and_failed_flush_requeue(tmp_path):
+    ledger = SpendLedger(SpendLedgerStore(str(tmp_path / "ledger.db")), flush_interval=0.01)
+    ledger.record_set("t", 5.0)
+    ledger._wake.set()
+    for _ in range(200):
+        if ledger.metrics["entries_flushed"]:
+            break
+        time.sleep(0.01)
+    assert ledger.pending == 0 and ledger.store.log_length() == 1
+    ledger.close()
+
+    class BrokenStore(SpendLedgerStore):
+        def append(self, entries):
+            raise OSError("disk full")
+
+    broken = SpendLedger(BrokenStore(), flush_interval=60)
+    broken._closed = True  # No background thread; flush by hand
+    broken._queue.extend([("t", "spend", 1.0, "gen", 0.0), ("t", "spend", 2.0, "gen", 0.0)])
+    with pytest.raises(OSError):
+        broken.flush()
+    assert [entry[2] for entry in broken._queue] == [1.0, 2.0]
+    assert broken.metrics["flush_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_closed_ledger_refuses_spends_before_charging(tmp_path):
+    db = tmp_path / "ledger.db"
+    service = _service(db)
+    service.set_credits("a", 5.0)
+    service.ledger.close()
+
+    with pytest.raises(RuntimeError):
+        await service.check_and_spend("a", 1.0)
+    with pytest.raises(RuntimeError):
+        service.set_credits("a", 50.0)
+    assert service.get_balance("a") == 5.0
+    assert service.get_tag_usage("a", "general") == 0.0
+
+    # A spend that passed the check just before close() is written through, not dropped
+    service.ledger.record_spend("a", 1.0, "general")
+    assert service.ledger.pending == 0
+    assert _service(db).get_balance("a") == 4.0
+
+
+@pytest.mark.asyncio
+async def test_closed_ledger_does_not_drain_the_rate_limit(tmp_path):
+    service = _service(tmp_path / "ledger.db")
+    service.MAX_RPS = 1
+    service.set_credits("a", 5.0)
+    service.ledger.close()
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            await service.check_and_spend("a", 1.0)
+    assert "a" not in service._buckets[service._stripe("a")]
+
+
+def test_ledger_is_on_by_default_with_an_explicit_opt_out(monkeypatch, tmp_path):
+    monkeypatch.delenv("FINOPS_LEDGER_PATH", raising=False)
+    ledger = _default_ledger()
+    assert ledger.store.db_path == data_path("finops_ledger.db")
+    ledger.close()
+
+    monkeypatch.setenv("FINOPS_LEDGER_PATH", str(tmp_path / "nested" / "ledger.db"))
+    ledger = _default_ledger()
+    ledger.record_set("a", 1.0)
+    ledger.close()
+    assert (tmp_path / "nested" / "ledger.db").exists()
+
+    monkeypatch.setenv("FINOPS_LEDGER_PATH", "off")
+    assert _default_ledger() is None
@@ -0,0 +1,99 @@
+import pytest
+
+from app.services.finops_service import FinOpsService, BudgetStatus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("app.services.finops_service.time.monotonic", clock)
+    return clock
+
+
+async def _statuses(service, tenant_id, n):
+    return [(await service.check_and_spend(tenant_id, 0.0))[0] for _ in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_bursts_then_refills(clock):
+    service = FinOpsService()
+    service.MAX_RPS = 4
+
+    statuses = await _statuses(service, "t", 6)
+    assert statuses.count(BudgetStatus.ALLOWED) == 4
+    assert statuses[-1] == BudgetStatus.REJECTED_RATE_LIMIT
+
+    clock.now += 0.5  # Half a second refills two tokens
+    assert (await _statuses(service, "t", 3)).count(BudgetStatus.ALLOWED) == 2
+
+    # Lowering MAX_RPS caps the burst immediately
+    clock.now += 10
+    service.MAX_RPS = 1
+    assert (await _statuses(service, "t", 3)).count(BudgetStatus.ALLOWED) == 1
+
+
+@pytest.mark.asyncio
+async def test_tier_rates_and_idle_reaping(clock):
+    service = FinOpsService(lock_stripes=1)
+    service.MAX_RPS = 2
+    service.set_tier("pro-tenant", "pro")
+    with pytest.raises(ValueError):
+        service.set_tier("x", "platinum")
+
+    assert service.get_rate_limit("pro-tenant") == service.TIER_RPS["pro"]
+    allowed = (await _statuses(service, "pro-tenant", 30)).count(BudgetStatus.ALLOWED)
+    assert allowed == service.TIER_RPS["pro"]
+    assert (await _statuses(service, "plain", 5)).count(BudgetStatus.ALLOWED) == 2
+
+    for i in range(100):
+        await service.check_and_spend(f"idle-{i}", 0.0)
+    assert len(service._buckets[0]) == 102
+
+    clock.now += service.idle_reap_after
+    await service.check_and_spend("active", 0.0)
+    assert list(service._buckets[0]) == ["active"]
+    assert service.metrics["buckets_reaped"] == 102
+
+
+@pytest.mark.asyncio
+async def test_tiers_below_one_rps_still_admit_requests(clock, monkeypatch):
+    monkeypatch.setenv("FINOPS_TIER_RPS", "trial=0.5")
+    service = FinOpsService()
+    service.set_tier("trial-tenant", "trial")
+
+    assert (await _statuses(service, "trial-tenant", 3)).count(BudgetStatus.ALLOWED) == 1
+    clock.now += 1.0  # Half a token
+    assert (await _statuses(service, "trial-tenant", 1)) == [BudgetStatus.REJECTED_RATE_LIMIT]
+    clock.now += 1.0
+    assert (await _statuses(service, "trial-tenant", 2)).count(BudgetStatus.ALLOWED) == 1
+    clock.now += 60  # Idle time never banks more than one request
+    assert (await _statuses(service, "trial-tenant", 3)).count(BudgetStatus.ALLOWED) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_tier_buckets_are_kept_until_refilled(clock, monkeypatch):
+    monkeypatch.setenv("FINOPS_TIER_RPS", "trial=0.2")
+    monkeypatch.setenv("FINOPS_IDLE_REAP_SECONDS", "1")
+    service = FinOpsService(lock_stripes=1)
+    service.set_tier("trial-tenant", "trial")
+
+    assert (await _statuses(service, "trial-tenant", 2)).count(BudgetStatus.ALLOWED) == 1
+    await service.check_and_spend("plain", 0.0)
+
+    # Past the sweep interval but not the 5s a 0.2 RPS bucket takes to refill
+    clock.now += 2.0
+    await service.check_and_spend("active", 0.0)
+    assert "trial-tenant" in service._buckets[0] and "plain" not in service._buckets[0]
+    assert (await _statuses(service, "trial-tenant", 1)) == [BudgetStatus.REJECTED_RATE_LIMIT]
+
+    clock.now += 5.0
+    await service.check_and_spend("active", 0.0)
+    assert "trial-tenant" not in service._buckets[0]
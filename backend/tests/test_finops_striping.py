@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import pytest
+
+from app.services.finops_service import FinOpsService, BudgetStatus
+
+
+@pytest.mark.asyncio
+async def test_held_stripe_does_not_block_the_event_loop():
+    service = FinOpsService(lock_stripes=4)
+    service.set_credits("held", 1.0)
+    lock = service._lock_for("held")
+    lock.acquire()  # As if another thread were mid-update on this stripe
+
+    spend = asyncio.ensure_future(service.check_and_spend("held", 0.25))
+    ticks = 0
+    for _ in range(5):
+        await asyncio.sleep(0)
+        ticks += 1
+    assert ticks == 5 and not spend.done()
+
+    lock.release()
+    assert (await spend)[0] == BudgetStatus.ALLOWED
+    assert service.get_balance("held") == 0.75
+    assert service.metrics["lock_contended"] == 1
+
+
+class _CountingLock:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+
+    def acquire(self, blocking=True):
+        self.attempts += 1
+        return self._lock.acquire(blocking)
+
+    def release(self):
+        self._lock.release()
+
+
+@pytest.mark.asyncio
+async def test_waiting_on_a_held_stripe_backs_off():
+    service = FinOpsService(lock_stripes=1)
+    service.set_credits("held", 1.0)
+    lock = service._locks[0] = _CountingLock()
+    lock.acquire()
+    lock.attempts = 0
+
+    spend = asyncio.ensure_future(service.check_and_spend("held", 0.25))
+    await asyncio.sleep(0.05)
+    assert not spend.done()
+    assert lock.attempts < 40  # Polling, not spinning the event loop
+
+    lock.release()
+    assert (await spend)[0] == BudgetStatus.ALLOWED
+
+
+def test_threads_and_event_loops_never_overspend():
+    service = FinOpsService(lock_stripes=8)
+    service.MAX_RPS = 10_000
+    tenants = [f"t{i}" for i in range(200)]
+    for tenant in tenants:
+        service.set_credits(tenant, 3.0)
+
+    results = []
+
+    async def spend_all():
+        outcomes = await asyncio.gather(*(service.check_and_spend(t, 1.0) for t in tenants))
+        results.extend(status for status, _ in outcomes)
+
+    threads = [threading.Thread(target=asyncio.run, args=(spend_all(),)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(BudgetStatus.ALLOWED) == 3 * len(tenants)
+    assert all(service.get_balance(t) == 0.0 for t in tenants)
+    assert all(service.get_tag_usage(t, "general") == 3.0 for t in tenants)
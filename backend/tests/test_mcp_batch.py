@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import sys
+import pytest
+from fastmcp import FastMCP
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from mcp_server import MCPServer
+
+
+def _server(max_concurrency: int = 2) -> MCPServer:
+    app = FastMCP("batch-test")
+    state = {"active": 0, "peak": 0}
+
+    @app.tool()
+    async def slow_echo(value: int, delay: float = 0.02) -> str:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(delay)
+        state["active"] -= 1
+        return json.dumps({"value": value})
+
+    server = MCPServer("test", "1.0", mcp_app=app, max_concurrency=max_concurrency)
+    server.state = state
+    return server
+
+
+def _call(request_id, value, delay=0.02):
+    return {
+        "jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+        "params": {"name": "slow_echo", "arguments": {"value": value, "delay": delay}}
+    }
+
+
+def _value(response):
+    return json.loads(response["result"]["content"][0]["text"])["value"]
+
+
+@pytest.mark.asyncio
+async def test_batch_keeps_request_order_with_bounded_concurrency():
+    server = _server(max_concurrency=3)
+    # Later entries finish first; responses must still follow request order
+    batch = [_call(i, i * 10, delay=0.05 - i * 0.005) for i in range(8)]
+
+    responses = await server.handle_request(batch)
+
+    assert [r["id"] for r in responses] == list(range(8))
+    assert [_value(r) for r in responses] == [i * 10 for i in range(8)]
+    assert 1 < server.state["peak"] <= 3
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_stay_in_place_and_notifications_are_dropped():
+    server = _server()
+    batch = [
+        _call("a", 1),
+        {"jsonrpc": "2.0", "id": "b", "method": "no/such/method"},
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {"jsonrpc": "2.0", "id": "c", "method": "tools/call", "params": {"name": "missing_tool"}},
+        "not a request",
+        {"jsonrpc": "2.0", "id": "d", "method": "ping"},
+    ]
+
+    responses = await server.handle_request(batch)
+
+    assert [r["id"] for r in responses] == ["a", "b", "c", None, "d"]
+    assert _value(responses[0]) == 1
+    assert responses[1]["error"]["code"] == -32601
+    assert responses[2]["error"]["code"] == -32602
+    assert responses[3]["error"]["code"] == -32600
+    assert responses[4]["result"] == {}
+
+
+@pytest.mark.asyncio
+async def test_single_requests_and_edge_cases():
+    server = _server()
+
+    # Decoded objects and raw JSON bodies are both accepted
+    assert _value(await server.handle_request(_call(1, 7))) == 7
+    assert (await server.handle_request(json.dumps(_call(2, 8)).encode()))["id"] == 2
+
+    assert (await server.handle_request(b"{not json"))["error"]["code"] == -32700
+    assert (await server.handle_request([]))["error"]["code"] == -32600
+    assert await server.handle_request([{"jsonrpc": "2.0", "method": "ping"}]) is None
+
+    tools = (await server.handle_request({"jsonrpc": "2.0", "id": 3, "method": "tools/list"}))["result"]["tools"]
+    assert [t["name"] for t in tools] == ["slow_echo"]
+
+
+@pytest.mark.asyncio
+async def test_only_real_validation_errors_map_to_invalid_params():
+    server = _server()
+
+    class ValidationError(Exception):
+        """Unrelated class that merely shares the name"""
+
+    async def broken(params):
+        raise ValidationError("bug in the handler")
+
+    server._methods["test/broken"] = broken
+
+    bad_args = await server.handle_request(_call(1, "not-a-number"))
+    assert bad_args["error"]["code"] == -32602
+
+    internal = await server.handle_request({"jsonrpc": "2.0", "id": 2, "method": "test/broken"})
+    assert internal["error"] == {"code": -32603, "message": "Internal Server Error"}
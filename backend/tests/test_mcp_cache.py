@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.services.mcp_cache import ReadCache, etag_matches, mcp_read_cache
+from app.services.collaboration_service import CollaborationService
+from mcp_server import MCPServer, query_project_status
+from app.services.finops_service import finops_service
+
+
+@pytest.mark.asyncio
+async def test_read_through_ttl_tags_and_single_flight():
+    cache = ReadCache(ttl=60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": len(loads)}
+
+    entries = await asyncio.gather(*(
+        cache.get_or_load("status", "t1", "p1", loader, tags=("project:p1",)) for _ in range(5)
+    ))
+    assert len(loads) == 1
+    assert len({e.etag for e in entries}) == 1
+
+    # Tenants never share entries
+    other = await cache.get_or_load("status", "t2", "p1", loader, tags=("project:p1",))
+    assert other.value == {"n": 2}
+
+    assert cache.invalidate("project:p1") == 2
+    fresh = await cache.get_or_load("status", "t1", "p1", loader)
+    assert fresh.value == {"n": 3} and fresh.etag != entries[0].etag
+
+    expiring = await cache.get_or_load("short", "t1", "k", loader, ttl=0)
+    again = await cache.get_or_load("short", "t1", "k", loader, ttl=0)
+    assert expiring.value != again.value
+
+    stats = cache.stats()["resources"]
+    assert stats["status"]["hits"] == 4 and stats["status"]["misses"] == 3
+    assert stats["status"]["invalidations"] == 2
+    assert stats["status"]["hit_ratio"] == round(4 / 7, 4)
+
+    assert etag_matches(fresh.etag, fresh.etag)
+    assert etag_matches(f'W/"x", {fresh.etag}', fresh.etag)
+    assert etag_matches("*", fresh.etag)
+    assert not etag_matches(entries[0].etag, fresh.etag)
+
+
+
+@pytest.mark.asyncio
+async def test_load_is_only_discarded_by_invalidating_its_own_tags():
+    cache = ReadCache(ttl=60)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_loader():
+        started.set()
+        await release.wait()
+        return {"status": "ok"}
+
+    async def load_while(tag_to_invalidate):
+        started.clear()
+        release.clear()
+        task = asyncio.create_task(
+            cache.get_or_load("status", "t1", tag_to_invalidate, slow_loader, tags=("project:p1", "tenant:t1"))
+        )
+        await started.wait()
+        cache.invalidate(tag_to_invalidate)
+        release.set()
+        return await task
+
+    # Edits to other projects don't throw away an in-flight load
+    await load_while("project:p2")
+    assert cache.get("status", "t1", "project:p2") is not None
+
+    # Invalidating a tag the load depends on does
+    entry = await load_while("tenant:t1")
+    assert entry.value == {"status": "ok"}
+    assert cache.get("status", "t1", "tenant:t1") is None
+
+    # Generations are only tracked while a load is in flight
+    assert not cache._tag_generations and not cache._tag_loads
+
+@pytest.mark.asyncio
+async def test_resource_etag_and_collaboration_invalidation():
+    mcp_read_cache.clear()
+    server = MCPServer("test", "1.0")
+    read = {"jsonrpc": "2.0", "id": 1, "method": "resources/read",
+            "params": {"uri": "project://cache-p/metadata", "tenant_context": "t"}}
+
+    first = (await server.handle_request(read))["result"]
+    etag = first["_meta"]["etag"]
+    assert json.loads(first["contents"][0]["text"])["id"] == "cache-p"
+
+    read["params"]["ifNoneMatch"] = etag
+    unchanged = (await server.handle_request(read))["result"]
+    assert unchanged["contents"] == [] and unchanged["_meta"]["notModified"]
+
+    # An edit to the project drops its cached reads
+    service = CollaborationService()
+    await service.get_or_create_session("cache-p")
+    assert mcp_read_cache.get("project/metadata", "t", "project://cache-p/metadata") is not None
+    await service.handle_agent_action("cache-p", {
+        "type": "add_clip", "name": "c", "url": "http://cdn/c.mp4", "start": 0, "duration": 1, "track": 0
+    })
+    assert mcp_read_cache.get("project/metadata", "t", "project://cache-p/metadata") is None
+
+    stats = mcp_read_cache.stats()["resources"]["project/metadata"]
+    assert stats["not_modified"] == 1 and stats["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_tool_is_metered_and_honours_if_none_match():
+    mcp_read_cache.clear()
+    finops_service.set_credits("cache-tenant", 1.0)
+
+    first = json.loads(await query_project_status(project_id="p9", tenant_context="cache-tenant"))
+    assert first["project_id"] == "p9" and first["etag"]
+
+    second = json.loads(await query_project_status(
+        project_id="p9", tenant_context="cache-tenant", if_none_match=first["etag"]
+    ))
+    assert second == {"status": "not_modified", "etag": first["etag"]}
+    # Cached reads are still billed by the budget gate
+    assert finops_service.get_balance("cache-tenant") == pytest.approx(0.99)
+
+    stats = mcp_read_cache.stats()["resources"]["query_project_status"]
+    assert stats["hits"] == 1 and stats["not_modified"] == 1
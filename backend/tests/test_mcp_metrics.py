@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.services.mcp_metrics import ToolMetrics, mcp_metrics
+from app.services.finops_service import finops_service
+from mcp_server import MCPServer, generate_cloud_video
+
+
+def test_prometheus_rendering_and_tenant_cap():
+    metrics = ToolMetrics(buckets=(0.1, 1.0), max_tenants=1)
+    metrics.observe_call("tool", "t1", 0.05)
+    metrics.observe_call("tool", "t1", 0.5)
+    metrics.observe_call("tool", "t2", 5.0)  # Over the tenant cap
+    metrics.record_error("tool", "t1", "RATE_LIMIT_EXCEEDED")
+    metrics.record_spend("tool", "t1", 0.25)
+
+    text = metrics.render_prometheus()
+    assert 'flowai_mcp_tool_latency_seconds_bucket{tool="tool",tenant="t1",le="0.1"} 1' in text
+    assert 'flowai_mcp_tool_latency_seconds_bucket{tool="tool",tenant="t1",le="+Inf"} 2' in text
+    assert 'flowai_mcp_tool_latency_seconds_count{tool="tool",tenant="_other"} 1' in text
+    assert 'flowai_mcp_tool_errors_total{tool="tool",tenant="t1",code="RATE_LIMIT_EXCEEDED"} 1' in text
+    assert 'flowai_mcp_tool_spend_usd_total{tool="tool",tenant="t1"} 0.25' in text
+
+    summary = metrics.summary()["tool"]
+    assert summary["calls"] == 3
+    assert summary["latency_seconds"]["p50_le"] == 1.0
+    assert summary["latency_seconds"]["p99_le"] is None  # Past the last bucket
+    assert summary["tenants"]["t1"] == {"calls": 2, "errors": 1, "budget_rejections": 0, "spend_usd": 0.25}
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_record_spend_rejections_and_errors():
+    mcp_metrics.reset()
+    finops_service.set_credits("metrics-tenant", 0.6)
+
+    await generate_cloud_video(prompt="sunset", tenant_context="metrics-tenant")
+    await generate_cloud_video(prompt="sunset", tenant_context="metrics-tenant")  # Out of credits
+    finops_service.set_credits("metrics-tenant", 1.0)
+    await generate_cloud_video(prompt="explicit scene", tenant_context="metrics-tenant")
+
+    summary = mcp_metrics.summary()["generate_cloud_video"]
+    assert summary["calls"] == 3
+    assert summary["spend_usd"] == pytest.approx(1.0)
+    assert summary["budget_rejections"] == {"rejected_insufficient_funds": 1}
+    assert summary["errors"] == {"CONTENT_SAFETY_VIOLATION": 1}
+
+    # The same numbers are readable by agents as an MCP resource
+    server = MCPServer("test", "1.0")
+    response = await server.handle_request({
+        "jsonrpc": "2.0", "id": 1, "method": "resources/read", "params": {"uri": "flowai://metrics/tools"}
+    })
+    resource = json.loads(response["result"]["contents"][0]["text"])
+    assert resource["generate_cloud_video"]["tenants"]["metrics-tenant"]["calls"] == 3
@@ -0,0 +1,188 @@
+import asyncio
+import io
+import json
+import pytest
+
+from app.services.collab_persistence import TimelineStore, WriteBehindPersistence
+from app.services.collaboration_service import CollaborationService, CollaborativeTimeline
+from app.services.otio_schema import yjs_to_otio
+from app.services.otio_stream import OTIOStreamParser, iter_otio_events, write_otio_json, stream_otio_json
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.received = []
+
+    async def send_bytes(self, data):
+        self.received.append(data)
+
+    async def send_text(self, data):
+        self.received.append(data)
+
+    async def close(self, code=1000):
+        pass
+
+
+def _service() -> CollaborationService:
+    return CollaborationService(persistence=WriteBehindPersistence(TimelineStore(), debounce=10.0))
+
+
+def _session_with_clips(n: int) -> CollaborativeTimeline:
+    session = CollaborativeTimeline("export")
+    with session.doc.transaction():
+        for i in range(n):
+            session.apply_agent_action({
+                "type": "add_clip", "name": f"Clip \"{i}\" ✓", "url": f"https://cdn/{i}.mp4",
+                "start": i * 1.5, "duration": 1.5, "track": i % 3, "id": f"clip-{i}"
+            })
+    return session
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_streaming_export_matches_object_graph_export():
+    session = _session_with_clips(30)
+    out = io.BytesIO()
+    written = write_otio_json(session.doc, out, buffer_size=128)
+
+    timeline = yjs_to_otio(session.doc)
+    if not hasattr(timeline, "to_dict"):
+        pytest.skip("Comparison needs the OTIO stub")
+    assert written == len(out.getvalue())
+    assert json.loads(out.getvalue()) == timeline.to_dict()
+
+
+@pytest.mark.asyncio
+async def test_http_stream_reads_live_doc_without_tearing():
+    session = _session_with_clips(30)
+    chunks = []
+    async for chunk in stream_otio_json(session.doc, buffer_size=256):
+        chunks.append(chunk)
+        if len(chunks) == 2:
+            # Edits while streaming: before and after the export cursor
+            session.apply_agent_action({"type": "remove_clip", "id": "clip-0"})
+            session.apply_agent_action({"type": "remove_clip", "id": "clip-27"})
+            session.apply_agent_action({
+                "type": "add_clip", "name": "late", "url": "u", "start": 90.0, "duration": 1.0,
+                "track": 0, "id": "late"
+            })
+    exported = json.loads(b"".join(chunks))
+    ids = [clip["metadata"]["flowai_id"] for track in exported["tracks"]["children"] for clip in track["children"]]
+    assert len(ids) == len(set(ids))
+    assert "clip-0" in ids and "clip-27" not in ids and "late" in ids
+    assert set(ids) >= {f"clip-{i}" for i in range(30)} - {"clip-27"}
+    assert len(chunks) > 1
+
+
+def test_parser_handles_any_chunking_and_otio_key_order():
+    document = json.dumps({
+        "OTIO_SCHEMA": "Timeline.1",
+        "metadata": {"nested": {"children": [1, 2]}},
+        "name": "Edit",
+        "tracks": {"OTIO_SCHEMA": "Stack.1", "children": [{
+            "OTIO_SCHEMA": "Track.1",
+            "name": "V1",
+            "children": [{
+                "OTIO_SCHEMA": "Clip.2",
+                "name": "A",
+                "metadata": {"flowai_id": "a"},
+                "source_range": {
+                    "OTIO_SCHEMA": "TimeRange.1",
+                    "start_time": {"OTIO_SCHEMA": "RationalTime.1", "value": 240.0, "rate": 24.0},
+                    "duration": {"OTIO_SCHEMA": "RationalTime.1", "value": 12345, "rate": 24.0}
+                },
+                "media_references": {"DEFAULT_MEDIA": {"OTIO_SCHEMA": "ExternalReference.1", "target_url": "s3://a.mov"}},
+                "active_media_reference_key": "DEFAULT_MEDIA"
+            }, {"OTIO_SCHEMA": "Gap.1", "name": "gap"}],
+            "kind": "Audio"
+        }]}
+    }, indent=1).encode("utf-8")
+
+    expected = list(iter_otio_events([document]))
+    for size in (1, 3, 17):
+        assert list(iter_otio_events(_chunks(document, size))) == expected
+
+    kinds = [kind for kind, _ in expected]
+    assert kinds == ["track_start", "clip", "track_end", "timeline"]
+    assert expected[0][1]["name"] == "V1" and "kind" not in expected[0][1]
+    assert expected[2][1]["kind"] == "Audio"
+    assert expected[1][1]["source_range"]["duration"]["value"] == 12345
+
+    parser = OTIOStreamParser()
+    parser.feed(document[:len(document) // 2])
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+@pytest.mark.asyncio
+async def test_import_feeds_crdt_in_bounded_batches():
+    source = _session_with_clips(1200)
+    exported = io.BytesIO()
+    write_otio_json(source.doc, exported)
+
+    service = _service()
+    await service.get_or_create_session("imported")
+    ws = FakeWebSocket()
+    connection = service.join("imported", ws, "watcher")
+
+    result = await service.import_otio_stream("imported", _chunks(exported.getvalue(), 4096), batch_size=500)
+    assert result["clips"] == 1200 and result["tracks"] == 3
+    assert result["batches"] >= 3
+
+    session = service.sessions["imported"]
+    assert len(session.doc["tracks"]) == 3
+    assert session.find_clip("clip-1199")[2]["start"] == 1199 * 1.5
+    assert session.clips_at(1, 1.6) == ["clip-1"]
+
+    # Re-importing the same document updates in place instead of duplicating
+    again = await service.import_otio_stream("imported", _chunks(exported.getvalue(), 4096), batch_size=500)
+    assert sum(len(t["clips"]) for t in session.doc["tracks"]) == 1200
+    assert again["update_bytes"] < result["update_bytes"] / 10
+    await service.leave("imported", connection)
+
+
+@pytest.mark.asyncio
+async def test_import_reports_batches_applied_before_a_parse_error():
+    source = _session_with_clips(40)
+    exported = io.BytesIO()
+    write_otio_json(source.doc, exported)
+    data = exported.getvalue()
+    truncated = data[:len(data) * 3 // 4]
+
+    service = _service()
+    with pytest.raises(ValueError):
+        await service.import_otio_stream("early", _chunks(truncated, 1024), batch_size=500)
+    assert sum(len(t["clips"]) for t in service.sessions["early"].doc["tracks"]) == 0
+
+    result = await service.import_otio_stream("late", _chunks(truncated, 1024), batch_size=5)
+    assert result["status"] == "partial" and "Invalid OTIO JSON" in result["error"]
+    session = service.sessions["late"]
+    assert sum(len(t["clips"]) for t in session.doc["tracks"]) == result["clips"] > 0
+    assert len(session.doc["tracks"]) == result["tracks"]
+
+
+@pytest.mark.asyncio
+async def test_slow_socketless_import_is_not_hibernated_midway():
+    source = _session_with_clips(60)
+    exported = io.BytesIO()
+    write_otio_json(source.doc, exported)
+
+    service = _service()
+    service.idle_grace = 0.02
+
+    async def slow_chunks():
+        for chunk in _chunks(exported.getvalue(), 512):
+            await asyncio.sleep(0.01)  # The whole stream spans several idle checks
+            yield chunk
+
+    result = await service.import_otio_stream("slow", slow_chunks(), batch_size=10)
+    assert result["status"] == "success" and result["clips"] == 60
+    assert service.metrics["sessions_hibernated"] == 0
+
+    # Idle after the import ends: hibernated, and every batch was persisted
+    await asyncio.sleep(0.1)
+    assert "slow" not in service.sessions
+    session = await service.get_or_create_session("slow")
+    assert sum(len(t["clips"]) for t in session.doc["tracks"]) == 60
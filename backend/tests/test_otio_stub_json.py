@@ -0,0 +1,59 @@
+import io
+import json
+import pytest
+
+from app.services import otio_stub
+from app.services.otio_stub import Timeline, Track, Stack, Clip, ExternalReference, RationalTime, TimeRange
+
+
+def _timeline(n_clips: int = 20) -> Timeline:
+    tl = Timeline(name="Serializer \"test\" ✓")
+    video, audio = Track(name="Video 1", kind="Video"), Track(name="Audio 1", kind="Audio")
+    for i in range(n_clips):
+        clip = Clip(name=f"Clip {i}")
+        clip.media_reference = ExternalReference(target_url=f"https://cdn/{i}.mp4")
+        clip.source_range = TimeRange(RationalTime(i * 12.5, 24), RationalTime(48, 24))
+        clip.metadata["flowai_id"] = f"clip-{i}"
+        (video if i % 2 else audio).append(clip)
+    tl.tracks.append(video)
+    tl.tracks.append(audio)
+    return tl
+
+
+def test_buffered_json_matches_to_dict():
+    tl = _timeline()
+    assert json.loads(otio_stub.to_json(tl)) == tl.to_dict()
+    assert json.loads(tl.to_json()) == tl.to_dict()
+
+    # Small buffer: output is flushed in several writes but stays identical
+    out = io.BytesIO()
+    written = otio_stub.write_json(tl, out, buffer_size=64)
+    assert written == len(out.getvalue()) == len(otio_stub.to_json(tl))
+
+
+def test_stdlib_fallback_matches(monkeypatch):
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    monkeypatch.setattr(otio_stub, "_dumps", lambda value: encoder.encode(value).encode("utf-8"))
+    tl = _timeline()
+    assert json.loads(otio_stub.to_json(tl)) == tl.to_dict()
+
+
+def test_deeply_nested_stacks_do_not_recurse():
+    root = Stack()
+    node = root
+    for _ in range(5000):
+        child = Stack()
+        node.append(child)
+        node = child
+    node.append(Track(name="leaf"))
+
+    data = otio_stub.to_json(root)
+    assert data.count(b'"OTIO_SCHEMA":"Stack.1"') == 5001
+    assert b'"name":"leaf"' in data
+
+
+def test_stub_objects_are_slotted():
+    clip = Clip(name="c")
+    assert not hasattr(clip, "__dict__")
+    with pytest.raises(AttributeError):
+        clip.unexpected = True
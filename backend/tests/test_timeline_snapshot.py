@@ -0,0 +1,61 @@
+import time
+import pytest
+
+from app.services.collaboration_service import CollaborativeTimeline
+from app.services.timeline_snapshot import TimelineSnapshot, write_snapshot, SNAPSHOT_VERSION
+
+
+def _session(n_clips: int, n_tracks: int = 2) -> CollaborativeTimeline:
+    session = CollaborativeTimeline("snap")
+    with session.doc.transaction():
+        for i in range(n_clips):
+            session.apply_agent_action({
+                "type": "add_clip", "name": f"c{i}", "url": f"https://cdn/asset-{i % 7}.mp4",
+                "start": i * 2.0, "duration": 2.0, "track": i % n_tracks, "id": f"clip-{i}-✓"
+            })
+    return session
+
+
+def test_snapshot_round_trip():
+    session = _session(25, n_tracks=3)
+    snapshot = TimelineSnapshot(session.to_snapshot())
+
+    assert snapshot.version == SNAPSHOT_VERSION
+    assert [t.name for t in snapshot.tracks] == ["Default Track", "Track 1", "Track 2"]
+    assert snapshot.clip_count == 25
+    for track_idx, y_track in enumerate(session.doc["tracks"]):
+        expected = [(c["_id"], c["start"], c["duration"], c["media_url"]) for c in y_track["clips"]]
+        assert list(snapshot.tracks[track_idx].clips()) == expected
+
+    # Media URLs are interned: 7 distinct URLs + 3 track names + 1 kind
+    assert len(snapshot._string_offsets) - 1 == 7 + 3 + 1
+
+
+def test_memory_mapped_load_is_fast(tmp_path):
+    session = _session(10_000, n_tracks=4)
+    path = str(tmp_path / "timeline.ftls")
+    size = write_snapshot(session.doc, path)
+
+    started = time.perf_counter()
+    snapshot = TimelineSnapshot.open(path)
+    loaded_us = (time.perf_counter() - started) * 1e6
+    print(f"Loaded {snapshot.clip_count} clip snapshot ({size / 1024:.0f} KiB) in {loaded_us:.0f}us")
+
+    assert snapshot.clip_count == 10_000
+    track = snapshot.tracks[1]
+    assert track.starts[10] == 82.0 and track.durations[10] == 2.0
+    assert track.clip_id(10) == "clip-41-✓"
+    assert track.media_url(10) == "https://cdn/asset-6.mp4"
+    assert loaded_us < 50_000
+    snapshot.release()
+
+
+def test_rejects_foreign_or_newer_data():
+    data = bytearray(_session(3).to_snapshot())
+    with pytest.raises(ValueError):
+        TimelineSnapshot(b"NOPE" + bytes(data[4:]))
+    data[4] = SNAPSHOT_VERSION + 1
+    with pytest.raises(ValueError, match="version"):
+        TimelineSnapshot(bytes(data))
+    with pytest.raises(ValueError):
+        TimelineSnapshot(b"FT")
@@ -0,0 +1,134 @@
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import linear_platform
+from app.workers import valsci_batch
+from app.workers.valsci_batch import BatchVerificationJob
+
+TRANSCRIPT = (
+    "Welcome to the show. Studies show that regular exercise prevents heart disease. "
+    "According to NASA, 70% of Earth is covered by water."
+)
+
+
+def _write_input(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"video_id": f"vid-{i}", "transcript": TRANSCRIPT, "creator_id": "c1"}) + "\n")
+        f.write("not json\n")
+
+
+def _read_output(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_job_streams_results_in_order(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(src, 6)
+
+    stats = BatchVerificationJob(str(src), str(out), workers=2, checkpoint_every=2).run()
+
+    results = _read_output(out)
+    assert [r["video_id"] for r in results[:6]] == [f"vid-{i}" for i in range(6)]
+    assert results[0]["total_claims"] == 2
+    assert "error" in results[6]
+    assert stats["processed"] == 6
+    assert stats["failed"] == 1
+    assert stats["videos_per_second"] > 0
+
+
+def test_batch_job_resumes_from_checkpoint(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(src, 5)
+
+    first = BatchVerificationJob(str(src), str(out), workers=2, max_records=3).run()
+    assert first["processed"] == 3
+
+    # Simulate a crash after the checkpoint: a torn partial line
+    with open(out, "a") as f:
+        f.write('{"video_id": "vid-3", "tor')
+
+    second = BatchVerificationJob(str(src), str(out), workers=2).run()
+    assert second["skipped"] == 3
+    assert second["processed"] == 2
+
+    results = _read_output(out)
+    assert [r.get("video_id") for r in results[:5]] == [f"vid-{i}" for i in range(5)]
+    assert len(results) == 6
+
+
+def _crash_worker():
+    os._exit(1)
+
+
+def test_batch_job_fails_on_broken_pool_and_refuses_concurrent_runs(tmp_path, monkeypatch):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(src, 2)
+
+    monkeypatch.setattr(valsci_batch, "_init_worker", _crash_worker)
+    job = BatchVerificationJob(str(src), str(out), workers=1)
+    with pytest.raises(BrokenProcessPool):
+        job.run()
+    assert job.stats["status"] == "failed"
+    assert not BatchVerificationJob.is_running(str(out))
+
+    BatchVerificationJob._active_outputs.add(os.path.realpath(out))
+    try:
+        with pytest.raises(RuntimeError):
+            BatchVerificationJob(str(src), str(out), workers=1).run()
+    finally:
+        BatchVerificationJob._active_outputs.discard(os.path.realpath(out))
+
+
+def test_batch_endpoint_only_reads_the_inputs_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(linear_platform, "VALSCI_BATCH_DIR", str(tmp_path))
+    (tmp_path / "inputs").mkdir()
+    _write_input(tmp_path / "inputs" / "catalogue.jsonl", 2)
+    (tmp_path / "secret.jsonl").write_text("{}\n")
+    os.symlink(tmp_path / "secret.jsonl", tmp_path / "inputs" / "link.jsonl")
+
+    app = FastAPI()
+    app.include_router(linear_platform.router)
+    client = TestClient(app)
+
+    assert client.post("/linear/valsci/batch", json={"input_file": "../secret.jsonl"}).status_code == 422
+    assert client.post("/linear/valsci/batch", json={"input_file": "link.jsonl"}).status_code == 404
+    assert client.post("/linear/valsci/batch", json={"input_file": "missing.jsonl"}).status_code == 404
+
+    monkeypatch.setattr(linear_platform, "_run_batch_job", lambda job: None)  # Leave it pending
+    started = client.post("/linear/valsci/batch", json={"input_file": "catalogue.jsonl", "workers": 1})
+    assert started.status_code == 200
+    assert started.json()["output_file"] == "catalogue.results.jsonl"
+    job = linear_platform.batch_jobs.pop(started.json()["job_id"])
+    assert job.output_path == str(tmp_path / "results" / "catalogue.results.jsonl")
+
+    linear_platform.batch_jobs["pending"] = job
+    try:
+        assert client.post("/linear/valsci/batch", json={"input_file": "catalogue.jsonl"}).status_code == 409
+    finally:
+        linear_platform.batch_jobs.pop("pending")
+
+
+def test_finished_api_jobs_are_logged_and_evicted(tmp_path, monkeypatch, caplog):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_input(src, 2)
+    monkeypatch.setattr(valsci_batch, "_init_worker", _crash_worker)
+    monkeypatch.setattr(linear_platform, "batch_jobs", {})
+
+    failed = BatchVerificationJob(str(src), str(out), workers=1)
+    linear_platform.batch_jobs["failed"] = failed
+    linear_platform.batch_jobs["pending"] = BatchVerificationJob(str(src), str(tmp_path / "other.jsonl"))
+    linear_platform._run_batch_job(failed)
+    assert failed.stats["status"] == "failed"
+    assert "Batch verification of" in caplog.text
+
+    linear_platform._evict_finished_jobs(failed.stats["finished_at"] + 1)
+    assert set(linear_platform.batch_jobs) == {"failed", "pending"}
+    linear_platform._evict_finished_jobs(failed.stats["finished_at"] + linear_platform.BATCH_JOB_RETENTION_SECONDS)
+    assert set(linear_platform.batch_jobs) == {"pending"}
@@ -0,0 +1,82 @@
+import pytest
+from app.services.valsci_verification_service import (
+    ClaimResultMemo,
+    ExtractedClaim,
+    ClaimType,
+    ValsciVerificationService,
+)
+
+
+def _claim(text: str, claim_id: str) -> ExtractedClaim:
+    return ExtractedClaim(
+        claim_id=claim_id,
+        text=text,
+        claim_type=ClaimType.SCIENTIFIC_FACT,
+        timestamp_start=0.0,
+        timestamp_end=5.0,
+        confidence=0.9
+    )
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_claims_reuse_results():
+    service = ValsciVerificationService()
+    original = "Studies show coffee consumption reduces the risk of type 2 diabetes in adults"
+    reworded = "Studies show that coffee consumption reduces the risk of type 2 diabetes in adults!"
+
+    first = await service._verify_single_claim(_claim(original, "c1"))
+    second = await service._verify_single_claim(_claim(reworded, "c2"))
+
+    assert second.claim_id == "c2"
+    assert second.evidence_score == first.evidence_score
+    assert second.supporting_sources is first.supporting_sources
+
+    metrics = service.claim_memo.get_metrics()
+    assert metrics["misses"] == 1
+    assert metrics["exact_hits"] + metrics["near_duplicate_hits"] == 1
+    assert metrics["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_unrelated_claims_miss():
+    service = ValsciVerificationService()
+    await service._verify_single_claim(_claim("Research indicates that sleep improves long term memory", "a"))
+    await service._verify_single_claim(_claim("Scientists found water on the surface of Mars in 2015", "b"))
+
+    assert service.claim_memo.get_metrics()["misses"] == 2
+
+
+def test_memo_near_duplicate_and_ttl():
+    memo = ClaimResultMemo(similarity_threshold=0.5)
+    base = "according to the who 30% of adults worldwide are not physically active enough"
+    memo.put(base, result="cached")
+
+    assert memo.get(base + " today") == "cached"
+    assert memo.get_metrics()["near_duplicate_hits"] == 1
+
+    memo.ttl_seconds = -1
+    assert memo.get(base) is None
+    assert memo.get_metrics()["stale_evictions"] == 1
+    assert memo.get_metrics()["entries"] == 0
+
+
+def test_memo_capacity_bound():
+    memo = ClaimResultMemo(max_entries=2)
+    memo.put("studies show apples are red fruit", "r1")
+    memo.put("studies show bananas are yellow fruit", "r2")
+    memo.put("studies show grapes are purple fruit", "r3")
+
+    assert memo.get_metrics()["entries"] == 2
+    assert memo.get_metrics()["capacity_evictions"] == 1
+
+
+def test_minhash_permutations_are_distinct_and_estimate_jaccard():
+    memo = ClaimResultMemo(shingle_size=1)
+    assert len(set(memo._perms)) == memo.num_perm
+
+    shared = [f"term{i}" for i in range(36)]
+    a = " ".join(shared + [f"left{i}" for i in range(4)])
+    b = " ".join(shared + [f"right{i}" for i in range(4)])
+    jaccard = 36 / 44
+    estimate = memo.similarity(memo.signature(a), memo.signature(b))
+    assert abs(estimate - jaccard) < 0.15
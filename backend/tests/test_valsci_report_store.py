@@ -0,0 +1,110 @@
+import threading
+import pytest
+from app.services.valsci_verification_service import (
+    ValsciVerificationService,
+    VerificationReportStore,
+)
+
+TRANSCRIPT = (
+    "Studies show that regular exercise prevents heart disease in adults. "
+    "According to NASA, 70% of Earth is covered by water."
+)
+
+
+@pytest.mark.asyncio
+async def test_reports_survive_eviction_and_restart(tmp_path):
+    db_path = str(tmp_path / "reports.db")
+    service = ValsciVerificationService(report_store=VerificationReportStore(db_path, max_reports=1))
+
+    first = await service.verify_video_content("vid-1", TRANSCRIPT, "creator")
+    await service.verify_video_content("vid-2", TRANSCRIPT, "creator")
+
+    # vid-1 was evicted from memory but is rehydrated from disk
+    assert "vid-1" not in service.active_verifications._reports
+    metrics = await service.get_monetization_metrics("vid-1")
+    assert metrics["evidence_score"] == first.overall_evidence_score
+    assert len(service.active_verifications) == 2
+
+    # A fresh service on the same database sees the same claim details
+    restarted = ValsciVerificationService(report_store=VerificationReportStore(db_path))
+    claim = first.claim_results[0]
+    details = await restarted.get_claim_details("vid-1", claim.claim_id)
+    assert details.status == claim.status
+    assert [s.paper_id for s in details.supporting_sources] == [s.paper_id for s in claim.supporting_sources]
+    assert details.supporting_sources[0].journal == claim.supporting_sources[0].journal
+    assert details.supporting_sources[0].relevance_score == claim.supporting_sources[0].relevance_score
+
+
+@pytest.mark.asyncio
+async def test_sources_and_strings_are_stored_once(tmp_path):
+    store = VerificationReportStore(str(tmp_path / "reports.db"))
+    service = ValsciVerificationService(report_store=store)
+
+    # Identical claims share retrieved sources through the cache and memo
+    report = await service.verify_video_content("vid-a", TRANSCRIPT, "creator")
+    await service.verify_video_content("vid-b", TRANSCRIPT, "creator")
+    referenced = {
+        s.paper_id
+        for r in report.claim_results
+        for s in r.supporting_sources + r.contradicting_sources
+    }
+
+    db = store._db()
+    source_rows = db.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+    journal_rows = db.execute("SELECT COUNT(*) FROM strings WHERE value = 'Nature'").fetchone()[0]
+    assert referenced
+    assert source_rows == len(referenced)  # Not duplicated per video
+    assert journal_rows == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_report():
+    service = ValsciVerificationService()
+    assert await service.get_claim_details("missing", "claim") is None
+    assert (await service.get_monetization_metrics("missing"))["error"] == "Video not verified"
+    assert service.active_verifications.pop("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_report_writes_run_off_the_event_loop(tmp_path, monkeypatch):
+    store = VerificationReportStore(str(tmp_path / "nested" / "reports.db"))
+    service = ValsciVerificationService(report_store=store)
+    loop_thread = threading.get_ident()
+    writer_threads = []
+    write = store._write
+
+    def tracked_write(report):
+        writer_threads.append(threading.get_ident())
+        write(report)
+
+    monkeypatch.setattr(store, "_write", tracked_write)
+    await service.verify_video_content("vid-t", TRANSCRIPT, "creator")
+
+    assert writer_threads and loop_thread not in writer_threads
+    assert (tmp_path / "nested" / "reports.db").exists()
+    assert VerificationReportStore(store.db_path).get("vid-t").total_claims == 2
+
+
+@pytest.mark.asyncio
+async def test_report_cache_misses_are_read_off_the_event_loop(tmp_path, monkeypatch):
+    store = VerificationReportStore(str(tmp_path / "reports.db"))
+    service = ValsciVerificationService(report_store=store)
+    await service.verify_video_content("vid-r", TRANSCRIPT, "creator")
+
+    restarted = VerificationReportStore(store.db_path)
+    service = ValsciVerificationService(report_store=restarted)
+    loop_thread = threading.get_ident()
+    reader_threads = []
+    read = restarted._read
+
+    def tracked_read(video_id):
+        reader_threads.append(threading.get_ident())
+        return read(video_id)
+
+    monkeypatch.setattr(restarted, "_read", tracked_read)
+    assert (await service.get_monetization_metrics("vid-r"))["video_id"] == "vid-r"
+    assert (await service.get_monetization_metrics("vid-r"))["video_id"] == "vid-r"  # Cached now
+
+    assert len(reader_threads) == 1 and loop_thread not in reader_threads
+    assert await restarted.contains_async("vid-r") and not await restarted.contains_async("other")
+    assert await restarted.len_async() == 1
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from app.services.valsci_verification_service import RAGRetriever
+
+
+class SlowRetriever(RAGRetriever):
+    """Retriever whose backend yields to the loop, like a real HTTP call"""
+    def __init__(self, fail: bool = False):
+        super().__init__()
+        self.fail = fail
+
+    async def _fetch_sources(self, query, max_results):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return await super()._fetch_sources(query, max_results)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_queries_are_coalesced():
+    retriever = SlowRetriever()
+    query = "coffee reduces diabetes risk"
+
+    results = await asyncio.gather(*[retriever.retrieve_sources(query) for _ in range(10)])
+
+    assert all(r is results[0] for r in results)
+    metrics = retriever.get_metrics()
+    assert metrics["backend_calls"] == 1
+    assert metrics["coalesced_requests"] == 9
+    assert metrics["in_flight"] == 0
+
+    # Later calls are served from the cache
+    await retriever.retrieve_sources(query)
+    assert retriever.get_metrics()["cache_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_distinct_queries_are_not_coalesced():
+    retriever = SlowRetriever()
+    await asyncio.gather(retriever.retrieve_sources("query one"), retriever.retrieve_sources("query two"))
+
+    assert retriever.get_metrics()["backend_calls"] == 2
+    assert retriever.get_metrics()["coalesced_requests"] == 0
+
+
+@pytest.mark.asyncio
+async def test_backend_error_propagates_to_followers():
+    retriever = SlowRetriever(fail=True)
+    results = await asyncio.gather(
+        *[retriever.retrieve_sources("flaky") for _ in range(3)],
+        return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retriever.get_metrics()["backend_calls"] == 1
+    assert retriever.get_metrics()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_fail_followers():
+    retriever = SlowRetriever()
+    leader = asyncio.ensure_future(retriever.retrieve_sources("shared"))
+    await asyncio.sleep(0)
+    followers = [asyncio.ensure_future(retriever.retrieve_sources("shared")) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    results = await asyncio.gather(*followers)
+
+    assert leader.cancelled()
+    assert all(r is results[0] and len(r) == 5 for r in results)
+    assert retriever.get_metrics()["backend_calls"] == 1
+    assert retriever.get_metrics()["in_flight"] == 0
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from app.services.valsci_verification_service import (
+    ClaimExtractor,
+    StreamingClaimExtractor,
+    ValsciVerificationService,
+)
+
+
+def test_extract_claims_uses_real_timestamps():
+    segments = [
+        (12.0, 16.0, "Welcome back to the channel."),
+        (16.0, 24.0, "Studies show that coffee increases alertness in adults."),
+    ]
+    transcript = " ".join(text for _, _, text in segments)
+
+    claims = ClaimExtractor().extract_claims(transcript, timestamps=segments)
+
+    assert len(claims) == 1
+    assert claims[0].timestamp_start == pytest.approx(16.0)
+    assert claims[0].timestamp_end == pytest.approx(24.0, abs=0.2)
+
+
+def test_streaming_extractor_handles_sentence_across_segments():
+    extractor = StreamingClaimExtractor()
+
+    # Sentence starts in one segment and ends in the next
+    assert extractor.feed(0.0, 4.0, "Hello everyone. Research indicates that") == []
+    claims = extractor.feed(4.0, 8.0, "sleep improves memory in 80% of adults. And then")
+
+    assert len(claims) == 1
+    assert claims[0].text.startswith("Research indicates that sleep")
+    assert 0.0 < claims[0].timestamp_start < 4.0
+    assert 4.0 < claims[0].timestamp_end <= 8.0
+    assert claims[0].context == "Hello everyone"
+
+    # Trailing text is only extracted on flush
+    assert extractor.feed(8.0, 10.0, "scientists found a billion new stars") == []
+    tail = extractor.flush()
+    assert len(tail) == 1
+    assert tail[0].timestamp_end == pytest.approx(10.0)
+
+
+@pytest.mark.asyncio
+async def test_streaming_session_pushes_results_and_report():
+    service = ValsciVerificationService()
+    session = service.open_stream("live-1", "creator-1")
+
+    await session.add_segment(0.0, 5.0, "Studies show that exercise prevents heart disease.")
+    await session.add_segment(5.0, 9.0, "According to NASA, 70% of Earth is covered")
+    await session.add_segment(9.0, 11.0, "by water.")
+
+    report = await session.close()
+    pushed = [item async for item in session.results()]
+
+    assert report.total_claims == 2
+    assert len(pushed) == 2
+    assert {claim.claim_id for claim, _ in pushed} == {r.claim_id for r in report.claim_results}
+    assert service.active_verifications["live-1"] is report
+
+    with pytest.raises(ValueError):
+        await session.add_segment(11.0, 12.0, "Too late.")
+
+
+@pytest.mark.asyncio
+async def test_streaming_report_is_in_transcript_order():
+    service = ValsciVerificationService()
+    verify = service._verify_single_claim
+
+    async def slow_first(claim):
+        # Earlier claims finish later
+        await asyncio.sleep(0.02 if claim.timestamp_start < 5.0 else 0.0)
+        return await verify(claim)
+
+    service._verify_single_claim = slow_first
+    session = service.open_stream("live-2", "creator-1")
+    await session.add_segment(0.0, 5.0, "Studies show that exercise prevents heart disease.")
+    await session.add_segment(5.0, 10.0, "According to NASA, 70% of Earth is covered by water.")
+    report = await session.close()
+
+    pushed = [claim.claim_id for claim, _ in [item async for item in session.results()]]
+    assert pushed == [c.claim_id for c in reversed(session.claims)]
+    assert [r.claim_id for r in report.claim_results] == [c.claim_id for c in session.claims]
+
+
+def test_stream_endpoint_rejects_malformed_frames_and_closes_session(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import linear_platform
+
+    service = ValsciVerificationService()
+    sessions = []
+    open_stream = service.open_stream
+
+    def tracked_open_stream(video_id, creator_id):
+        sessions.append(open_stream(video_id, creator_id))
+        return sessions[-1]
+
+    service.open_stream = tracked_open_stream
+    monkeypatch.setattr(linear_platform, "valsci_service", service)
+
+    app = FastAPI()
+    app.include_router(linear_platform.router)
+    with TestClient(app).websocket_connect("/linear/valsci/stream/live-3") as ws:
+        ws.send_text("not json")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"start": 0.0, "text": "No end."})
+        assert ws.receive_json() == {"type": "error", "detail": "Missing field 'end'"}
+        ws.send_json({"start": 0.0, "end": 5.0, "text": "Studies show that exercise prevents heart disease."})
+        assert ws.receive_json()["type"] == "claim_result"
+    # Client dropped without {"type": "end"}: the session is still closed and stored
+    assert sessions[0].closed
+    assert service.active_verifications["live-3"].total_claims == 1